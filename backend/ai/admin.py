@@ -2,7 +2,7 @@
 Admin configuration for AI app
 """
 from django.contrib import admin
-from .models import AIUsageLog, PolicyComparison, Conversation, Message
+from .models import AIUsageLog, PolicyComparison, Conversation, Message, Job, LLMCacheEntry, LLMCacheStats, SemanticCacheEntry, InFlightCall, PolicyFeatures, PolicyCluster
 
 
 @admin.register(AIUsageLog)
@@ -10,17 +10,17 @@ class AIUsageLogAdmin(admin.ModelAdmin):
     """
     Admin configuration for AIUsageLog model
     """
-    list_display = ('user', 'endpoint', 'tokens_used', 'model_used', 'cost', 'success', 'created_at')
-    list_filter = ('endpoint', 'model_used', 'success', 'created_at')
+    list_display = ('user', 'endpoint', 'input_tokens', 'output_tokens', 'model_used', 'cost', 'success', 'created_at')
+    list_filter = ('endpoint', 'model_used', 'success', 'tokens_estimated', 'created_at')
     search_fields = ('user__email', 'endpoint')
     readonly_fields = ('created_at',)
     
     fieldsets = (
         ('Usage Information', {
-            'fields': ('user', 'endpoint', 'model_used')
+            'fields': ('user', 'endpoint', 'model_used', 'routing_reason')
         }),
         ('Metrics', {
-            'fields': ('tokens_used', 'processing_time', 'cost', 'success')
+            'fields': ('tokens_used', 'input_tokens', 'output_tokens', 'tokens_estimated', 'processing_time', 'cost', 'success')
         }),
         ('Error Information', {
             'fields': ('error_message',),
@@ -106,3 +106,78 @@ class MessageAdmin(admin.ModelAdmin):
         """Return a preview of the message content"""
         return obj.content[:100] + '...' if len(obj.content) > 100 else obj.content
     content_preview.short_description = 'Content Preview'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for Job model
+    """
+    list_display = ('id', 'job_type', 'user', 'status', 'attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('job_type', 'status', 'created_at')
+    search_fields = ('user__email', 'job_type', 'error_message')
+    readonly_fields = ('created_at', 'updated_at', 'finished_at', 'locked_by', 'locked_at')
+
+
+@admin.register(LLMCacheEntry)
+class LLMCacheEntryAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for LLMCacheEntry model
+    """
+    list_display = ('key', 'endpoint', 'model_name', 'hit_count', 'created_at', 'last_accessed_at', 'expires_at')
+    list_filter = ('endpoint', 'model_name')
+    search_fields = ('key', 'endpoint')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(LLMCacheStats)
+class LLMCacheStatsAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for LLMCacheStats model
+    """
+    list_display = ('endpoint', 'hits', 'misses', 'hit_rate', 'updated_at')
+    readonly_fields = ('updated_at',)
+
+
+@admin.register(SemanticCacheEntry)
+class SemanticCacheEntryAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for SemanticCacheEntry model
+    """
+    list_display = ('namespace', 'question', 'hit_count', 'created_at', 'last_hit_at')
+    list_filter = ('namespace',)
+    search_fields = ('question', 'answer')
+    readonly_fields = ('created_at',)
+
+
+@admin.register(InFlightCall)
+class InFlightCallAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for InFlightCall model
+    """
+    list_display = ('operation', 'key', 'owner', 'status', 'created_at', 'expires_at')
+    list_filter = ('operation', 'status')
+    search_fields = ('key', 'owner')
+    readonly_fields = ('key', 'operation', 'owner', 'status', 'result', 'created_at', 'expires_at')
+
+
+@admin.register(PolicyFeatures)
+class PolicyFeaturesAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for PolicyFeatures model
+    """
+    list_display = ('text_hash', 'schema_version', 'risk_score', 'efficiency_score', 'updated_at')
+    list_filter = ('schema_version',)
+    search_fields = ('text_hash',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(PolicyCluster)
+class PolicyClusterAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for PolicyCluster model
+    """
+    list_display = ('policy', 'cluster', 'distance', 'model_version', 'updated_at')
+    list_filter = ('cluster', 'model_version')
+    search_fields = ('policy__name',)
+    readonly_fields = ('updated_at',)
@@ -0,0 +1,268 @@
+"""
+Async AI views for PolicyBridge AI
+
+Native Django async views (DRF's api_view is sync-only) for the chat and
+comparison endpoints. Served through ``policybridge_backend.asgi``, the
+Gemini round trip is awaited on the event loop, so one process can hold many
+in-flight LLM calls without a thread per request. ORM work still runs in
+Django's sync thread via ``sync_to_async``.
+"""
+import functools
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from policies.models import Policy
+from .services import get_gemini_service, get_comparison_service
+from .semantic_cache import get_semantic_cache
+from .views import (
+    get_or_create_conversation,
+    store_message,
+    build_policy_chat_context,
+    build_policy_chat_prompt,
+    build_general_chat_prompt,
+    policy_chat_fallback,
+    count_policy_question,
+    GENERAL_CHAT_FALLBACK,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def async_api_view(view):
+    """
+    Wrap an async view with JWT authentication, POST-only dispatch and JSON
+    body parsing, mirroring what ``@api_view(['POST'])`` with
+    ``IsAuthenticated`` does for the sync views.
+    """
+    @csrf_exempt
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'POST':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'},
+                                status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+        try:
+            auth = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except (InvalidToken, TokenError, AuthenticationFailed) as e:
+            return JsonResponse({'detail': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+        if auth is None:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'},
+                                status=status.HTTP_401_UNAUTHORIZED)
+        request.user = auth[0]
+
+        try:
+            request.data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON body'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@async_api_view
+async def async_query_policy(request):
+    """Async variant of query_policy"""
+    user = request.user
+    policy_id = request.data.get('policy_id')
+    question = request.data.get('question')
+
+    if not policy_id or not question:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Policy ID and question are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        policy = await Policy.objects.aget(id=policy_id, user=user)
+    except (Policy.DoesNotExist, ValueError):
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    conversation = await sync_to_async(get_or_create_conversation)(user, policy)
+    if not conversation:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Failed to create conversation'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    await sync_to_async(store_message)(conversation=conversation, message_type='user', content=question)
+    context = await sync_to_async(build_policy_chat_context)(policy, question)
+
+    try:
+        gemini_service = get_gemini_service()
+        if not gemini_service.model and not gemini_service.use_mock:
+            return JsonResponse({
+                'status': 'error',
+                'message': 'AI service not available. Please check Gemini API configuration.'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        prompt = build_policy_chat_prompt(context, question)
+        ai_response = await gemini_service.agenerate(prompt, endpoint="policy_query", fallback=False)
+        if not ai_response:
+            raise Exception("Gemini returned empty response")
+
+        ml_insights = {
+            "policy_id": policy_id,
+            "question_answered": True,
+            "response_quality": "high"
+        }
+        ai_message = await sync_to_async(store_message)(
+            conversation=conversation,
+            message_type='ai',
+            content=ai_response,
+            citations=[],
+            ml_insights=ml_insights
+        )
+        await sync_to_async(count_policy_question)(policy)
+        return JsonResponse({
+            "status": "success",
+            "response": ai_response,
+            "citations": [],
+            "ml_insights": ml_insights,
+            "conversation_id": conversation.id,
+            "message_id": ai_message.id if ai_message else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting AI response for policy {policy_id}: {e}")
+        return JsonResponse({
+            "status": "success",
+            "response": policy_chat_fallback(policy, question),
+            "citations": [],
+            "ml_insights": {
+                "policy_id": policy_id,
+                "question_answered": True,
+                "response_quality": "fallback",
+                "fallback_reason": str(e)
+            }
+        })
+
+
+@async_api_view
+async def async_general_chat(request):
+    """Async variant of general_chat"""
+    question = request.data.get('question')
+    if not question:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Question is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    conversation = await sync_to_async(get_or_create_conversation)(request.user)
+    if not conversation:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Failed to create conversation'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    await sync_to_async(store_message)(conversation=conversation, message_type='user', content=question)
+
+    try:
+        semantic_cache = get_semantic_cache('general_chat')
+        cached = await sync_to_async(semantic_cache.lookup)(question)
+        ml_insights = {"question_answered": True, "response_quality": "high"}
+
+        if cached:
+            ai_response, similarity = cached
+            ml_insights.update({"cached": True, "cache_similarity": round(similarity, 3)})
+        else:
+            gemini_service = get_gemini_service()
+            if not gemini_service.model and not gemini_service.use_mock:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'AI service not available. Please check Gemini API configuration.'
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            prompt = build_general_chat_prompt(question)
+            ai_response = await gemini_service.agenerate(prompt, endpoint="general_chat", fallback=False)
+            if not ai_response:
+                raise Exception("Gemini returned empty response")
+            if gemini_service.model:
+                await sync_to_async(semantic_cache.store)(question, ai_response)
+
+        ai_message = await sync_to_async(store_message)(
+            conversation=conversation,
+            message_type='ai',
+            content=ai_response,
+            citations=[],
+            ml_insights=ml_insights
+        )
+        return JsonResponse({
+            "status": "success",
+            "response": ai_response,
+            "citations": [],
+            "ml_insights": ml_insights,
+            "conversation_id": conversation.id,
+            "message_id": ai_message.id if ai_message else None
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting AI response for general chat: {e}")
+        return JsonResponse({
+            "status": "success",
+            "response": GENERAL_CHAT_FALLBACK,
+            "citations": [],
+            "ml_insights": {
+                "question_answered": True,
+                "response_quality": "fallback",
+                "fallback_reason": str(e)
+            }
+        })
+
+
+@async_api_view
+async def async_policy_comparison(request):
+    """Async variant of policy_comparison_view"""
+    policy1_id = request.data.get('policy1_id')
+    policy2_id = request.data.get('policy2_id')
+
+    if not policy1_id or not policy2_id:
+        return JsonResponse({
+            'status': 'error',
+            'error': 'Both policy1_id and policy2_id are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if policy1_id == policy2_id:
+        return JsonResponse({
+            'status': 'error',
+            'error': 'Cannot compare a policy with itself'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    owned = await Policy.objects.filter(id__in=[policy1_id, policy2_id], user=request.user).acount()
+    if owned != 2:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        comparison_service = get_comparison_service()
+    except Exception as e:
+        logger.error(f"Failed to initialize PolicyComparisonService: {str(e)}")
+        return JsonResponse({
+            'status': 'error',
+            'error': f'Service initialization failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    result = await comparison_service.aprocess_policy_comparison(policy1_id, policy2_id)
+
+    if result['status'] != 'success':
+        return JsonResponse({
+            'status': 'error',
+            'error': result.get('error', 'Comparison failed')
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return JsonResponse({
+        'status': 'success',
+        'data': {
+            'comparison_result': result['comparison_result'],
+            'raw_response': result['raw_response'],
+            'usage_info': result['usage_info'],
+            'policy_names': list(result['policy_names']),
+            'ml_verification': result.get('ml_verification', {}),
+            'fallback_used': result.get('fallback_used', False)
+        }
+    })
@@ -0,0 +1,229 @@
+"""
+Circuit breaker around the Gemini backend for PolicyBridge AI
+
+Every model call goes through one process-wide breaker. When the recent error
+rate or slow-call rate crosses its threshold the breaker opens and calls fail
+immediately with CircuitOpenError, which the services already handle by
+returning their fallback comparison or chat answer. After a cool-off period a
+limited number of half-open probe calls are let through; enough successes
+close the breaker again, a failure re-opens it.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from django.conf import settings
+from django.utils import timezone
+from .rate_limit import RateLimitTimeout, is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    The last ``window_size`` calls are tracked; once at least ``min_calls``
+    are recorded, the breaker opens if the failure rate reaches
+    ``failure_rate_threshold`` or the share of calls slower than
+    ``slow_call_seconds`` reaches ``slow_rate_threshold``.
+    """
+
+    def __init__(self, name='gemini', window_size=20, min_calls=5, failure_rate_threshold=0.5,
+                 slow_call_seconds=20.0, slow_rate_threshold=0.5, open_seconds=30.0,
+                 half_open_probes=1, probe_successes=2):
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.probe_successes = probe_successes
+
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._transitions = deque(maxlen=50)
+        self._counters = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, new_state, reason):
+        old_state = self._state
+        self._state = new_state
+        self._transitions.append({
+            'from': old_state,
+            'to': new_state,
+            'reason': reason,
+            'at': timezone.now().isoformat(),
+        })
+        if new_state == OPEN:
+            self._opened_at = time.monotonic()
+            self._counters['opened'] += 1
+            logger.warning(f"Circuit {self.name} opened: {reason}")
+        elif new_state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit {self.name} half-open, probing backend")
+        else:
+            self._window.clear()
+            logger.info(f"Circuit {self.name} closed: {reason}")
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN, f"{self.open_seconds:.0f}s cool-off elapsed")
+
+    def check(self):
+        """
+        Raise CircuitOpenError if the circuit is open, without taking a probe
+        slot. Lets callers skip queueing for rate-limit capacity they would
+        not get to use.
+        """
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                self._counters['rejected'] += 1
+                retry_in = self.open_seconds - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError(f"Gemini circuit open, retry in {retry_in:.0f}s")
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == OPEN:
+                self._counters['rejected'] += 1
+                retry_in = self.open_seconds - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError(f"Gemini circuit open, retry in {retry_in:.0f}s")
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self._counters['rejected'] += 1
+                    raise CircuitOpenError("Gemini circuit half-open, probe already in flight")
+                self._probes_in_flight += 1
+
+    def record(self, duration, error=None):
+        """Record the outcome of an admitted call"""
+        failed = error is not None
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            self._counters['calls'] += 1
+            self._counters['failures'] += int(failed)
+            self._counters['slow_calls'] += int(slow)
+
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._transition(OPEN, f"probe {'failed' if failed else 'slow'} ({duration:.1f}s)")
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probe_successes:
+                        self._transition(CLOSED, f"{self._probe_successes} successful probes")
+                return
+
+            self._window.append((failed, slow))
+            if self._state == CLOSED and len(self._window) >= self.min_calls:
+                failure_rate = sum(f for f, _ in self._window) / len(self._window)
+                slow_rate = sum(s for _, s in self._window) / len(self._window)
+                if failure_rate >= self.failure_rate_threshold:
+                    self._transition(OPEN, f"failure rate {failure_rate:.0%} over last {len(self._window)} calls")
+                elif slow_rate >= self.slow_rate_threshold:
+                    self._transition(OPEN, f"slow-call rate {slow_rate:.0%} over last {len(self._window)} calls")
+
+    def release(self):
+        """Return a half-open probe slot for a call that was admitted but not made"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    @contextmanager
+    def guard(self):
+        """
+        Wrap one backend call. Quota errors are left to the rate limiter and
+        do not count as backend failures.
+        """
+        self.before_call()
+        start = time.monotonic()
+        try:
+            yield
+        except (RateLimitTimeout, CircuitOpenError):
+            self.release()
+            raise
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.release()
+            else:
+                self.record(time.monotonic() - start, error=e)
+            raise
+        except BaseException:
+            # Cancelled (task cancellation, client disconnect, interrupt):
+            # not a backend outcome, but the probe slot must be freed
+            self.release()
+            raise
+        else:
+            self.record(time.monotonic() - start)
+
+    def metrics(self):
+        """Current state, rolling rates, counters and recent transitions"""
+        with self._lock:
+            self._maybe_half_open()
+            window = list(self._window)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'window_calls': len(window),
+                'failure_rate': round(sum(f for f, _ in window) / len(window), 4) if window else 0.0,
+                'slow_rate': round(sum(s for _, s in window) / len(window), 4) if window else 0.0,
+                'counters': dict(self._counters),
+                'transitions': list(self._transitions),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._window.clear()
+            if self._state != CLOSED:
+                self._transition(CLOSED, 'manual reset')
+
+
+_breaker = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker():
+    """Return the process-wide Gemini circuit breaker configured from settings"""
+    global _breaker
+    with _breaker_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                window_size=getattr(settings, 'GEMINI_BREAKER_WINDOW', 20),
+                min_calls=getattr(settings, 'GEMINI_BREAKER_MIN_CALLS', 5),
+                failure_rate_threshold=getattr(settings, 'GEMINI_BREAKER_FAILURE_RATE', 0.5),
+                slow_call_seconds=getattr(settings, 'GEMINI_BREAKER_SLOW_CALL_SECONDS', 20.0),
+                slow_rate_threshold=getattr(settings, 'GEMINI_BREAKER_SLOW_RATE', 0.5),
+                open_seconds=getattr(settings, 'GEMINI_BREAKER_OPEN_SECONDS', 30.0),
+                half_open_probes=getattr(settings, 'GEMINI_BREAKER_HALF_OPEN_PROBES', 1),
+                probe_successes=getattr(settings, 'GEMINI_BREAKER_PROBE_SUCCESSES', 2),
+            )
+        return _breaker
+
+
+def reset_circuit_breaker():
+    global _breaker
+    with _breaker_lock:
+        _breaker = None
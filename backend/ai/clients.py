@@ -0,0 +1,396 @@
+"""
+Process-wide Gemini client registry for PolicyBridge AI
+
+``genai.configure`` and ``GenerativeModel`` construction happen once per
+process instead of once per request; the configured models (and the HTTP
+connections they hold) are shared by every request thread. The registry can
+be reconfigured at runtime with ``configure()`` or ``reset()``.
+
+All model calls go through ``generate_content()`` (or its asyncio and
+streaming twins ``agenerate_content()`` and ``stream_content()``), which sit in front of the model's own
+``generate_content``, routes calls made with the default model to the
+cheapest model that suits the endpoint (see ``ai.router``), serves repeat
+prompts from the persistent response cache, paces the remaining calls through the shared rate limiter and fails
+fast through the circuit breaker while the backend is unhealthy. The call
+itself goes out through the transport selected by LLM_TRANSPORT (real API,
+local fake server, or cassette record/replay; see ``ai.transports``).
+"""
+import asyncio
+import logging
+import threading
+import time
+import google.generativeai as genai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from . import llm_cache, router, single_flight
+from .rate_limit import get_rate_limiter, reset_rate_limiter, is_rate_limit_error
+from .tokens import TokenUsage, estimate_tokens, usage_from_response
+from .circuit_breaker import get_circuit_breaker, reset_circuit_breaker
+from .transports import get_transport, reset_transport
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClientRegistry:
+    """
+    Thread-safe, lazily initialized holder for Gemini models and the services
+    built on them.
+
+    Lookups of already-built models and services take no lock; construction
+    is serialized so concurrent first requests build each object only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._api_key = None
+        self._model_name = None
+        self._loaded = False
+        self._configured = False
+        self._models = {}
+        self._services = {}
+        self.last_error = None
+
+    def _load_settings(self):
+        if not self._loaded:
+            self._api_key = settings.GEMINI_API_KEY
+            self._model_name = settings.GEMINI_MODEL
+            self._loaded = True
+
+    @property
+    def api_key(self):
+        with self._lock:
+            self._load_settings()
+            return self._api_key
+
+    @property
+    def model_name(self):
+        with self._lock:
+            self._load_settings()
+            return self._model_name
+
+    def configure(self, api_key=None, model_name=None):
+        """
+        Replace the API key and/or default model.
+
+        Arguments left as None are re-read from settings. Models and services
+        built with the previous configuration are dropped.
+        """
+        with self._lock:
+            self._api_key = api_key if api_key is not None else settings.GEMINI_API_KEY
+            self._model_name = model_name or settings.GEMINI_MODEL
+            self._loaded = True
+            self._configured = False
+            self._models.clear()
+            self._services.clear()
+            self.last_error = None
+        logger.info(f"Gemini client registry configured with model: {self._model_name}")
+
+    def reset(self):
+        """Drop all clients; the next lookup re-reads settings"""
+        with self._lock:
+            self._loaded = False
+            self._configured = False
+            self._models.clear()
+            self._services.clear()
+            self.last_error = None
+
+    def get_model(self, model_name=None):
+        """
+        Return the shared GenerativeModel for ``model_name`` (default model if
+        omitted), or None when no API key is set or initialization failed.
+        """
+        model_name = model_name or self.model_name
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if model_name in self._models:
+                return self._models[model_name]
+
+            self._load_settings()
+            if not self._api_key:
+                return None
+
+            try:
+                if not self._configured:
+                    genai.configure(api_key=self._api_key)
+                    self._configured = True
+                model = genai.GenerativeModel(model_name)
+                logger.info(f"Gemini client initialized with model: {model_name}")
+            except Exception as e:
+                logger.error(f"Failed to initialize Gemini model {model_name}: {e}")
+                self.last_error = e
+                model = None
+
+            # Failures are cached too, so a bad key is not retried on every request
+            self._models[model_name] = model
+            return model
+
+    def get_service(self, service_class):
+        """Return the process-wide instance of ``service_class``"""
+        service = self._services.get(service_class)
+        if service is not None:
+            return service
+
+        with self._lock:
+            if service_class not in self._services:
+                self._services[service_class] = service_class()
+            return self._services[service_class]
+
+
+class LLMResponse:
+    """
+    Text of a model response, whether it was served from the cache or shared
+    from an identical concurrent call, the tokens it cost (zero for both), and
+    the model that produced it with the router's reason for choosing it
+    """
+
+    def __init__(self, text, cached=False, raw=None, usage=None, coalesced=False, model_name='', route=None):
+        self.text = text
+        self.cached = cached
+        self.raw = raw
+        self.usage = usage or TokenUsage()
+        self.coalesced = coalesced
+        self.model_name = model_name
+        self.route = route
+
+    @property
+    def routing_reason(self):
+        return self.route.reason if self.route else ''
+
+    def __repr__(self):
+        return f"<LLMResponse {self.model_name} cached={self.cached} chars={len(self.text or '')}>"
+
+
+def _call_model(model, contents, kwargs):
+    """
+    Call the model once capacity is available, retrying 429s with the
+    limiter's shared jittered backoff up to GEMINI_MAX_RETRIES times.
+
+    Raises CircuitOpenError straight away while the circuit breaker is open.
+    """
+    limiter = get_rate_limiter()
+    breaker = get_circuit_breaker()
+    prompt_tokens = estimate_tokens(contents)
+    attempt = 0
+    while True:
+        breaker.check()
+        limiter.acquire(prompt_tokens)
+        try:
+            with breaker.guard():
+                return get_transport().generate(model, contents, kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= limiter.max_retries:
+                raise
+            time.sleep(limiter.backoff(attempt))
+            attempt += 1
+
+
+async def _acall_model(model, contents, kwargs):
+    """Async variant of _call_model"""
+    limiter = get_rate_limiter()
+    breaker = get_circuit_breaker()
+    prompt_tokens = estimate_tokens(contents)
+    attempt = 0
+    while True:
+        breaker.check()
+        await limiter.aacquire(prompt_tokens)
+        try:
+            with breaker.guard():
+                return await get_transport().agenerate(model, contents, kwargs)
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt >= limiter.max_retries:
+                raise
+            delay = await sync_to_async(limiter.backoff, thread_sensitive=False)(attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def _debit_output_tokens(usage):
+    """Charge the response's output tokens against the TPM bucket"""
+    try:
+        get_rate_limiter().consume_tokens(usage.output_tokens)
+    except Exception as e:
+        logger.warning(f"Failed to record Gemini output tokens: {e}")
+
+
+_registry = GeminiClientRegistry()
+
+
+def get_client_registry():
+    return _registry
+
+
+@receiver(setting_changed)
+def _reset_on_setting_change(setting, **kwargs):
+    if setting in ('GEMINI_API_KEY', 'GEMINI_MODEL'):
+        _registry.reset()
+        router.reset_router()
+    elif setting in ('GEMINI_RPM', 'GEMINI_TPM', 'GEMINI_MAX_RETRIES', 'GEMINI_RETRY_BASE_DELAY', 'GEMINI_RATE_LIMIT_DB'):
+        reset_rate_limiter()
+    elif setting.startswith('GEMINI_ROUTE') or setting == 'GEMINI_LATENCY_TARGETS':
+        router.reset_router()
+    elif setting.startswith('GEMINI_BREAKER_'):
+        reset_circuit_breaker()
+    elif setting in ('LLM_TRANSPORT', 'LLM_FAKE_SERVER_URL', 'LLM_CASSETTE_DIR', 'LLM_REPLAY_LATENCY'):
+        reset_transport()
+
+
+def _bare_model_name(model_name):
+    return (model_name or '').split('/')[-1]
+
+
+def _route(model, contents, endpoint):
+    """
+    Swap the default model for the router's choice for this call.
+
+    Returns ``(model, model_name, decision)``. Models other than the default
+    were asked for explicitly and are left alone.
+    """
+    default_name = _registry.model_name
+    model_name = _bare_model_name(getattr(model, 'model_name', '')) or default_name
+    if not router.is_enabled() or model_name != _bare_model_name(default_name):
+        return model, model_name, None
+
+    decision = router.get_router().route(endpoint, estimate_tokens(contents))
+    chosen_name = _bare_model_name(decision.model_name)
+    if chosen_name == model_name:
+        return model, model_name, decision
+
+    routed = _registry.get_model(chosen_name)
+    if routed is None:
+        return model, model_name, router.RoutingDecision(model_name, f'{chosen_name} unavailable, kept default')
+    logger.debug(f"Routed {endpoint} to {chosen_name}: {decision.reason}")
+    return routed, chosen_name, decision
+
+
+def _observe_latency(model_name, started, usage):
+    router.get_router().observe(model_name, time.monotonic() - started, usage.input_tokens)
+
+
+def generate_content(model, contents, endpoint, generation_config=None, use_cache=True):
+    """
+    Send ``contents`` to ``model`` and return an LLMResponse.
+
+    When ``model`` is the default model, the router may pick a cheaper or
+    faster one for ``endpoint`` (see ``ai.router``). Responses are cached by
+    (model name, normalized prompt, generation config) unless ``use_cache``
+    is False or the endpoint is listed in LLM_CACHE_DISABLED_ENDPOINTS.
+    Identical calls already in flight (in this or another process) are
+    waited for and share that call's text. Errors from the model propagate
+    unchanged.
+    """
+    model, model_name, route = _route(model, contents, endpoint)
+    caching = use_cache and llm_cache.is_enabled(endpoint)
+    key = llm_cache.make_cache_key(model_name, contents, generation_config)
+
+    if caching:
+        cached_text = llm_cache.lookup(key, endpoint)
+        if cached_text is not None:
+            return LLMResponse(cached_text, cached=True, model_name=model_name, route=route)
+
+    kwargs = {'generation_config': generation_config} if generation_config else {}
+    owned = {}
+
+    def call():
+        started = time.monotonic()
+        response = _call_model(model, contents, kwargs)
+        text = response.text
+        usage = usage_from_response(response, contents, text)
+        _observe_latency(model_name, started, usage)
+        _debit_output_tokens(usage)
+        if caching:
+            llm_cache.store(key, endpoint, model_name, text)
+        owned.update(response=response, usage=usage)
+        return text
+
+    text = single_flight.run('generate_content', key, call)
+    if not owned:
+        return LLMResponse(text, coalesced=True, model_name=model_name, route=route)
+    return LLMResponse(text, raw=owned['response'], usage=owned['usage'], model_name=model_name, route=route)
+
+
+async def agenerate_content(model, contents, endpoint, generation_config=None, use_cache=True):
+    """
+    Asyncio variant of generate_content().
+
+    The model call is awaited on the event loop, so an ASGI worker can hold
+    many in-flight requests without a thread each; only the cache lookups
+    run in the ORM thread.
+    """
+    model, model_name, route = _route(model, contents, endpoint)
+    caching = use_cache and llm_cache.is_enabled(endpoint)
+    key = llm_cache.make_cache_key(model_name, contents, generation_config)
+
+    if caching:
+        cached_text = await sync_to_async(llm_cache.lookup)(key, endpoint)
+        if cached_text is not None:
+            return LLMResponse(cached_text, cached=True, model_name=model_name, route=route)
+
+    kwargs = {'generation_config': generation_config} if generation_config else {}
+    owned = {}
+
+    async def call():
+        started = time.monotonic()
+        response = await _acall_model(model, contents, kwargs)
+        text = response.text
+        usage = usage_from_response(response, contents, text)
+        _observe_latency(model_name, started, usage)
+        await sync_to_async(_debit_output_tokens, thread_sensitive=False)(usage)
+        if caching:
+            await sync_to_async(llm_cache.store)(key, endpoint, model_name, text)
+        owned.update(response=response, usage=usage)
+        return text
+
+    text = await single_flight.arun('generate_content', key, call)
+    if not owned:
+        return LLMResponse(text, coalesced=True, model_name=model_name, route=route)
+    return LLMResponse(text, raw=owned['response'], usage=owned['usage'], model_name=model_name, route=route)
+
+
+def stream_content(model, contents, endpoint, generation_config=None, use_cache=True, on_response=None):
+    """
+    Streaming variant of generate_content(): yields response text chunks as
+    the model produces them.
+
+    A cache hit is yielded as a single chunk; a completed stream is stored in
+    the cache like a regular response. ``on_response`` is called with the
+    complete LLMResponse (text, token usage, model) once the stream ends.
+    """
+    model, model_name, route = _route(model, contents, endpoint)
+    caching = use_cache and llm_cache.is_enabled(endpoint)
+
+    if caching:
+        key = llm_cache.make_cache_key(model_name, contents, generation_config)
+        cached_text = llm_cache.lookup(key, endpoint)
+        if cached_text is not None:
+            yield cached_text
+            if on_response:
+                on_response(LLMResponse(cached_text, cached=True, model_name=model_name, route=route))
+            return
+
+    kwargs = {'generation_config': generation_config} if generation_config else {}
+    started = time.monotonic()
+    response = _call_model(model, contents, dict(kwargs, stream=True))
+    chunks = []
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks carrying only finish metadata have no text parts
+            continue
+        if text:
+            chunks.append(text)
+            yield text
+
+    text = ''.join(chunks)
+    usage = usage_from_response(response, contents, text)
+    _observe_latency(model_name, started, usage)
+    _debit_output_tokens(usage)
+    if caching:
+        llm_cache.store(key, endpoint, model_name, text)
+    if on_response:
+        on_response(LLMResponse(text, raw=response, usage=usage, model_name=model_name, route=route))
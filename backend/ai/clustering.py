@@ -0,0 +1,262 @@
+"""
+Incremental policy clustering for PolicyBridge AI
+
+Policies are segmented with MiniBatchKMeans over their stored features: the
+document's vector in the corpus TF-IDF space plus its scaled risk,
+efficiency and length scores. ``manage.py fit_clusters`` (or the first
+``update_clusters`` job once there are enough policies) fits the model on
+the whole corpus; afterwards each newly extracted policy is folded in with
+``partial_fit`` by a background job instead of re-clustering everything.
+The cluster of every policy is stored in PolicyCluster, so "similar
+policies" only ranks the members of one cluster.
+
+The model lives in the corpus TF-IDF vector space, so it is refit from
+scratch whenever the TF-IDF model is.
+"""
+import logging
+import math
+import os
+import tempfile
+import joblib
+import numpy as np
+from scipy.sparse import csr_matrix
+from django.conf import settings
+from django.utils import timezone
+from sklearn.cluster import MiniBatchKMeans
+from policies.models import Policy
+from .corpus_tfidf import get_corpus_model
+from .feature_store import get_policy_features, cosine_similarity
+from .jobs import enqueue
+from .models import Job, PolicyCluster
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the saved payload layout changes; older files are ignored
+MODEL_VERSION = 1
+
+# Weight of the risk, efficiency and length columns next to the unit-length TF-IDF vector
+NUMERIC_WEIGHT = 0.5
+NUMERIC_FEATURES = 3
+
+
+class PolicyClusterModel:
+    """A MiniBatchKMeans model and the TF-IDF model whose vector space it clusters"""
+
+    def __init__(self, kmeans, tfidf_version, fitted_at, samples_seen):
+        self.kmeans = kmeans
+        self.tfidf_version = tfidf_version
+        self.fitted_at = fitted_at
+        self.samples_seen = samples_seen
+
+    @property
+    def version(self):
+        """Identifies the full fit that defined the cluster ids"""
+        return self.fitted_at.isoformat()
+
+    @property
+    def n_clusters(self):
+        return self.kmeans.n_clusters
+
+
+def model_path():
+    return str(getattr(settings, 'CLUSTER_MODEL_PATH', settings.BASE_DIR / 'ml_models' / 'policy_clusters.joblib'))
+
+
+def save(model, path=None):
+    """Write the model atomically, so readers never load a partial file"""
+    path = path or model_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    payload = {
+        'version': MODEL_VERSION,
+        'kmeans': model.kmeans,
+        'tfidf_version': model.tfidf_version,
+        'fitted_at': model.fitted_at,
+        'samples_seen': model.samples_seen,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        joblib.dump(payload, handle)
+    os.replace(tmp_path, path)
+
+
+def load(path=None):
+    """Load the saved model, or None if there is none (or it is from an older version)"""
+    path = path or model_path()
+    try:
+        payload = joblib.load(path)
+    except FileNotFoundError:
+        return None
+    if payload.get('version') != MODEL_VERSION:
+        logger.warning(f"Ignoring cluster model {path} with version {payload.get('version')}; run fit_clusters")
+        return None
+    return PolicyClusterModel(payload['kmeans'], payload['tfidf_version'], payload['fitted_at'], payload['samples_seen'])
+
+
+def _clusterable_policies():
+    return (Policy.objects.filter(extraction__extraction_status='completed')
+            .exclude(extraction__extracted_text='')
+            .select_related('extraction'))
+
+
+def _numeric_features(features):
+    word_count = features.text_features.get('word_count', 0)
+    return [
+        features.risk_score / 100.0,
+        features.efficiency_score / 100.0,
+        min(1.0, math.log1p(word_count) / 10.0),
+    ]
+
+
+def build_matrix(policies, corpus_model):
+    """
+    Sparse feature matrix for ``policies``: TF-IDF columns followed by the
+    weighted numeric columns. Returns ``(matrix, policies_kept)``; policies
+    without text or without a vector from ``corpus_model`` are left out.
+    """
+    version = corpus_model.fitted_at.isoformat()
+    dimension = corpus_model.vocabulary_size
+    indices, values, indptr, kept = [], [], [0], []
+    for policy in policies:
+        features = get_policy_features(policy)
+        if features is None or features.tfidf_vector.get('model') != version:
+            continue
+        indices.extend(features.tfidf_vector['indices'])
+        values.extend(features.tfidf_vector['values'])
+        indices.extend(range(dimension, dimension + NUMERIC_FEATURES))
+        values.extend(NUMERIC_WEIGHT * value for value in _numeric_features(features))
+        indptr.append(len(indices))
+        kept.append(policy)
+    matrix = csr_matrix(
+        (np.array(values, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+        shape=(len(kept), dimension + NUMERIC_FEATURES),
+    )
+    return matrix, kept
+
+
+def _assign(model, matrix, policies):
+    """Store the nearest cluster of each policy"""
+    if not policies:
+        return
+    labels = model.kmeans.predict(matrix)
+    distances = model.kmeans.transform(matrix)[np.arange(len(policies)), labels]
+    for policy, label, distance in zip(policies, labels, distances):
+        PolicyCluster.objects.update_or_create(policy=policy, defaults={
+            'cluster': int(label),
+            'distance': round(float(distance), 6),
+            'model_version': model.version,
+        })
+
+
+def fit_clusters(n_clusters=None):
+    """
+    Fit on every policy with extracted text, save, and assign all clusters.
+    Returns the model, or None without a TF-IDF model or with fewer than two policies.
+    """
+    corpus_model = get_corpus_model()
+    if corpus_model is None:
+        return None
+    matrix, policies = build_matrix(_clusterable_policies().iterator(), corpus_model)
+    n_clusters = min(n_clusters or getattr(settings, 'CLUSTER_COUNT', 8), len(policies))
+    if n_clusters < 2:
+        return None
+
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_clusters,
+        batch_size=getattr(settings, 'CLUSTER_BATCH_SIZE', 256),
+        n_init=3,
+        random_state=0,
+    )
+    kmeans.fit(matrix)
+    model = PolicyClusterModel(kmeans, corpus_model.fitted_at.isoformat(), timezone.now(), len(policies))
+    save(model)
+    _assign(model, matrix, policies)
+    logger.info(f"Clustered {len(policies)} policies into {n_clusters} clusters")
+    return model
+
+
+def update_clusters():
+    """
+    Fold policies without a cluster from the current model into it with
+    ``partial_fit`` and assign them, batch by batch until none are left.
+    Falls back to ``fit_clusters`` when there is no model yet or the TF-IDF
+    model has been refit since. Returns ``(model, policies_updated)``.
+    """
+    corpus_model = get_corpus_model()
+    if corpus_model is None:
+        return None, 0
+    model = load()
+    if model is None or model.tfidf_version != corpus_model.fitted_at.isoformat():
+        model = fit_clusters()
+        return model, model.samples_seen if model else 0
+
+    batch_size = getattr(settings, 'CLUSTER_BATCH_SIZE', 256)
+    updated = 0
+    while True:
+        pending = list(_clusterable_policies().exclude(cluster__model_version=model.version)[:batch_size])
+        if not pending:
+            break
+        matrix, policies = build_matrix(pending, corpus_model)
+        if not policies:
+            break
+        model.kmeans.partial_fit(matrix)
+        model.samples_seen += len(policies)
+        save(model)
+        _assign(model, matrix, policies)
+        updated += len(policies)
+        if len(policies) < len(pending):
+            # The rest have no vector in this TF-IDF space yet
+            break
+    return model, updated
+
+
+def schedule_update():
+    """Enqueue an update_clusters job unless one is already pending; returns the job or None"""
+    if Job.objects.filter(job_type='update_clusters', status__in=('queued', 'running')).exists():
+        return None
+    return enqueue('update_clusters')
+
+
+def portfolio_clusters(user):
+    """The user's policies grouped by cluster, closest to the centroid first"""
+    rows = (PolicyCluster.objects.filter(policy__user=user)
+            .order_by('cluster', 'distance')
+            .values_list('cluster', 'policy_id', 'policy__name', 'distance'))
+    clusters = {}
+    for cluster, policy_id, name, distance in rows:
+        clusters.setdefault(cluster, []).append({
+            'policy_id': policy_id,
+            'policy_name': name,
+            'distance': distance,
+        })
+    return [
+        {'cluster': cluster, 'size': len(members), 'policies': members}
+        for cluster, members in clusters.items()
+    ]
+
+
+def similar_policies(policy, limit=10):
+    """
+    The user's other policies in ``policy``'s cluster, most similar first,
+    as ``[(policy, similarity), ...]``; None if the policy has no cluster yet.
+    """
+    try:
+        assignment = policy.cluster
+    except PolicyCluster.DoesNotExist:
+        return None
+
+    target = get_policy_features(policy)
+    if target is None:
+        return None
+    members = (Policy.objects.filter(user=policy.user, cluster__cluster=assignment.cluster,
+                                     cluster__model_version=assignment.model_version)
+               .exclude(id=policy.id)
+               .select_related('extraction'))
+    scored = []
+    for member in members:
+        features = get_policy_features(member)
+        similarity = cosine_similarity(target.tfidf_vector, features.tfidf_vector) if features else None
+        if similarity is not None:
+            scored.append((member, similarity))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
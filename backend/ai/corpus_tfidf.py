@@ -0,0 +1,188 @@
+"""
+Corpus-level TF-IDF model for PolicyBridge AI
+
+Policy similarity is measured in one vector space fitted on the whole policy
+corpus (``manage.py fit_tfidf``), so IDF weights reflect how common a term is
+across all policies rather than across the two documents being compared.
+The fitted vectorizer is saved to TFIDF_MODEL_PATH and loaded lazily by each
+process; requests only call ``transform``. When the corpus has grown by
+TFIDF_REFIT_DRIFT since the last fit, a background ``fit_tfidf`` job refits it
+and every process picks up the new file.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+import joblib
+from django.conf import settings
+from django.utils import timezone
+from sklearn.feature_extraction.text import TfidfVectorizer
+from policies.models import PolicyExtraction
+from .jobs import enqueue
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the saved payload layout changes; older files are ignored
+MODEL_VERSION = 1
+
+# Seconds between checks of the model file (and corpus drift) per process
+RELOAD_INTERVAL = 60
+
+
+class CorpusTfidfModel:
+    """A fitted vectorizer and the size of the corpus it was fitted on"""
+
+    def __init__(self, vectorizer, document_count, fitted_at):
+        self.vectorizer = vectorizer
+        self.document_count = document_count
+        self.fitted_at = fitted_at
+
+    def transform(self, texts):
+        return self.vectorizer.transform(texts)
+
+    @property
+    def vocabulary_size(self):
+        return len(self.vectorizer.vocabulary_)
+
+
+def model_path():
+    return str(getattr(settings, 'TFIDF_MODEL_PATH', settings.BASE_DIR / 'ml_models' / 'policy_tfidf.joblib'))
+
+
+def corpus_texts():
+    """Extracted text of every ingested policy, one entry per distinct document"""
+    seen = set()
+    rows = PolicyExtraction.objects.filter(extraction_status='completed').exclude(extracted_text='')
+    for policy_id, content_hash, text in rows.values_list('policy_id', 'policy__document_blob_id', 'extracted_text').iterator():
+        key = content_hash or policy_id
+        if key not in seen:
+            seen.add(key)
+            yield text
+
+
+def corpus_size():
+    """Number of documents corpus_texts() yields"""
+    rows = PolicyExtraction.objects.filter(extraction_status='completed').exclude(extracted_text='')
+    hashed = rows.filter(policy__document_blob__isnull=False).values('policy__document_blob_id').distinct().count()
+    return hashed + rows.filter(policy__document_blob__isnull=True).count()
+
+
+def fit(texts, max_features=None):
+    """Fit a CorpusTfidfModel on ``texts``"""
+    texts = list(texts)
+    vectorizer = TfidfVectorizer(
+        max_features=max_features or getattr(settings, 'TFIDF_MAX_FEATURES', 5000),
+        stop_words='english',
+        ngram_range=(1, 2),
+        sublinear_tf=True,
+    )
+    vectorizer.fit(texts)
+    return CorpusTfidfModel(vectorizer, len(texts), timezone.now())
+
+
+def save(model, path=None):
+    """Write the model atomically, so processes never load a partial file"""
+    path = path or model_path()
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    payload = {
+        'version': MODEL_VERSION,
+        'vectorizer': model.vectorizer,
+        'document_count': model.document_count,
+        'fitted_at': model.fitted_at,
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        joblib.dump(payload, handle)
+    os.replace(tmp_path, path)
+
+
+def load(path=None):
+    """Load a saved model, or None if there is none (or it is from an older version)"""
+    path = path or model_path()
+    try:
+        payload = joblib.load(path)
+    except FileNotFoundError:
+        return None
+    if payload.get('version') != MODEL_VERSION:
+        logger.warning(f"Ignoring TF-IDF model {path} with version {payload.get('version')}; run fit_tfidf")
+        return None
+    return CorpusTfidfModel(payload['vectorizer'], payload['document_count'], payload['fitted_at'])
+
+
+def fit_corpus(max_features=None):
+    """Fit on the current policy corpus and save; returns the model, or None for an empty corpus"""
+    texts = list(corpus_texts())
+    if not texts:
+        return None
+    model = fit(texts, max_features=max_features)
+    save(model)
+    reset_corpus_model()
+    logger.info(f"Fitted TF-IDF model on {model.document_count} documents ({model.vocabulary_size} features)")
+    return model
+
+
+def is_drifted(model, current_size=None):
+    """Whether the corpus has grown by TFIDF_REFIT_DRIFT (a fraction) since ``model`` was fitted"""
+    current_size = corpus_size() if current_size is None else current_size
+    if model is None:
+        return current_size > 0
+    threshold = getattr(settings, 'TFIDF_REFIT_DRIFT', 0.25)
+    return current_size - model.document_count >= max(1, threshold * model.document_count)
+
+
+def schedule_refit():
+    """Enqueue a fit_tfidf job unless one is already pending; returns the job or None"""
+    if Job.objects.filter(job_type='fit_tfidf', status__in=('queued', 'running')).exists():
+        return None
+    return enqueue('fit_tfidf')
+
+
+_model = None
+_model_mtime = None
+_checked_at = 0.0
+_model_lock = threading.Lock()
+
+
+def get_corpus_model():
+    """
+    Return this process's CorpusTfidfModel, or None until ``fit_tfidf`` has run.
+
+    At most every RELOAD_INTERVAL seconds the file is re-read if it changed,
+    and a refit is scheduled if the corpus has drifted.
+    """
+    global _model, _model_mtime, _checked_at
+    now = time.monotonic()
+    if now - _checked_at < RELOAD_INTERVAL:
+        return _model
+
+    with _model_lock:
+        if now - _checked_at < RELOAD_INTERVAL:
+            return _model
+        _checked_at = now
+        path = model_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if mtime != _model_mtime:
+            _model = load(path) if mtime is not None else None
+            _model_mtime = mtime
+        model = _model
+
+    try:
+        if model is not None and is_drifted(model):
+            schedule_refit()
+    except Exception as e:
+        logger.warning(f"TF-IDF drift check failed: {e}")
+    return model
+
+
+def reset_corpus_model():
+    global _model, _model_mtime, _checked_at
+    with _model_lock:
+        _model = None
+        _model_mtime = None
+        _checked_at = 0.0
@@ -0,0 +1,154 @@
+"""
+Local stand-in for the Gemini API, for load and latency benchmarking
+
+Serves ``POST /generate`` for FakeServerTransport with latencies drawn from a
+configurable distribution, injected 429 / 5xx errors and newline-delimited
+streaming, so the backend's concurrency behaviour (rate limiting, circuit
+breaker, single-flight, worker pools) can be exercised on a laptop with no
+network and no quota. Started with ``manage.py fake_gemini_server``.
+"""
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+FILLER_WORDS = (
+    "coverage premium deductible exclusion waiting period claim settlement "
+    "sum assured rider co-pay network hospital renewal benefit policyholder"
+).split()
+
+EXTRACTION_RESPONSE = {
+    "validation": {"isInsurancePolicy": True, "confidence": 0.9, "reason": "Fake server response"},
+    "summary": {"plainEnglish": "Simulated policy summary from the fake Gemini server."},
+    "financials": {},
+    "mlInsights": {},
+    "extractionQuality": {"score": 0.5},
+}
+
+
+class FakeGeminiConfig:
+    """Behaviour of the fake server; all latencies are in seconds"""
+
+    def __init__(self, distribution='lognormal', latency=1.0, jitter=0.5, error_rate=0.0,
+                 rate_limit_rate=0.0, response_tokens=200, chunk_words=8, chunk_delay=0.05, seed=None):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'")
+        self.distribution = distribution
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.response_tokens = response_tokens
+        self.chunk_words = chunk_words
+        self.chunk_delay = chunk_delay
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self):
+        with self._lock:
+            if self.distribution == 'fixed':
+                value = self.latency
+            elif self.distribution == 'uniform':
+                value = self._random.uniform(self.latency - self.jitter, self.latency + self.jitter)
+            elif self.distribution == 'normal':
+                value = self._random.gauss(self.latency, self.jitter)
+            elif self.distribution == 'exponential':
+                value = self._random.expovariate(1.0 / self.latency) if self.latency > 0 else 0
+            else:
+                # Long right tail, like real LLM latencies; ``latency`` is the median
+                value = self.latency * self._random.lognormvariate(0, self.jitter) if self.latency > 0 else 0
+        return max(0.0, value)
+
+    def sample_error(self):
+        """HTTP status of an injected error, or None"""
+        with self._lock:
+            roll = self._random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 503
+        return None
+
+    def response_text(self, prompt):
+        if 'JSON' in prompt:
+            return json.dumps(EXTRACTION_RESPONSE)
+        # Deterministic per prompt, so repeated prompts get repeatable answers
+        rng = random.Random(prompt)
+        return ' '.join(rng.choice(FILLER_WORDS) for _ in range(self.response_tokens))
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    server_version = 'FakeGemini/1.0'
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/generate':
+            self._send_json(404, {'error': 'Not found'})
+            return
+
+        config = self.server.config
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'Invalid JSON body'})
+            return
+
+        prompt = request.get('prompt', '')
+        time.sleep(config.sample_latency())
+
+        error_status = config.sample_error()
+        if error_status == 429:
+            self._send_json(429, {'error': 'Resource exhausted: simulated quota exceeded'})
+            return
+        if error_status:
+            self._send_json(error_status, {'error': 'Simulated backend failure'})
+            return
+
+        text = config.response_text(prompt)
+        usage = {
+            'prompt_token_count': estimate_tokens(prompt),
+            'candidates_token_count': estimate_tokens(text),
+        }
+
+        if not request.get('stream'):
+            self._send_json(200, {'text': text, 'usage': usage})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.end_headers()
+        words = text.split(' ')
+        for start in range(0, len(words), config.chunk_words):
+            chunk = ' '.join(words[start:start + config.chunk_words])
+            if start:
+                chunk = ' ' + chunk
+            self.wfile.write(json.dumps({'text': chunk}).encode('utf-8') + b'\n')
+            self.wfile.flush()
+            time.sleep(config.chunk_delay)
+        self.wfile.write(json.dumps({'usage': usage}).encode('utf-8') + b'\n')
+
+
+def make_server(host, port, config):
+    server = ThreadingHTTPServer((host, port), FakeGeminiHandler)
+    server.daemon_threads = True
+    server.config = config
+    return server
@@ -0,0 +1,108 @@
+"""
+Per-policy ML feature store for PolicyBridge AI
+
+The per-policy half of an ML comparison (text features, heuristic term
+counts, coverage keywords, risk and efficiency scores, and the document's
+vector in the corpus TF-IDF space) is computed once when a policy's text is
+extracted and stored in PolicyFeatures, keyed by the SHA-256 of the text, so
+policies with identical text share one row. Rows are recomputed when
+FEATURE_SCHEMA_VERSION changes; the TF-IDF vector alone is recomputed after
+the corpus model is refit. A comparison then only combines two stored rows.
+"""
+import hashlib
+import logging
+from django.db import IntegrityError
+from policies.ingestion import get_policy_text
+from .corpus_tfidf import get_corpus_model
+from .ml_comparison import MLPolicyComparison
+from .models import PolicyFeatures
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever MLPolicyComparison.analyze_policy changes what it computes
+FEATURE_SCHEMA_VERSION = 1
+
+_ml = MLPolicyComparison()
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _model_version(model):
+    return model.fitted_at.isoformat()
+
+
+def _vectorize(text, model):
+    """The text's L2-normalized TF-IDF vector in sparse form, tagged with the model it came from"""
+    if model is None:
+        return {}
+    vector = model.transform([text])
+    return {
+        'model': _model_version(model),
+        'indices': vector.indices.tolist(),
+        'values': [round(float(value), 6) for value in vector.data],
+    }
+
+
+def get_features(text):
+    """Return the up-to-date PolicyFeatures row for ``text``, computing it if needed"""
+    key = text_hash(text)
+    model = get_corpus_model()
+    row = PolicyFeatures.objects.filter(text_hash=key).first()
+
+    if row is None or row.schema_version != FEATURE_SCHEMA_VERSION:
+        defaults = dict(_ml.analyze_policy(text), schema_version=FEATURE_SCHEMA_VERSION,
+                        tfidf_vector=_vectorize(text, model))
+        try:
+            row, _ = PolicyFeatures.objects.update_or_create(text_hash=key, defaults=defaults)
+        except IntegrityError:
+            # Another process stored the same text first
+            row = PolicyFeatures.objects.get(text_hash=key)
+        return row
+
+    if model is not None and row.tfidf_vector.get('model') != _model_version(model):
+        row.tfidf_vector = _vectorize(text, model)
+        row.save(update_fields=['tfidf_vector', 'updated_at'])
+    return row
+
+
+def get_policy_features(policy):
+    """PolicyFeatures for a policy's stored text, or None when it has no text"""
+    text = get_policy_text(policy)
+    return get_features(text) if text else None
+
+
+def cosine_similarity(vector1, vector2):
+    """Cosine similarity of two stored vectors, or None if they come from different models"""
+    if not vector1 or not vector2 or vector1.get('model') != vector2.get('model'):
+        return None
+    weights = dict(zip(vector1['indices'], vector1['values']))
+    return float(sum(weights.get(index, 0.0) * value for index, value in zip(vector2['indices'], vector2['values'])))
+
+
+def _analysis(row):
+    return {
+        'text_features': row.text_features,
+        'coverage_keywords': row.coverage_keywords,
+        'risk_score': row.risk_score,
+        'efficiency_score': row.efficiency_score,
+    }
+
+
+def compare_policies(policy1, policy2):
+    """MLPolicyComparison result for two policies, from their stored features"""
+    try:
+        features1 = get_policy_features(policy1)
+        features2 = get_policy_features(policy2)
+        if features1 is None or features2 is None:
+            raise ValueError('Both policies need extracted text for an ML comparison')
+
+        similarity = cosine_similarity(features1.tfidf_vector, features2.tfidf_vector)
+        if similarity is None:
+            similarity = _ml.calculate_similarity_score(get_policy_text(policy1), get_policy_text(policy2))
+        return _ml.combine_analyses(_analysis(features1), _analysis(features2), similarity)
+
+    except Exception as e:
+        logger.error(f"Error in ML comparison: {e}")
+        return _ml.error_result(e)
@@ -0,0 +1,156 @@
+"""
+Database-backed background job queue for PolicyBridge AI
+
+Slow extraction and LLM work is enqueued as a Job row by the web process and
+executed by ``manage.py run_worker``, so web workers are not held for the full
+Gemini round trip. Handlers are registered with ``@job_handler`` in
+``ai/tasks.py``.
+"""
+import logging
+import os
+import socket
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed"""
+
+
+def job_handler(job_type):
+    """Register a function as the handler for ``job_type`` jobs"""
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue(job_type, payload=None, user=None, max_attempts=None):
+    """Create a queued job and return it"""
+    job = Job.objects.create(
+        user=user,
+        job_type=job_type,
+        payload=payload or {},
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+    )
+    logger.info(f"Enqueued {job_type} job {job.id}")
+    return job
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def requeue_stale_jobs():
+    """Requeue running jobs locked for longer than JOB_LOCK_TIMEOUT (crashed worker)"""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT', 600))
+    count = Job.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued', locked_by='', locked_at=None
+    )
+    if count:
+        logger.warning(f"Requeued {count} stale jobs")
+    return count
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically claim the oldest runnable job.
+
+    The conditional UPDATE only succeeds for one worker per job, so several
+    worker processes can poll the same table without double-processing.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        status='queued', run_after__lte=now
+    ).order_by('run_after', 'id').values_list('id', flat=True)[:10]
+
+    for job_id in candidates:
+        claimed = Job.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Execute a claimed job, recording its result or scheduling a retry"""
+    handler = _handlers.get(job.job_type)
+    if handler is None:
+        _finish(job, 'failed', error_message=f"No handler registered for job type: {job.job_type}")
+        return job
+
+    start_time = time.time()
+    try:
+        result = handler(job)
+        _finish(job, 'succeeded', result=result)
+        logger.info(f"Job {job.id} ({job.job_type}) succeeded in {time.time() - start_time:.2f}s")
+
+    except PermanentJobError as e:
+        _finish(job, 'failed', error_message=str(e))
+        logger.error(f"Job {job.id} ({job.job_type}) failed permanently: {e}")
+
+    except Exception as e:
+        if job.attempts < job.max_attempts:
+            backoff = getattr(settings, 'JOB_RETRY_BACKOFF', 5) * (2 ** (job.attempts - 1))
+            job.status = 'queued'
+            job.error_message = str(e)
+            job.run_after = timezone.now() + timedelta(seconds=backoff)
+            job.locked_by = ''
+            job.locked_at = None
+            job.save(update_fields=['status', 'error_message', 'run_after', 'locked_by', 'locked_at', 'updated_at'])
+            logger.warning(f"Job {job.id} ({job.job_type}) attempt {job.attempts} failed, retrying in {backoff}s: {e}")
+        else:
+            _finish(job, 'failed', error_message=str(e))
+            logger.error(f"Job {job.id} ({job.job_type}) failed after {job.attempts} attempts: {e}")
+
+    return job
+
+
+def _finish(job, status, result=None, error_message=''):
+    job.status = status
+    job.result = result
+    job.error_message = error_message
+    job.finished_at = timezone.now()
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'result', 'error_message', 'finished_at', 'locked_by', 'locked_at', 'updated_at'])
+
+
+def work(worker_id=None, poll_interval=1.0, burst=False, should_stop=None):
+    """
+    Process jobs until stopped.
+
+    With ``burst`` the loop exits once the queue is empty. ``should_stop`` is
+    an optional callable checked between jobs for graceful shutdown.
+    """
+    worker_id = worker_id or default_worker_id()
+    logger.info(f"Worker {worker_id} started")
+    processed = 0
+
+    while not (should_stop and should_stop()):
+        close_old_connections()
+        requeue_stale_jobs()
+        job = claim_next_job(worker_id)
+        if job is None:
+            if burst:
+                break
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+
+    logger.info(f"Worker {worker_id} stopped after {processed} jobs")
+    return processed
@@ -0,0 +1,89 @@
+"""
+Shared keyword scanner for the rule-based policy heuristics
+
+The keyword, risk, efficiency and coverage heuristics in ``ml_comparison``
+and ``views`` all read from one term-count vector per document: the text is
+lowercased once and every term of every vocabulary below is counted in the
+same call, instead of each heuristic lowercasing the document again and
+probing it keyword by keyword.
+
+Counts are substring occurrences, as the heuristics have always used them
+('policy' also counts inside 'policyholder').
+"""
+
+# ml_comparison.MLPolicyComparison
+COVERAGE_KEYWORDS = [
+    'coverage', 'covered', 'benefits', 'deductible', 'premium', 'policy',
+    'insurance', 'claim', 'damage', 'loss', 'medical', 'hospital', 'doctor',
+    'prescription', 'medication', 'surgery', 'emergency', 'accident',
+    'liability', 'property', 'vehicle', 'home', 'life', 'health'
+]
+HIGH_RISK_WORDS = ['exclude', 'exclusion', 'limitation', 'restriction', 'not covered', 'void']
+LOW_RISK_WORDS = ['comprehensive', 'full coverage', 'guaranteed', 'unlimited', 'all inclusive']
+COST_KEYWORDS = ['deductible', 'premium', 'cost', 'price', 'fee', 'charge']
+VALUE_KEYWORDS = ['benefit', 'coverage', 'protection', 'security', 'guarantee']
+
+# views: fallback policy details
+HIGH_RISK_TERMS = ['high risk', 'dangerous', 'hazardous', 'excluded', 'not covered', 'void']
+MEDIUM_RISK_TERMS = ['moderate', 'standard', 'normal', 'typical', 'average']
+LOW_RISK_TERMS = ['low risk', 'safe', 'protected', 'comprehensive', 'full coverage']
+COVERAGE_SCORE_TERMS = [
+    'comprehensive', 'full coverage', 'additional riders', 'endorsements', 'umbrella', 'excess',
+    'excluded', 'not covered', 'limited'
+]
+COST_POSITION_TERMS = [
+    'discount', 'reduced', 'competitive', 'market rate', 'premium', 'high',
+    'leading', 'top', 'standard', 'exclusive'
+]
+OPTIMIZATION_TERMS = ['bundle', 'annual review', 'good standing', 'riders', 'endorsements']
+
+VOCABULARY = tuple(dict.fromkeys(
+    COVERAGE_KEYWORDS + HIGH_RISK_WORDS + LOW_RISK_WORDS + COST_KEYWORDS + VALUE_KEYWORDS
+    + HIGH_RISK_TERMS + MEDIUM_RISK_TERMS + LOW_RISK_TERMS + COVERAGE_SCORE_TERMS
+    + COST_POSITION_TERMS + OPTIMIZATION_TERMS
+))
+
+
+class TermCounts(dict):
+    """Occurrences of each vocabulary term in one document"""
+
+    def count(self, term):
+        try:
+            return self[term]
+        except KeyError:
+            raise KeyError(f"'{term}' is not in the keyword scanner vocabulary")
+
+    def has(self, term):
+        return self.count(term) > 0
+
+    def has_any(self, terms):
+        return any(self.count(term) for term in terms)
+
+    def total(self, terms):
+        return sum(self.count(term) for term in terms)
+
+    def present(self, terms):
+        """``{term: count}`` for the ``terms`` that occur"""
+        return {term: self.count(term) for term in terms if self.count(term)}
+
+
+class KeywordScanner:
+    """Counts a fixed vocabulary of lowercase terms in documents"""
+
+    def __init__(self, terms):
+        self.terms = tuple(dict.fromkeys(term.lower() for term in terms))
+
+    def scan(self, text):
+        # str.count runs in C; over a whole policy it beats a per-character
+        # automaton loop in Python by a wide margin, so the single pass that
+        # matters is the shared lowercase and the shared result
+        text_lower = (text or '').lower()
+        return TermCounts((term, text_lower.count(term)) for term in self.terms)
+
+
+_scanner = KeywordScanner(VOCABULARY)
+
+
+def scan(text):
+    """TermCounts of every heuristic vocabulary term in ``text``"""
+    return _scanner.scan(text)
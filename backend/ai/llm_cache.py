@@ -0,0 +1,140 @@
+"""
+Persistent Gemini response cache for PolicyBridge AI
+
+Responses are stored in the database keyed by a SHA-256 of (model name,
+normalized prompt, generation config), so every gunicorn worker and job
+worker shares them. Entries expire after LLM_CACHE_TTL seconds and the least
+recently used entries are evicted beyond LLM_CACHE_MAX_ENTRIES. Endpoints
+listed in LLM_CACHE_DISABLED_ENDPOINTS always go to the model.
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import F
+from django.utils import timezone
+from .models import LLMCacheEntry, LLMCacheStats
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(contents):
+    """
+    Canonical text form of a prompt: whitespace runs are collapsed so prompts
+    that differ only in formatting share an entry. Multi-turn message lists
+    are serialized as JSON.
+    """
+    if not isinstance(contents, str):
+        contents = json.dumps(contents, sort_keys=True, default=str)
+    return ' '.join(contents.split())
+
+
+def make_cache_key(model_name, contents, generation_config=None):
+    config = json.dumps(generation_config or {}, sort_keys=True, default=str)
+    material = '\x1f'.join([model_name, normalize_prompt(contents), config])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def is_enabled(endpoint):
+    if not getattr(settings, 'LLM_CACHE_ENABLED', True):
+        return False
+    return endpoint not in getattr(settings, 'LLM_CACHE_DISABLED_ENDPOINTS', [])
+
+
+def record_lookup(endpoint, hit):
+    """Increment the hit or miss counter for ``endpoint``"""
+    field = 'hits' if hit else 'misses'
+    try:
+        updated = LLMCacheStats.objects.filter(endpoint=endpoint).update(**{field: F(field) + 1})
+        if not updated:
+            LLMCacheStats.objects.create(endpoint=endpoint, **{field: 1})
+    except IntegrityError:
+        LLMCacheStats.objects.filter(endpoint=endpoint).update(**{field: F(field) + 1})
+    except Exception as e:
+        logger.warning(f"Failed to update LLM cache stats: {e}")
+
+
+def lookup(key, endpoint):
+    """Return the cached response text for ``key``, or None on a miss"""
+    now = timezone.now()
+    try:
+        entry = LLMCacheEntry.objects.filter(key=key, expires_at__gt=now).only('response_text').first()
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e}")
+        return None
+
+    if entry is None:
+        record_lookup(endpoint, hit=False)
+        return None
+
+    LLMCacheEntry.objects.filter(pk=entry.pk).update(hit_count=F('hit_count') + 1, last_accessed_at=now)
+    record_lookup(endpoint, hit=True)
+    logger.info(f"LLM cache hit for {endpoint} ({key[:12]})")
+    return entry.response_text
+
+
+def store(key, endpoint, model_name, response_text):
+    """Store a response, then evict expired and least recently used entries"""
+    if not response_text:
+        return
+    now = timezone.now()
+    try:
+        LLMCacheEntry.objects.update_or_create(
+            key=key,
+            defaults={
+                'model_name': model_name,
+                'endpoint': endpoint,
+                'response_text': response_text,
+                'expires_at': now + timedelta(seconds=getattr(settings, 'LLM_CACHE_TTL', 7 * 24 * 3600)),
+                'last_accessed_at': now,
+            }
+        )
+        evict()
+    except Exception as e:
+        logger.warning(f"Failed to store LLM cache entry: {e}")
+
+
+def evict():
+    """Drop expired entries and trim the cache to LLM_CACHE_MAX_ENTRIES"""
+    deleted, _ = LLMCacheEntry.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    max_entries = getattr(settings, 'LLM_CACHE_MAX_ENTRIES', 5000)
+    overflow = LLMCacheEntry.objects.count() - max_entries
+    if overflow > 0:
+        stale_ids = list(
+            LLMCacheEntry.objects.order_by('last_accessed_at').values_list('id', flat=True)[:overflow]
+        )
+        deleted += LLMCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+
+    if deleted:
+        logger.info(f"Evicted {deleted} LLM cache entries")
+    return deleted
+
+
+def clear():
+    LLMCacheEntry.objects.all().delete()
+    LLMCacheStats.objects.all().delete()
+
+
+def stats():
+    """Per-endpoint hit/miss counters plus totals"""
+    endpoints = {
+        row.endpoint: {
+            'hits': row.hits,
+            'misses': row.misses,
+            'hit_rate': round(row.hit_rate, 4),
+            'miss_rate': round(1 - row.hit_rate, 4) if row.hits + row.misses else 0.0,
+        }
+        for row in LLMCacheStats.objects.all()
+    }
+    hits = sum(row['hits'] for row in endpoints.values())
+    misses = sum(row['misses'] for row in endpoints.values())
+    return {
+        'entries': LLMCacheEntry.objects.count(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        'endpoints': endpoints,
+    }
@@ -0,0 +1,76 @@
+"""
+Measure end-to-end LLM call throughput and latency
+"""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from ai.clients import get_client_registry, generate_content
+from ai.circuit_breaker import get_circuit_breaker
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent requests through the LLM client stack (rate limiter, circuit breaker, '
+        'single-flight, transport) and report throughput and latency percentiles'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Total number of calls')
+        parser.add_argument('--concurrency', type=int, default=10, help='Calls in flight at once')
+        parser.add_argument('--endpoint', default='benchmark', help='Endpoint name recorded for the calls')
+        parser.add_argument('--prompt', default='Explain what a deductible is in two sentences.',
+                            help='Base prompt; each call gets a unique suffix unless --duplicate is set')
+        parser.add_argument('--duplicate', action='store_true',
+                            help='Send the identical prompt every time (exercises single-flight and the cache)')
+        parser.add_argument('--use-cache', action='store_true', help='Allow responses from the LLM cache')
+
+    def handle(self, *args, **options):
+        model = get_client_registry().get_model()
+        if model is None:
+            raise CommandError('No Gemini model available; set GEMINI_API_KEY (any value works with the fake transport)')
+
+        run_id = uuid.uuid4().hex[:8]
+
+        def one_call(index):
+            prompt = options['prompt'] if options['duplicate'] else f"{options['prompt']} [{run_id}-{index}]"
+            started = time.monotonic()
+            try:
+                response = generate_content(model, prompt, options['endpoint'], use_cache=options['use_cache'])
+                outcome = 'coalesced' if response.coalesced else 'cached' if response.cached else 'ok'
+            except Exception as e:
+                outcome = type(e).__name__
+            finally:
+                close_old_connections()
+            return outcome, time.monotonic() - started
+
+        self.stdout.write(
+            f"{options['requests']} calls at concurrency {options['concurrency']} "
+            f"over the {getattr(settings, 'LLM_TRANSPORT', 'gemini')} transport"
+        )
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as pool:
+            results = list(pool.map(one_call, range(options['requests'])))
+        elapsed = time.monotonic() - started
+
+        outcomes = {}
+        for outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = [latency for outcome, latency in results if outcome in ('ok', 'cached', 'coalesced')]
+
+        self.stdout.write(f"Wall time {elapsed:.2f}s, throughput {len(results) / elapsed:.1f} calls/s")
+        self.stdout.write(
+            f"Latency p50 {_percentile(latencies, 0.5):.3f}s, p95 {_percentile(latencies, 0.95):.3f}s, "
+            f"p99 {_percentile(latencies, 0.99):.3f}s, max {max(latencies, default=0):.3f}s"
+        )
+        self.stdout.write("Outcomes: " + ', '.join(f"{name} {count}" for name, count in sorted(outcomes.items())))
+        self.stdout.write(f"Circuit breaker: {get_circuit_breaker().state}")
@@ -0,0 +1,49 @@
+"""
+Run a local stand-in for the Gemini API
+"""
+from django.core.management.base import BaseCommand
+from ai.fake_server import FakeGeminiConfig, make_server, LATENCY_DISTRIBUTIONS
+
+
+class Command(BaseCommand):
+    help = 'Serve simulated Gemini responses for LLM_TRANSPORT=fake (load and latency benchmarking)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--distribution', choices=LATENCY_DISTRIBUTIONS, default='lognormal',
+                            help='Latency distribution')
+        parser.add_argument('--latency', type=float, default=1.0, help='Mean (median for lognormal) latency in seconds')
+        parser.add_argument('--jitter', type=float, default=0.5,
+                            help='Spread: half-width (uniform), std dev (normal) or sigma (lognormal)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+        parser.add_argument('--response-tokens', type=int, default=200, help='Words per generated response')
+        parser.add_argument('--chunk-words', type=int, default=8, help='Words per streamed chunk')
+        parser.add_argument('--chunk-delay', type=float, default=0.05, help='Seconds between streamed chunks')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs')
+
+    def handle(self, *args, **options):
+        config = FakeGeminiConfig(
+            distribution=options['distribution'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            response_tokens=options['response_tokens'],
+            chunk_words=options['chunk_words'],
+            chunk_delay=options['chunk_delay'],
+            seed=options['seed'],
+        )
+        server = make_server(options['host'], options['port'], config)
+        self.stdout.write(
+            f"Fake Gemini server on http://{options['host']}:{options['port']} "
+            f"({config.distribution} latency ~{config.latency}s, {config.error_rate:.0%} errors, "
+            f"{config.rate_limit_rate:.0%} rate limited)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
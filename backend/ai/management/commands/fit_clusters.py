@@ -0,0 +1,28 @@
+"""
+Fit the policy clustering model used for portfolio segmentation
+"""
+from django.core.management.base import BaseCommand
+from ai import clustering
+
+
+class Command(BaseCommand):
+    help = 'Cluster all ingested policies with MiniBatchKMeans and save the model to CLUSTER_MODEL_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clusters', type=int, default=None, help='Number of clusters (default CLUSTER_COUNT)')
+        parser.add_argument('--update', action='store_true',
+                            help='Only fold unclustered policies into the existing model')
+
+    def handle(self, *args, **options):
+        if options['update']:
+            model, updated = clustering.update_clusters()
+        else:
+            model = clustering.fit_clusters(n_clusters=options['clusters'])
+            updated = model.samples_seen if model else 0
+
+        if model is None:
+            self.stderr.write("Clustering needs a fitted TF-IDF model (run fit_tfidf) and at least two policies")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Clustered {updated} policies into {model.n_clusters} clusters: {clustering.model_path()}"
+        ))
@@ -0,0 +1,30 @@
+"""
+Fit the corpus-level TF-IDF model used for policy similarity
+"""
+from django.core.management.base import BaseCommand
+from ai import corpus_tfidf
+
+
+class Command(BaseCommand):
+    help = 'Fit the TF-IDF vectorizer on all ingested policy text and save it to TFIDF_MODEL_PATH'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--if-drifted', action='store_true',
+                            help='Only refit when the corpus has grown by TFIDF_REFIT_DRIFT since the last fit')
+        parser.add_argument('--max-features', type=int, default=None, help='Vocabulary size (default TFIDF_MAX_FEATURES)')
+
+    def handle(self, *args, **options):
+        if options['if_drifted']:
+            current = corpus_tfidf.load()
+            size = corpus_tfidf.corpus_size()
+            if not corpus_tfidf.is_drifted(current, size):
+                self.stdout.write(f"Corpus of {size} documents has not drifted since the last fit; nothing to do")
+                return
+
+        model = corpus_tfidf.fit_corpus(max_features=options['max_features'])
+        if model is None:
+            self.stderr.write("No ingested policy text to fit on; run ingest_policies first")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Fitted on {model.document_count} documents, {model.vocabulary_size} features: {corpus_tfidf.model_path()}"
+        ))
@@ -0,0 +1,31 @@
+"""
+Inspect and maintain the LLM response cache
+"""
+from django.core.management.base import BaseCommand
+from ai import llm_cache
+
+
+class Command(BaseCommand):
+    help = 'Show LLM response cache statistics, evict stale entries or clear the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evict', action='store_true', help='Drop expired entries and trim to LLM_CACHE_MAX_ENTRIES')
+        parser.add_argument('--clear', action='store_true', help='Delete all cached responses and counters')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            llm_cache.clear()
+            self.stdout.write(self.style.SUCCESS("LLM cache cleared"))
+            return
+
+        if options['evict']:
+            deleted = llm_cache.evict()
+            self.stdout.write(self.style.SUCCESS(f"Evicted {deleted} entries"))
+
+        stats = llm_cache.stats()
+        self.stdout.write(
+            f"{stats['entries']} entries, {stats['hits']} hits, {stats['misses']} misses "
+            f"(hit rate {stats['hit_rate']:.1%})"
+        )
+        for endpoint, row in sorted(stats['endpoints'].items()):
+            self.stdout.write(f"  {endpoint}: {row['hits']} hits, {row['misses']} misses ({row['hit_rate']:.1%})")
@@ -0,0 +1,71 @@
+"""
+Run background job workers
+"""
+import multiprocessing
+import signal
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_main(index, poll_interval, burst):
+    """Entry point for one worker process"""
+    import django
+    django.setup()
+
+    from ai import tasks  # noqa: F401 - registers job handlers
+    from ai.jobs import work, default_worker_id
+
+    stopping = {'value': False}
+
+    def _stop(signum, frame):
+        stopping['value'] = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    work(
+        worker_id=f"{default_worker_id()}-{index}",
+        poll_interval=poll_interval,
+        burst=burst,
+        should_stop=lambda: stopping['value'],
+    )
+
+
+class Command(BaseCommand):
+    help = 'Process queued extraction and LLM jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        self.stdout.write(f"Starting {workers} job worker(s)")
+
+        if workers == 1:
+            _worker_main(0, options['poll_interval'], options['burst'])
+            return
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(index, options['poll_interval'], options['burst']),
+                name=f"job-worker-{index}",
+            )
+            for index in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+
+        self.stdout.write(self.style.SUCCESS("Job workers stopped"))
@@ -0,0 +1,42 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0004_conversation_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(max_length=50, verbose_name='Job Type')),
+                ('payload', models.JSONField(default=dict, verbose_name='Payload')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20, verbose_name='Status')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Result')),
+                ('error_message', models.TextField(blank=True, verbose_name='Error Message')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('max_attempts', models.PositiveIntegerField(default=3, verbose_name='Max Attempts')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Run After')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Locked By')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Locked At')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Job',
+                'verbose_name_plural': 'Jobs',
+                'db_table': 'ai_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='ai_jobs_status_fd2b9b_idx'), models.Index(fields=['user', 'created_at'], name='ai_jobs_user_id_681272_idx')],
+            },
+        ),
+    ]
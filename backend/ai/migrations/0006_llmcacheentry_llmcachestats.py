@@ -0,0 +1,46 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0005_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Cache Key')),
+                ('model_name', models.CharField(max_length=100, verbose_name='Model Name')),
+                ('endpoint', models.CharField(max_length=100, verbose_name='Endpoint')),
+                ('response_text', models.TextField(verbose_name='Response Text')),
+                ('hit_count', models.PositiveIntegerField(default=0, verbose_name='Hit Count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+                ('last_accessed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Last Accessed At')),
+            ],
+            options={
+                'verbose_name': 'LLM Cache Entry',
+                'verbose_name_plural': 'LLM Cache Entries',
+                'db_table': 'ai_llm_cache',
+            },
+        ),
+        migrations.CreateModel(
+            name='LLMCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=100, unique=True, verbose_name='Endpoint')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='Hits')),
+                ('misses', models.PositiveIntegerField(default=0, verbose_name='Misses')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'LLM Cache Stats',
+                'verbose_name_plural': 'LLM Cache Stats',
+                'db_table': 'ai_llm_cache_stats',
+            },
+        ),
+    ]
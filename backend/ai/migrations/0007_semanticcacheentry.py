@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0006_llmcacheentry_llmcachestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SemanticCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=50, verbose_name='Namespace')),
+                ('question', models.TextField(verbose_name='Normalized Question')),
+                ('answer', models.TextField(verbose_name='Answer')),
+                ('hit_count', models.PositiveIntegerField(default=0, verbose_name='Hit Count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('last_hit_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Last Hit At')),
+            ],
+            options={
+                'verbose_name': 'Semantic Cache Entry',
+                'verbose_name_plural': 'Semantic Cache Entries',
+                'db_table': 'ai_semantic_cache',
+                'indexes': [models.Index(fields=['namespace', 'last_hit_at'], name='ai_semantic_namespa_9bb609_idx')],
+            },
+        ),
+    ]
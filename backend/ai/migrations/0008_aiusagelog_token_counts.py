@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0007_semanticcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiusagelog',
+            name='input_tokens',
+            field=models.PositiveIntegerField(default=0, verbose_name='Input Tokens'),
+        ),
+        migrations.AddField(
+            model_name='aiusagelog',
+            name='output_tokens',
+            field=models.PositiveIntegerField(default=0, verbose_name='Output Tokens'),
+        ),
+        migrations.AddField(
+            model_name='aiusagelog',
+            name='tokens_estimated',
+            field=models.BooleanField(default=False, verbose_name='Token Counts Estimated'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0008_aiusagelog_token_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InFlightCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Call Key')),
+                ('operation', models.CharField(max_length=50, verbose_name='Operation')),
+                ('owner', models.CharField(max_length=100, verbose_name='Owner')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('done', 'Done')], default='running', max_length=20, verbose_name='Status')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Result')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+            ],
+            options={
+                'verbose_name': 'In-Flight Call',
+                'verbose_name_plural': 'In-Flight Calls',
+                'db_table': 'ai_inflight_calls',
+            },
+        ),
+    ]
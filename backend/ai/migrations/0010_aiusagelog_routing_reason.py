@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0009_inflightcall'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiusagelog',
+            name='routing_reason',
+            field=models.CharField(blank=True, max_length=200, verbose_name='Routing Reason'),
+        ),
+    ]
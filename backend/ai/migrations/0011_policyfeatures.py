@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0010_aiusagelog_routing_reason'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyFeatures',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_hash', models.CharField(max_length=64, unique=True, verbose_name='Text SHA-256')),
+                ('schema_version', models.PositiveIntegerField(verbose_name='Feature Schema Version')),
+                ('text_features', models.JSONField(default=dict, verbose_name='Text Features')),
+                ('term_counts', models.JSONField(default=dict, verbose_name='Term Counts')),
+                ('coverage_keywords', models.JSONField(default=dict, verbose_name='Coverage Keywords')),
+                ('risk_score', models.IntegerField(verbose_name='Risk Score')),
+                ('efficiency_score', models.IntegerField(verbose_name='Efficiency Score')),
+                ('tfidf_vector', models.JSONField(blank=True, default=dict, verbose_name='TF-IDF Vector')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Policy Features',
+                'verbose_name_plural': 'Policy Features',
+                'db_table': 'ai_policy_features',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0002_initial'),
+        ('ai', '0011_policyfeatures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cluster', models.PositiveIntegerField(db_index=True, verbose_name='Cluster')),
+                ('distance', models.FloatField(verbose_name='Distance to Centroid')),
+                ('model_version', models.CharField(max_length=40, verbose_name='Clustering Model Version')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('policy', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cluster', to='policies.policy')),
+            ],
+            options={
+                'verbose_name': 'Policy Cluster',
+                'verbose_name_plural': 'Policy Clusters',
+                'db_table': 'ai_policy_clusters',
+            },
+        ),
+    ]
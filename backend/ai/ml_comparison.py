@@ -8,9 +8,10 @@ import math
 import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.cluster import KMeans
 from collections import Counter
 import logging
+from .corpus_tfidf import get_corpus_model
+from . import keyword_scanner
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,7 @@ class MLPolicyComparison:
     """Machine Learning based policy comparison without external AI"""
     
     def __init__(self):
+        # Only used until the corpus model has been fitted (manage.py fit_tfidf)
         self.vectorizer = TfidfVectorizer(
             max_features=1000,
             stop_words='english',
@@ -53,8 +55,13 @@ class MLPolicyComparison:
             if not text1 or not text2:
                 return 0.0
                 
-            # Vectorize texts
-            vectors = self.vectorizer.fit_transform([text1, text2])
+            # Vectorize texts in the corpus-wide vector space; fall back to
+            # fitting on the pair before a corpus model exists
+            corpus_model = get_corpus_model()
+            if corpus_model is not None:
+                vectors = corpus_model.transform([text1, text2])
+            else:
+                vectors = self.vectorizer.fit_transform([text1, text2])
             
             # Calculate cosine similarity
             similarity_matrix = cosine_similarity(vectors)
@@ -66,43 +73,24 @@ class MLPolicyComparison:
             logger.error(f"Error calculating similarity: {e}")
             return 0.0
     
-    def extract_coverage_keywords(self, text):
+    def extract_coverage_keywords(self, text, term_counts=None):
         """Extract coverage-related keywords and their frequencies"""
-        coverage_keywords = [
-            'coverage', 'covered', 'benefits', 'deductible', 'premium', 'policy',
-            'insurance', 'claim', 'damage', 'loss', 'medical', 'hospital', 'doctor',
-            'prescription', 'medication', 'surgery', 'emergency', 'accident',
-            'liability', 'property', 'vehicle', 'home', 'life', 'health'
-        ]
-        
-        text_lower = text.lower()
-        keyword_counts = {}
-        
-        for keyword in coverage_keywords:
-            count = text_lower.count(keyword)
-            if count > 0:
-                keyword_counts[keyword] = count
-        
-        return keyword_counts
+        term_counts = term_counts if term_counts is not None else keyword_scanner.scan(text)
+        return term_counts.present(keyword_scanner.COVERAGE_KEYWORDS)
     
-    def calculate_risk_score(self, text, keyword_counts):
+    def calculate_risk_score(self, text, keyword_counts, term_counts=None):
         """Calculate risk score based on policy content analysis"""
+        term_counts = term_counts if term_counts is not None else keyword_scanner.scan(text)
         risk_score = 50  # Base score
         
-        # Risk indicators
-        high_risk_words = ['exclude', 'exclusion', 'limitation', 'restriction', 'not covered', 'void']
-        low_risk_words = ['comprehensive', 'full coverage', 'guaranteed', 'unlimited', 'all inclusive']
-        
-        text_lower = text.lower()
-        
         # High risk indicators
-        for word in high_risk_words:
-            if word in text_lower:
+        for word in keyword_scanner.HIGH_RISK_WORDS:
+            if term_counts.has(word):
                 risk_score += 10
         
         # Low risk indicators
-        for word in low_risk_words:
-            if word in text_lower:
+        for word in keyword_scanner.LOW_RISK_WORDS:
+            if term_counts.has(word):
                 risk_score -= 10
         
         # Coverage breadth analysis
@@ -117,19 +105,14 @@ class MLPolicyComparison:
         
         return risk_score
     
-    def calculate_cost_efficiency(self, text):
+    def calculate_cost_efficiency(self, text, term_counts=None):
         """Calculate cost efficiency score based on policy content"""
+        term_counts = term_counts if term_counts is not None else keyword_scanner.scan(text)
         efficiency_score = 50  # Base score
         
-        # Cost-related keywords
-        cost_keywords = ['deductible', 'premium', 'cost', 'price', 'fee', 'charge']
-        value_keywords = ['benefit', 'coverage', 'protection', 'security', 'guarantee']
-        
-        text_lower = text.lower()
-        
         # Count cost vs value keywords
-        cost_count = sum(text_lower.count(keyword) for keyword in cost_keywords)
-        value_count = sum(text_lower.count(keyword) for keyword in value_keywords)
+        cost_count = term_counts.total(keyword_scanner.COST_KEYWORDS)
+        value_count = term_counts.total(keyword_scanner.VALUE_KEYWORDS)
         
         if value_count > 0:
             ratio = cost_count / value_count
@@ -143,80 +126,94 @@ class MLPolicyComparison:
         
         return efficiency_score
     
+    def analyze_policy(self, policy_text):
+        """
+        Per-policy half of a comparison: text features, heuristic term counts,
+        coverage keywords, risk and efficiency scores (JSON-serializable, see
+        ai.feature_store)
+        """
+        features = self.extract_text_features(policy_text)
+        features['avg_word_length'] = float(features.get('avg_word_length', 0))
+        term_counts = keyword_scanner.scan(policy_text)
+        keywords = self.extract_coverage_keywords(policy_text, term_counts)
+        return {
+            'text_features': features,
+            'term_counts': dict(term_counts),
+            'coverage_keywords': keywords,
+            'risk_score': self.calculate_risk_score(policy_text, keywords, term_counts),
+            'efficiency_score': self.calculate_cost_efficiency(policy_text, term_counts),
+        }
+    
     def compare_policies_ml(self, policy1_text, policy2_text, comparison_criteria):
         """Main ML-based policy comparison function"""
         try:
-            # Extract features
-            features1 = self.extract_text_features(policy1_text)
-            features2 = self.extract_text_features(policy2_text)
-            
-            # Calculate similarity
+            analysis1 = self.analyze_policy(policy1_text)
+            analysis2 = self.analyze_policy(policy2_text)
             similarity_score = self.calculate_similarity_score(policy1_text, policy2_text)
-            
-            # Extract coverage keywords
-            keywords1 = self.extract_coverage_keywords(policy1_text)
-            keywords2 = self.extract_coverage_keywords(policy2_text)
-            
-            # Calculate risk scores
-            risk_score1 = self.calculate_risk_score(policy1_text, keywords1)
-            risk_score2 = self.calculate_risk_score(policy2_text, keywords2)
-            
-            # Calculate cost efficiency
-            efficiency1 = self.calculate_cost_efficiency(policy1_text)
-            efficiency2 = self.calculate_cost_efficiency(policy2_text)
-            
-            # Overall comparison score
-            comparison_score = int((similarity_score * 0.3 + 
-                                  (100 - abs(risk_score1 - risk_score2)) * 0.3 + 
-                                  (100 - abs(efficiency1 - efficiency2)) * 0.4))
-            
-            # Generate ML insights
-            ml_insights = self._generate_ml_insights(
-                similarity_score, risk_score1, risk_score2, 
-                efficiency1, efficiency2, keywords1, keywords2
-            )
-            
-            # Generate detailed analysis
-            detailed_analysis = self._generate_detailed_analysis(
-                features1, features2, keywords1, keywords2,
-                risk_score1, risk_score2, efficiency1, efficiency2
-            )
-            
-            return {
-                'comparison_score': comparison_score,
-                'similarity_score': similarity_score,
-                'risk_analysis': {
-                    'policy1_risk': risk_score1,
-                    'policy2_risk': risk_score2,
-                    'risk_difference': abs(risk_score1 - risk_score2)
-                },
-                'efficiency_analysis': {
-                    'policy1_efficiency': efficiency1,
-                    'policy2_efficiency': efficiency2,
-                    'efficiency_difference': abs(efficiency1 - efficiency2)
-                },
-                'coverage_analysis': {
-                    'policy1_keywords': len(keywords1),
-                    'policy2_keywords': len(keywords2),
-                    'common_keywords': len(set(keywords1.keys()) & set(keywords2.keys())),
-                    'unique_keywords_policy1': len(set(keywords1.keys()) - set(keywords2.keys())),
-                    'unique_keywords_policy2': len(set(keywords2.keys()) - set(keywords1.keys()))
-                },
-                'ml_insights': ml_insights,
-                'detailed_analysis': detailed_analysis
-            }
+            return self.combine_analyses(analysis1, analysis2, similarity_score)
             
         except Exception as e:
             logger.error(f"Error in ML comparison: {e}")
-            return {
-                'comparison_score': 50,
-                'error': str(e),
-                'ml_insights': {
-                    'similarity_score': 0.5,
-                    'risk_assessment': 'Unable to assess',
-                    'confidence_level': 'Low'
-                }
+            return self.error_result(e)
+    
+    def combine_analyses(self, analysis1, analysis2, similarity_score):
+        """Compare two policies from their analyze_policy() results"""
+        features1, features2 = analysis1['text_features'], analysis2['text_features']
+        keywords1, keywords2 = analysis1['coverage_keywords'], analysis2['coverage_keywords']
+        risk_score1, risk_score2 = analysis1['risk_score'], analysis2['risk_score']
+        efficiency1, efficiency2 = analysis1['efficiency_score'], analysis2['efficiency_score']
+        
+        # Overall comparison score
+        comparison_score = int((similarity_score * 0.3 + 
+                              (100 - abs(risk_score1 - risk_score2)) * 0.3 + 
+                              (100 - abs(efficiency1 - efficiency2)) * 0.4))
+        
+        # Generate ML insights
+        ml_insights = self._generate_ml_insights(
+            similarity_score, risk_score1, risk_score2, 
+            efficiency1, efficiency2, keywords1, keywords2
+        )
+        
+        # Generate detailed analysis
+        detailed_analysis = self._generate_detailed_analysis(
+            features1, features2, keywords1, keywords2,
+            risk_score1, risk_score2, efficiency1, efficiency2
+        )
+        
+        return {
+            'comparison_score': comparison_score,
+            'similarity_score': similarity_score,
+            'risk_analysis': {
+                'policy1_risk': risk_score1,
+                'policy2_risk': risk_score2,
+                'risk_difference': abs(risk_score1 - risk_score2)
+            },
+            'efficiency_analysis': {
+                'policy1_efficiency': efficiency1,
+                'policy2_efficiency': efficiency2,
+                'efficiency_difference': abs(efficiency1 - efficiency2)
+            },
+            'coverage_analysis': {
+                'policy1_keywords': len(keywords1),
+                'policy2_keywords': len(keywords2),
+                'common_keywords': len(set(keywords1.keys()) & set(keywords2.keys())),
+                'unique_keywords_policy1': len(set(keywords1.keys()) - set(keywords2.keys())),
+                'unique_keywords_policy2': len(set(keywords2.keys()) - set(keywords1.keys()))
+            },
+            'ml_insights': ml_insights,
+            'detailed_analysis': detailed_analysis
+        }
+    
+    def error_result(self, e):
+        return {
+            'comparison_score': 50,
+            'error': str(e),
+            'ml_insights': {
+                'similarity_score': 0.5,
+                'risk_assessment': 'Unable to assess',
+                'confidence_level': 'Low'
             }
+        }
     
     def _generate_ml_insights(self, similarity, risk1, risk2, eff1, eff2, keywords1, keywords2):
         """Generate ML insights from comparison data"""
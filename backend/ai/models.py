@@ -1,8 +1,10 @@
 """
 AI models for PolicyBridge AI
 """
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -14,7 +16,11 @@ class AIUsageLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_usage_logs')
     endpoint = models.CharField(max_length=100, verbose_name='API Endpoint')
     tokens_used = models.PositiveIntegerField(verbose_name='Tokens Used')
+    input_tokens = models.PositiveIntegerField(default=0, verbose_name='Input Tokens')
+    output_tokens = models.PositiveIntegerField(default=0, verbose_name='Output Tokens')
+    tokens_estimated = models.BooleanField(default=False, verbose_name='Token Counts Estimated')
     model_used = models.CharField(max_length=50, verbose_name='AI Model Used')
+    routing_reason = models.CharField(max_length=200, blank=True, verbose_name='Routing Reason')
     processing_time = models.FloatField(verbose_name='Processing Time (seconds)')
     cost = models.DecimalField(max_digits=10, decimal_places=6, verbose_name='Cost (USD)')
     success = models.BooleanField(default=True, verbose_name='Request Successful')
@@ -114,3 +120,182 @@ class Message(models.Model):
     
     def __str__(self):
         return f"{self.message_type} message in {self.conversation.title} at {self.created_at}"
+
+
+class Job(models.Model):
+    """
+    Background job for extraction and LLM work, processed by the run_worker command
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    job_type = models.CharField(max_length=50, verbose_name='Job Type')
+    payload = models.JSONField(default=dict, verbose_name='Payload')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name='Status')
+    result = models.JSONField(null=True, blank=True, verbose_name='Result')
+    error_message = models.TextField(blank=True, verbose_name='Error Message')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Attempts')
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name='Max Attempts')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='Run After')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Locked By')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Locked At')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Finished At')
+    
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        db_table = 'ai_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.job_type} job {self.id} ({self.status})"
+
+
+class LLMCacheEntry(models.Model):
+    """
+    Cached Gemini response, shared by all worker processes through the database
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name='Cache Key')
+    model_name = models.CharField(max_length=100, verbose_name='Model Name')
+    endpoint = models.CharField(max_length=100, verbose_name='Endpoint')
+    response_text = models.TextField(verbose_name='Response Text')
+    hit_count = models.PositiveIntegerField(default=0, verbose_name='Hit Count')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Expires At')
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='Last Accessed At')
+    
+    class Meta:
+        verbose_name = 'LLM Cache Entry'
+        verbose_name_plural = 'LLM Cache Entries'
+        db_table = 'ai_llm_cache'
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.key[:12]} ({self.hit_count} hits)"
+
+
+class LLMCacheStats(models.Model):
+    """
+    Hit/miss counters for the LLM response cache, per endpoint
+    """
+    endpoint = models.CharField(max_length=100, unique=True, verbose_name='Endpoint')
+    hits = models.PositiveIntegerField(default=0, verbose_name='Hits')
+    misses = models.PositiveIntegerField(default=0, verbose_name='Misses')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        verbose_name = 'LLM Cache Stats'
+        verbose_name_plural = 'LLM Cache Stats'
+        db_table = 'ai_llm_cache_stats'
+    
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def __str__(self):
+        return f"{self.endpoint}: {self.hits} hits / {self.misses} misses"
+
+
+class SemanticCacheEntry(models.Model):
+    """
+    Question/answer pair served to near-identical questions by the semantic cache
+    """
+    namespace = models.CharField(max_length=50, verbose_name='Namespace')
+    question = models.TextField(verbose_name='Normalized Question')
+    answer = models.TextField(verbose_name='Answer')
+    hit_count = models.PositiveIntegerField(default=0, verbose_name='Hit Count')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    last_hit_at = models.DateTimeField(default=timezone.now, verbose_name='Last Hit At')
+    
+    class Meta:
+        verbose_name = 'Semantic Cache Entry'
+        verbose_name_plural = 'Semantic Cache Entries'
+        db_table = 'ai_semantic_cache'
+        indexes = [
+            models.Index(fields=['namespace', 'last_hit_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.namespace}: {self.question[:50]}"
+
+
+class InFlightCall(models.Model):
+    """
+    Cross-process single-flight claim: one row per operation currently being
+    computed, holding the result for a short while once it finishes
+    """
+    STATUS_CHOICES = [
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ]
+    
+    key = models.CharField(max_length=64, unique=True, verbose_name='Call Key')
+    operation = models.CharField(max_length=50, verbose_name='Operation')
+    owner = models.CharField(max_length=100, verbose_name='Owner')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running', verbose_name='Status')
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name='Result')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    expires_at = models.DateTimeField(db_index=True, verbose_name='Expires At')
+    
+    class Meta:
+        verbose_name = 'In-Flight Call'
+        verbose_name_plural = 'In-Flight Calls'
+        db_table = 'ai_inflight_calls'
+    
+    def __str__(self):
+        return f"{self.operation} {self.key[:12]} ({self.status})"
+
+
+class PolicyFeatures(models.Model):
+    """
+    Precomputed ML features of one document text, shared by every policy with
+    the same extracted text and recomputed when the feature schema changes
+    """
+    text_hash = models.CharField(max_length=64, unique=True, verbose_name='Text SHA-256')
+    schema_version = models.PositiveIntegerField(verbose_name='Feature Schema Version')
+    text_features = models.JSONField(default=dict, verbose_name='Text Features')
+    term_counts = models.JSONField(default=dict, verbose_name='Term Counts')
+    coverage_keywords = models.JSONField(default=dict, verbose_name='Coverage Keywords')
+    risk_score = models.IntegerField(verbose_name='Risk Score')
+    efficiency_score = models.IntegerField(verbose_name='Efficiency Score')
+    tfidf_vector = models.JSONField(default=dict, blank=True, verbose_name='TF-IDF Vector')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        verbose_name = 'Policy Features'
+        verbose_name_plural = 'Policy Features'
+        db_table = 'ai_policy_features'
+    
+    def __str__(self):
+        return f"Features {self.text_hash[:12]} (v{self.schema_version})"
+
+
+class PolicyCluster(models.Model):
+    """
+    Portfolio segment of a policy, assigned by the incremental clustering model
+    """
+    policy = models.OneToOneField('policies.Policy', on_delete=models.CASCADE, related_name='cluster')
+    cluster = models.PositiveIntegerField(db_index=True, verbose_name='Cluster')
+    distance = models.FloatField(verbose_name='Distance to Centroid')
+    model_version = models.CharField(max_length=40, verbose_name='Clustering Model Version')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        verbose_name = 'Policy Cluster'
+        verbose_name_plural = 'Policy Clusters'
+        db_table = 'ai_policy_clusters'
+    
+    def __str__(self):
+        return f"{self.policy.name} in cluster {self.cluster}"
@@ -0,0 +1,119 @@
+"""
+Portfolio-wide policy similarity for PolicyBridge AI
+
+All of a user's policy texts are transformed once into a sparse TF-IDF
+matrix (in the corpus vector space when ``fit_tfidf`` has run). Since rows
+are L2-normalized, the cosine-similarity matrix is a single sparse product,
+computed PORTFOLIO_SIMILARITY_CHUNK rows at a time so memory stays bounded
+for large portfolios. Only the top-k neighbours of each policy are kept.
+Results are cached until one of the user's policies changes.
+"""
+import hashlib
+import logging
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from sklearn.feature_extraction.text import TfidfVectorizer
+from policies.models import Policy, PolicyExtraction
+from .corpus_tfidf import get_corpus_model
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'portfolio_similarity'
+
+
+def _signature(user, model):
+    """Changes whenever a policy is added, edited, deleted or re-extracted, or the model is refit"""
+    policies = Policy.objects.filter(user=user).aggregate(
+        count=Count('id'),
+        last_id=Max('id'),
+        updated=Max('updated_at'),
+        text_length=Sum('extraction__text_length'),
+    )
+    fitted_at = model.fitted_at if model is not None else None
+    return hashlib.sha256(repr((sorted(policies.items()), fitted_at)).encode('utf-8')).hexdigest()
+
+
+def _vectorize(texts, model):
+    if model is not None:
+        return model.transform(texts), 'corpus'
+    # No corpus model yet: the portfolio itself is the corpus
+    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), sublinear_tf=True,
+                                 max_features=getattr(settings, 'TFIDF_MAX_FEATURES', 5000))
+    return vectorizer.fit_transform(texts), 'portfolio'
+
+
+def top_neighbors(matrix, top_k, min_score=0.0, chunk_size=None):
+    """
+    For each row of the L2-normalized sparse ``matrix``, the ``top_k`` most
+    similar other rows as ``[(column, score), ...]``, best first
+    """
+    count = matrix.shape[0]
+    top_k = min(top_k, count - 1)
+    if top_k <= 0:
+        return [[] for _ in range(count)]
+
+    chunk_size = chunk_size or getattr(settings, 'PORTFOLIO_SIMILARITY_CHUNK', 512)
+    transposed = matrix.T.tocsc()
+    neighbors = []
+    for start in range(0, count, chunk_size):
+        block = (matrix[start:start + chunk_size] @ transposed).toarray()
+        rows = np.arange(block.shape[0])
+        block[rows, rows + start] = -1.0  # a policy is not its own neighbour
+        candidates = np.argpartition(-block, top_k - 1, axis=1)[:, :top_k]
+        for row, columns in enumerate(candidates):
+            scores = block[row, columns]
+            order = np.argsort(-scores)
+            neighbors.append([
+                (int(columns[i]), float(scores[i])) for i in order if scores[i] > min_score
+            ])
+    return neighbors
+
+
+def portfolio_similarity(user, top_k=5, min_score=0.0):
+    """
+    Top-k most similar policies for every policy of ``user`` with extracted text.
+
+    Returns a dict with ``policies`` (each with its ``neighbors``), the
+    ``vector_space`` used and whether the result came from the cache.
+    """
+    model = get_corpus_model()
+    cache_key = f"{CACHE_PREFIX}:{user.id}:{top_k}:{min_score}:{_signature(user, model)}"
+    result = cache.get(cache_key)
+    if result is not None:
+        return dict(result, cached=True)
+
+    rows = list(
+        PolicyExtraction.objects.filter(policy__user=user, extraction_status='completed')
+        .exclude(extracted_text='')
+        .order_by('policy_id')
+        .values_list('policy_id', 'policy__name', 'extracted_text')
+    )
+    policies = []
+    vector_space = None
+    if rows:
+        matrix, vector_space = _vectorize([text for _, _, text in rows], model)
+        for (policy_id, name, _), neighbors in zip(rows, top_neighbors(matrix, top_k, min_score)):
+            policies.append({
+                'policy_id': policy_id,
+                'policy_name': name,
+                'neighbors': [
+                    {
+                        'policy_id': rows[column][0],
+                        'policy_name': rows[column][1],
+                        'similarity': round(score, 4),
+                    }
+                    for column, score in neighbors
+                ],
+            })
+
+    result = {
+        'policy_count': len(rows),
+        'pairs_compared': len(rows) * (len(rows) - 1) // 2,
+        'vector_space': vector_space,
+        'policies': policies,
+    }
+    cache.set(cache_key, result, getattr(settings, 'PORTFOLIO_SIMILARITY_CACHE_TTL', 24 * 3600))
+    logger.info(f"Computed {len(rows)}x{len(rows)} policy similarity for user {user.id}")
+    return dict(result, cached=False)
@@ -0,0 +1,225 @@
+"""
+Outbound Gemini rate limiting for PolicyBridge AI
+
+A token bucket per limit (requests per minute and tokens per minute) is kept
+in a small SQLite file shared by every web and job worker process on the
+host, so together they stay under the account quota. Callers wait in line
+for capacity up to a deadline; a 429 from the API puts every process into a
+jittered exponential backoff instead of switching to mock responses.
+"""
+import asyncio
+import logging
+import random
+import sqlite3
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when capacity does not free up before the caller's deadline"""
+
+
+def is_rate_limit_error(error):
+    """Whether an exception from the Gemini client is a 429 / quota error"""
+    try:
+        from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+        if isinstance(error, (ResourceExhausted, TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    message = str(error).lower()
+    return '429' in message or 'quota' in message or 'resource exhausted' in message
+
+
+class RateLimiter:
+    """
+    Cross-process token buckets for requests and tokens per minute.
+
+    A limit of 0 disables that bucket. Each bucket holds up to one minute of
+    capacity and refills continuously, so short bursts are allowed as long as
+    the per-minute budget is respected.
+    """
+    COOLDOWN = 'cooldown'
+
+    def __init__(self, path, rpm, tpm, max_retries=3, base_delay=1.0, max_delay=60.0):
+        self.path = str(path)
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return bool(self.rpm or self.tpm)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS gemini_rate_limit '
+                '(name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def _level(self, conn, name, capacity, now):
+        row = conn.execute('SELECT level, updated_at FROM gemini_rate_limit WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            return capacity
+        level, updated_at = row
+        return min(capacity, level + (now - updated_at) * capacity / 60.0)
+
+    def _save(self, conn, name, level, now):
+        conn.execute(
+            'INSERT OR REPLACE INTO gemini_rate_limit (name, level, updated_at) VALUES (?, ?, ?)',
+            (name, level, now)
+        )
+
+    def try_acquire(self, tokens=0):
+        """
+        Take one request and ``tokens`` tokens if available.
+
+        Returns 0 on success, otherwise the number of seconds to wait before
+        capacity is expected to be available.
+        """
+        if not self.enabled:
+            return 0.0
+
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cooldown = conn.execute(
+                'SELECT level FROM gemini_rate_limit WHERE name = ?', (self.COOLDOWN,)
+            ).fetchone()
+            if cooldown and cooldown[0] > now:
+                conn.execute('ROLLBACK')
+                return cooldown[0] - now
+
+            wait = 0.0
+            requests_level = self._level(conn, 'requests', self.rpm, now) if self.rpm else 0
+            tokens_level = self._level(conn, 'tokens', self.tpm, now) if self.tpm else 0
+            if self.rpm and requests_level < 1:
+                wait = (1 - requests_level) * 60.0 / self.rpm
+            if self.tpm:
+                # A single prompt larger than the whole budget waits for a full bucket
+                needed = min(tokens, self.tpm)
+                if tokens_level < needed:
+                    wait = max(wait, (needed - tokens_level) * 60.0 / self.tpm)
+
+            if wait > 0:
+                conn.execute('ROLLBACK')
+                return wait
+
+            if self.rpm:
+                self._save(conn, 'requests', requests_level - 1, now)
+            if self.tpm:
+                self._save(conn, 'tokens', tokens_level - tokens, now)
+            conn.execute('COMMIT')
+            return 0.0
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def consume_tokens(self, tokens):
+        """Debit tokens after the fact (e.g. output tokens of a finished call)"""
+        if not self.tpm or tokens <= 0:
+            return
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._save(conn, 'tokens', self._level(conn, 'tokens', self.tpm, now) - tokens, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _deadline(self, timeout):
+        if timeout is None:
+            timeout = getattr(settings, 'GEMINI_RATE_LIMIT_TIMEOUT', 30)
+        return time.monotonic() + timeout
+
+    def acquire(self, tokens=0, timeout=None):
+        """Block until capacity is available or raise RateLimitTimeout"""
+        deadline = self._deadline(timeout)
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimitTimeout(f"Gemini rate limit: no capacity within {remaining:.1f}s")
+            # Jitter spreads out waiters so they don't retry in lockstep
+            time.sleep(wait + random.uniform(0, 0.05))
+
+    async def aacquire(self, tokens=0, timeout=None):
+        """Async variant of acquire; waits without blocking the event loop"""
+        deadline = self._deadline(timeout)
+        try_acquire = sync_to_async(self.try_acquire, thread_sensitive=False)
+        while True:
+            wait = await try_acquire(tokens)
+            if wait <= 0:
+                return
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                raise RateLimitTimeout(f"Gemini rate limit: no capacity within {remaining:.1f}s")
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+    def backoff(self, attempt):
+        """
+        Record a 429 and return the backoff delay for ``attempt`` (0-based).
+
+        The delay is exponential with jitter and is shared: every process
+        holds off until it has passed.
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = random.uniform(delay / 2, delay)
+        if not self.enabled:
+            return delay
+
+        conn = self._connection()
+        until = time.time() + delay
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT level FROM gemini_rate_limit WHERE name = ?', (self.COOLDOWN,)).fetchone()
+            if not row or row[0] < until:
+                self._save(conn, self.COOLDOWN, until, time.time())
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        logger.warning(f"Gemini rate limited, backing off {delay:.1f}s (attempt {attempt + 1})")
+        return delay
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the process-wide RateLimiter configured from settings"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                path=getattr(settings, 'GEMINI_RATE_LIMIT_DB', settings.BASE_DIR / 'gemini_rate_limit.sqlite3'),
+                rpm=getattr(settings, 'GEMINI_RPM', 0),
+                tpm=getattr(settings, 'GEMINI_TPM', 0),
+                max_retries=getattr(settings, 'GEMINI_MAX_RETRIES', 3),
+                base_delay=getattr(settings, 'GEMINI_RETRY_BASE_DELAY', 1.0),
+            )
+        return _limiter
+
+
+def reset_rate_limiter():
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
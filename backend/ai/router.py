@@ -0,0 +1,169 @@
+"""
+Cost- and latency-aware model routing for PolicyBridge AI
+
+Calls made with the default model are routed per request: each endpoint has
+a minimum model quality tier (a two-sentence chat answer doesn't need the
+model that writes full comparison tables), and among the models in
+GEMINI_ROUTER_MODELS that meet it and fit the prompt, the cheapest whose
+expected latency is within the endpoint's target wins. Expected latencies
+start from per-family priors and follow the latencies actually observed.
+GEMINI_ROUTE_OVERRIDES pins endpoints to a specific model.
+"""
+import logging
+import threading
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Model families by name marker, most specific first:
+# (marker, USD per 1K tokens, quality tier, base latency s, extra latency s per 1K prompt tokens)
+MODEL_FAMILIES = [
+    ('pro', 0.0075, 4, 6.0, 1.0),
+    ('lite', 0.00025, 1, 0.8, 0.15),
+    ('2.5', 0.0005, 3, 2.5, 0.4),
+    ('2.0', 0.0005, 2, 1.2, 0.25),
+]
+DEFAULT_FAMILY = ('flash', 0.0005, 2, 1.5, 0.3)
+
+# Minimum quality tier per endpoint; unlisted endpoints need the default model's tier
+ENDPOINT_QUALITY = {
+    'general_chat': 1,
+    'chat': 1,
+    'conversation': 1,
+    'policy_query': 2,
+    'policy_analysis': 2,
+    'policy_comparison_ml': 2,
+    'policy_comparison': 3,
+    'policy_comparison_gemini': 3,
+    'policy_comparison_streamlined': 3,
+    'policy_extraction': 3,
+}
+
+
+def model_family(model_name):
+    name = (model_name or '').lower()
+    for family in MODEL_FAMILIES:
+        if family[0] in name:
+            return family
+    return DEFAULT_FAMILY
+
+
+def price_per_1k(model_name):
+    """Approximate USD cost per 1K tokens for a model (adjust based on actual pricing)"""
+    return model_family(model_name)[1]
+
+
+class RoutingDecision:
+    """The model chosen for one call, and why"""
+
+    def __init__(self, model_name, reason, estimated_latency=0.0, estimated_cost=0.0):
+        self.model_name = model_name
+        self.reason = reason
+        self.estimated_latency = estimated_latency
+        self.estimated_cost = estimated_cost
+
+    def __repr__(self):
+        return f"<RoutingDecision {self.model_name}: {self.reason}>"
+
+
+class ModelRouter:
+    """Picks a model per call from endpoint, prompt size and latency/cost targets"""
+
+    def __init__(self, models, default_model, overrides=None, latency_targets=None, smoothing=0.2):
+        self.models = list(models) or [default_model]
+        self.default_model = default_model
+        self.overrides = overrides or {}
+        self.latency_targets = latency_targets or {}
+        self.smoothing = smoothing
+        self._observed = {}
+        self._lock = threading.Lock()
+
+    def estimate_latency(self, model_name, prompt_tokens):
+        _, _, _, base, per_1k = model_family(model_name)
+        with self._lock:
+            base = self._observed.get(model_name, base)
+        return base + per_1k * prompt_tokens / 1000
+
+    def estimate_cost(self, model_name, prompt_tokens):
+        return price_per_1k(model_name) * prompt_tokens / 1000
+
+    def observe(self, model_name, seconds, prompt_tokens):
+        """Fold an observed call latency into the model's expected base latency"""
+        _, _, _, _, per_1k = model_family(model_name)
+        base = max(0.0, seconds - per_1k * prompt_tokens / 1000)
+        with self._lock:
+            previous = self._observed.get(model_name)
+            self._observed[model_name] = base if previous is None else previous + self.smoothing * (base - previous)
+
+    def _decision(self, model_name, reason, prompt_tokens):
+        return RoutingDecision(
+            model_name,
+            reason,
+            estimated_latency=round(self.estimate_latency(model_name, prompt_tokens), 3),
+            estimated_cost=round(self.estimate_cost(model_name, prompt_tokens), 6),
+        )
+
+    def route(self, endpoint, prompt_tokens, latency_target=None, cost_target=None):
+        """Return a RoutingDecision for a call to ``endpoint`` with ``prompt_tokens`` input tokens"""
+        if endpoint in self.overrides:
+            return self._decision(self.overrides[endpoint], 'override', prompt_tokens)
+
+        required = ENDPOINT_QUALITY.get(endpoint, model_family(self.default_model)[2])
+        candidates = [name for name in self.models if model_family(name)[2] >= required]
+        if not candidates:
+            return self._decision(self.default_model, f'no model meets quality tier {required}', prompt_tokens)
+
+        if cost_target is not None:
+            affordable = [name for name in candidates if self.estimate_cost(name, prompt_tokens) <= cost_target]
+            candidates = affordable or [min(candidates, key=lambda name: self.estimate_cost(name, prompt_tokens))]
+
+        latency_target = latency_target if latency_target is not None else self.latency_targets.get(endpoint)
+        if latency_target is not None:
+            fast_enough = [name for name in candidates
+                           if self.estimate_latency(name, prompt_tokens) <= latency_target]
+            if not fast_enough:
+                fastest = min(candidates, key=lambda name: self.estimate_latency(name, prompt_tokens))
+                return self._decision(fastest, f'fastest of tier>={required}, none within {latency_target}s', prompt_tokens)
+            candidates = fast_enough
+
+        chosen = min(candidates, key=lambda name: (self.estimate_cost(name, prompt_tokens),
+                                                   self.estimate_latency(name, prompt_tokens)))
+        target = f' within {latency_target}s' if latency_target is not None else ''
+        return self._decision(chosen, f'cheapest of tier>={required}{target}', prompt_tokens)
+
+
+def _parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs or []:
+        endpoint, _, model_name = pair.partition('=')
+        if endpoint.strip() and model_name.strip():
+            overrides[endpoint.strip()] = model_name.strip()
+    return overrides
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Return the process-wide ModelRouter configured from settings"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter(
+                models=getattr(settings, 'GEMINI_ROUTER_MODELS', []),
+                default_model=settings.GEMINI_MODEL,
+                overrides=_parse_overrides(getattr(settings, 'GEMINI_ROUTE_OVERRIDES', [])),
+                latency_targets=getattr(settings, 'GEMINI_LATENCY_TARGETS', {}),
+            )
+        return _router
+
+
+def reset_router():
+    global _router
+    with _router_lock:
+        _router = None
+
+
+def is_enabled():
+    return getattr(settings, 'GEMINI_ROUTER_ENABLED', True)
@@ -0,0 +1,242 @@
+"""
+Semantic answer cache for PolicyBridge AI
+
+Generic questions ("what is a deductible?") are asked over and over with small
+wording differences. Answered questions are stored in the database; each
+process keeps a hashed character n-gram index of them and serves the stored
+answer when a new question's similarity to its nearest neighbour is at least
+SEMANTIC_CACHE_THRESHOLD, skipping the Gemini call entirely.
+
+The n-grams are hashed rather than looked up in a fitted vocabulary, so cached
+and incoming questions live in the same vector space: n-grams a cached
+question lacks lower the similarity instead of being silently dropped. The
+similarity is further scaled by the share of the question's words that occur
+in some cached question, and a cached question never matches one that adds or
+drops a negation ("is dental covered" vs "is dental not covered").
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np
+from scipy.sparse import vstack
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from sklearn.feature_extraction.text import HashingVectorizer
+from . import llm_cache
+from .models import SemanticCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# Stateless, so vectors computed at different times (and by different processes) are comparable;
+# rows are L2-normalized, so the dot product of two rows is their cosine similarity
+_vectorizer = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** 20, alternate_sign=False)
+
+# After normalize_question, "isn't" is "isn t", so contractions appear as their first word
+NEGATION_WORDS = frozenset({
+    'not', 'no', 'never', 'nor', 'none', 'nothing', 'neither', 'without', 'cannot', 'except', 'excluding',
+    'isn', 'aren', 'wasn', 'weren', 'don', 'doesn', 'didn', 'won', 'wouldn', 'couldn', 'shouldn',
+    'hasn', 'haven', 'hadn', 'mustn',
+})
+
+
+def normalize_question(question):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.sub(r'[^\w\s]', ' ', question.lower()).split())
+
+
+def negations(normalized):
+    """The negation words of a normalized question, sorted"""
+    words = normalized.split()
+    found = [word for word in words if word in NEGATION_WORDS]
+    # "can t" is a negation, "can" alone is not
+    found.extend('can' for word, following in zip(words, words[1:]) if word == 'can' and following == 't')
+    return tuple(sorted(found))
+
+
+class SemanticCache:
+    """
+    Nearest-neighbour question cache for one ``namespace`` (e.g. a chat endpoint).
+
+    The TF-IDF index is rebuilt from the database when another process has
+    added or evicted entries, checked at most every ``refresh_interval``
+    seconds, so all workers converge on the same cache.
+    """
+
+    def __init__(self, namespace, threshold=None, max_entries=None, refresh_interval=30):
+        self.namespace = namespace
+        self.threshold = getattr(settings, 'SEMANTIC_CACHE_THRESHOLD', 0.9) if threshold is None else threshold
+        self.max_entries = getattr(settings, 'SEMANTIC_CACHE_MAX_ENTRIES', 2000) if max_entries is None else max_entries
+        self.refresh_interval = refresh_interval
+        self.stats_endpoint = f"{namespace}_semantic"
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._clear()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'SEMANTIC_CACHE_ENABLED', True)
+
+    def _entries(self):
+        return SemanticCacheEntry.objects.filter(namespace=self.namespace)
+
+    def _clear(self):
+        self._matrix = None
+        self._entry_ids = []
+        self._negations = []
+        self._words = Counter()
+
+    def _add(self, rows):
+        """Add ``(id, normalized question)`` rows to the index; callers hold the lock"""
+        if not rows:
+            return
+        vectors = _vectorizer.transform([question for _, question in rows])
+        self._matrix = vectors if self._matrix is None else vstack([self._matrix, vectors], format='csr')
+        for entry_id, question in rows:
+            self._entry_ids.append(entry_id)
+            self._negations.append(negations(question))
+            self._words.update(set(question.split()))
+
+    def _remove(self, rows):
+        """Drop evicted ``(id, normalized question)`` rows from the index; callers hold the lock"""
+        positions = {entry_id: i for i, entry_id in enumerate(self._entry_ids)}
+        removed = {positions[entry_id] for entry_id, _ in rows if entry_id in positions}
+        if not removed:
+            return
+        for entry_id, question in rows:
+            if entry_id in positions:
+                self._words.subtract(set(question.split()))
+        self._words = +self._words
+        keep = [i for i in range(len(self._entry_ids)) if i not in removed]
+        if not keep:
+            self._clear()
+            return
+        self._matrix = self._matrix[keep]
+        self._entry_ids = [self._entry_ids[i] for i in keep]
+        self._negations = [self._negations[i] for i in keep]
+
+    def _db_signature(self):
+        return tuple(self._entries().aggregate(count=Count('id'), last=Max('id')).values())
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+
+        signature = self._db_signature()
+        if signature == self._signature and not force:
+            return
+
+        self._clear()
+        self._add(list(self._entries().values_list('id', 'question')))
+        self._signature = signature
+        logger.info(f"Rebuilt {self.namespace} semantic cache index with {len(self._entry_ids)} questions")
+
+    def _best_match(self, normalized):
+        """``(entry_id, similarity)`` of the closest cached question with the same negations, or None"""
+        if self._matrix is None:
+            return None
+        similarities = (self._matrix @ _vectorizer.transform([normalized]).T).toarray().ravel()
+        query_negations = negations(normalized)
+        mismatched = [i for i, entry_negations in enumerate(self._negations) if entry_negations != query_negations]
+        similarities[mismatched] = 0.0
+        best = int(np.argmax(similarities))
+
+        # Words no cached question contains are new content the cached answer does not address
+        words = normalized.split()
+        known_share = sum(1 for word in words if word in self._words) / len(words)
+        return self._entry_ids[best], float(similarities[best]) * known_share
+
+    def lookup(self, question):
+        """Return ``(answer, similarity)`` for a near-identical cached question, or None"""
+        normalized = normalize_question(question)
+        if not normalized or not self.enabled:
+            return None
+
+        try:
+            with self._lock:
+                self._refresh()
+                match = self._best_match(normalized)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None
+
+        if match and match[1] >= self.threshold:
+            entry_id, similarity = match
+            entry = self._entries().filter(id=entry_id).only('answer').first()
+            if entry:
+                self._entries().filter(id=entry_id).update(hit_count=F('hit_count') + 1, last_hit_at=timezone.now())
+                llm_cache.record_lookup(self.stats_endpoint, hit=True)
+                logger.info(f"Semantic cache hit ({similarity:.2f}) for: {normalized[:60]}")
+                return entry.answer, similarity
+
+        llm_cache.record_lookup(self.stats_endpoint, hit=False)
+        return None
+
+    def store(self, question, answer):
+        """
+        Cache an answer and evict the least recently hit questions beyond
+        ``max_entries``, updating this process's index in place
+        """
+        normalized = normalize_question(question)
+        if not normalized or not answer or not self.enabled:
+            return
+        try:
+            entry, created = SemanticCacheEntry.objects.update_or_create(
+                namespace=self.namespace,
+                question=normalized,
+                defaults={'answer': answer, 'last_hit_at': timezone.now()},
+            )
+            evicted = self.evict()
+            with self._lock:
+                expected = self._signature
+                if created:
+                    self._add([(entry.id, normalized)])
+                    if expected is not None:
+                        expected = (expected[0] + 1, entry.id)
+                if evicted:
+                    self._remove(evicted)
+                    if expected is not None:
+                        expected = (expected[0] - len(evicted), expected[1])
+                # If no other process changed the entries meanwhile the index is current;
+                # otherwise leave the old signature so the next refresh rebuilds it
+                if expected is not None and self._db_signature() == expected:
+                    self._signature = expected
+        except Exception as e:
+            logger.warning(f"Failed to store semantic cache entry: {e}")
+
+    def evict(self):
+        """Delete the least recently hit entries beyond ``max_entries``; returns their ``(id, question)`` rows"""
+        overflow = self._entries().count() - self.max_entries
+        if overflow <= 0:
+            return []
+        stale = list(self._entries().order_by('last_hit_at').values_list('id', 'question')[:overflow])
+        deleted, _ = SemanticCacheEntry.objects.filter(id__in=[entry_id for entry_id, _ in stale]).delete()
+        logger.info(f"Evicted {deleted} {self.namespace} semantic cache entries")
+        return stale
+
+    def stats(self):
+        """Entry count, hit/miss counters and miss rate"""
+        counters = llm_cache.stats()['endpoints'].get(self.stats_endpoint, {})
+        return {
+            'entries': self._entries().count(),
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'miss_rate': counters.get('miss_rate', 0.0),
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_semantic_cache(namespace):
+    """Return the process-wide SemanticCache for ``namespace``"""
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = SemanticCache(namespace)
+        return _caches[namespace]
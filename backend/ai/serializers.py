@@ -2,7 +2,7 @@
 AI serializers for PolicyBridge AI
 """
 from rest_framework import serializers
-from .models import AIUsageLog, PolicyComparison, Conversation, Message
+from .models import AIUsageLog, PolicyComparison, Conversation, Message, Job
 from policies.serializers import PolicySerializer
 
 
@@ -72,3 +72,13 @@ class ConversationListSerializer(serializers.ModelSerializer):
                 'created_at': last_message.created_at
             }
         return None
+
+
+class JobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'job_type', 'payload', 'status', 'result', 'error_message',
+            'attempts', 'max_attempts', 'created_at', 'updated_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,33 @@
+"""
+Signal receivers for the AI app
+"""
+import logging
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from policies.models import PolicyExtraction
+from .clustering import schedule_update
+from .corpus_tfidf import get_corpus_model
+from .feature_store import get_features
+from .models import PolicyCluster
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=PolicyExtraction)
+def compute_policy_features(sender, instance, raw=False, **kwargs):
+    """Precompute ML features as soon as a policy's text is extracted"""
+    if raw or instance.extraction_status != 'completed' or not instance.extracted_text:
+        return
+    try:
+        get_features(instance.extracted_text)
+    except Exception as e:
+        logger.warning(f"Feature computation failed for policy {instance.policy_id}: {e}")
+        return
+
+    # The new text gets a fresh cluster from the next incremental update
+    try:
+        PolicyCluster.objects.filter(policy_id=instance.policy_id).delete()
+        if get_corpus_model() is not None:
+            schedule_update()
+    except Exception as e:
+        logger.warning(f"Cluster update scheduling failed for policy {instance.policy_id}: {e}")
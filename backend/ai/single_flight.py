@@ -0,0 +1,245 @@
+"""
+Single-flight request coalescing for PolicyBridge AI
+
+Identical concurrent calls (a double-clicked "Analyze", frontend retries, the
+same prompt sent by two users) are collapsed into one: the first caller runs
+the work and the duplicates wait for and share its result.
+
+Within a process, callers are coalesced through a shared event (or asyncio
+future). Across web and job worker processes, the first caller claims a row
+in ``ai_inflight_calls``; other processes poll that row and take the result
+the owner stores there, which is kept for SINGLE_FLIGHT_RESULT_TTL seconds so
+retries that arrive just after completion are served too. Results must be
+JSON-serializable. If the owner fails or dies, a waiter takes over the claim.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from .jobs import default_worker_id
+from .models import InFlightCall
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.25
+
+_MISSING = object()
+
+
+def make_key(operation, inputs):
+    """Hash of the operation name and its JSON-encoded inputs"""
+    payload = json.dumps([operation, inputs], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_enabled():
+    return getattr(settings, 'SINGLE_FLIGHT_ENABLED', True)
+
+
+def _timeout():
+    return getattr(settings, 'SINGLE_FLIGHT_TIMEOUT', 120)
+
+
+def _claim(key, operation, owner):
+    """
+    Try to become the cross-process owner of ``key``.
+
+    Returns ``(True, None)`` when claimed, ``(False, result)`` when a finished
+    result is already stored, and ``(False, _MISSING)`` when another process
+    is still running it.
+    """
+    now = timezone.now()
+    try:
+        # Also sweeps expired claims and results left by other keys
+        InFlightCall.objects.filter(expires_at__lt=now).delete()
+        with transaction.atomic():
+            InFlightCall.objects.create(
+                key=key,
+                operation=operation,
+                owner=owner,
+                expires_at=now + timedelta(seconds=_timeout()),
+            )
+        return True, None
+    except IntegrityError:
+        row = InFlightCall.objects.filter(key=key).values('status', 'result').first()
+        if row and row['status'] == 'done':
+            return False, row['result']
+        return False, _MISSING
+    except DatabaseError as e:
+        # Without the table (e.g. before migrating) coalescing stays in-process
+        logger.warning(f"Single-flight claim failed, running {operation} uncoordinated: {e}")
+        return True, None
+
+
+def _poll(key):
+    """Result of a finished call, None while running, _MISSING if the claim is gone"""
+    row = InFlightCall.objects.filter(key=key, expires_at__gte=timezone.now()).values('status', 'result').first()
+    if row is None:
+        return _MISSING
+    if row['status'] == 'done':
+        return row
+    return None
+
+
+def _publish(key, owner, result):
+    try:
+        InFlightCall.objects.filter(key=key, owner=owner).update(
+            status='done',
+            result=result,
+            expires_at=timezone.now() + timedelta(seconds=getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 15)),
+        )
+    except (DatabaseError, TypeError, ValueError) as e:
+        logger.warning(f"Could not share single-flight result: {e}")
+        _release(key, owner)
+
+
+def _release(key, owner):
+    try:
+        InFlightCall.objects.filter(key=key, owner=owner).delete()
+    except DatabaseError as e:
+        logger.warning(f"Could not release single-flight claim: {e}")
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+_async_calls = {}
+
+
+def _run_cross_process(key, operation, fn):
+    owner = f"{default_worker_id()}:{threading.get_ident()}"
+    deadline = time.monotonic() + _timeout()
+    while time.monotonic() < deadline:
+        claimed, result = _claim(key, operation, owner)
+        if claimed:
+            break
+        if result is not _MISSING:
+            logger.info(f"Single-flight: reused finished {operation} result")
+            return result
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            row = _poll(key)
+            if row is _MISSING:
+                break
+            if row is not None:
+                logger.info(f"Single-flight: shared {operation} result from another process")
+                return row['result']
+    else:
+        logger.warning(f"Single-flight: gave up waiting for {operation}, running it directly")
+        return fn()
+
+    try:
+        result = fn()
+    except BaseException:
+        _release(key, owner)
+        raise
+    _publish(key, owner, result)
+    return result
+
+
+def run(operation, inputs, fn):
+    """
+    Run ``fn()`` once for all concurrent callers with the same ``operation``
+    and ``inputs``, returning its (JSON-serializable) result to each of them.
+    Exceptions raised by the owner propagate to in-process waiters.
+    """
+    if not is_enabled():
+        return fn()
+
+    key = make_key(operation, inputs)
+    with _calls_lock:
+        call = _calls.get(key)
+        owner = call is None
+        if owner:
+            call = _calls[key] = _Call()
+
+    if not owner:
+        if call.event.wait(_timeout()):
+            logger.info(f"Single-flight: shared in-process {operation} result")
+            if call.error is not None:
+                raise call.error
+            return call.result
+        return fn()
+
+    try:
+        call.result = _run_cross_process(key, operation, fn)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        call.event.set()
+        with _calls_lock:
+            _calls.pop(key, None)
+
+
+async def _arun_cross_process(key, operation, afn):
+    owner = f"{default_worker_id()}:async:{id(asyncio.current_task())}"
+    claim = sync_to_async(_claim)
+    poll = sync_to_async(_poll)
+    deadline = time.monotonic() + _timeout()
+    while time.monotonic() < deadline:
+        claimed, result = await claim(key, operation, owner)
+        if claimed:
+            break
+        if result is not _MISSING:
+            return result
+        while time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL)
+            row = await poll(key)
+            if row is _MISSING:
+                break
+            if row is not None:
+                return row['result']
+    else:
+        return await afn()
+
+    try:
+        result = await afn()
+    except BaseException:
+        await sync_to_async(_release)(key, owner)
+        raise
+    await sync_to_async(_publish)(key, owner, result)
+    return result
+
+
+async def arun(operation, inputs, afn):
+    """Asyncio variant of run(); ``afn`` is a coroutine function"""
+    if not is_enabled():
+        return await afn()
+
+    key = make_key(operation, inputs)
+    loop = asyncio.get_running_loop()
+    future = _async_calls.get((id(loop), key))
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = _async_calls[(id(loop), key)] = loop.create_future()
+    try:
+        result = await _arun_cross_process(key, operation, afn)
+        future.set_result(result)
+        return result
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark the exception retrieved so an unawaited future doesn't log it
+        future.exception()
+        raise
+    finally:
+        _async_calls.pop((id(loop), key), None)
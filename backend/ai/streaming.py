@@ -0,0 +1,69 @@
+"""
+Server-sent event helpers for PolicyBridge AI
+
+Streaming endpoints return ``sse_response(events)`` where ``events`` yields
+strings built with ``sse_event``. Clients read the body incrementally (fetch
+with a ReadableStream) and receive ``token`` events as Gemini generates text,
+followed by a ``done`` event, or an ``error`` event carrying a fallback answer.
+
+The event generators are synchronous. Under WSGI they are iterated directly;
+under ASGI, Django would drain a synchronous generator into a list before
+sending anything, so EventStreamResponse pulls it one event at a time in a
+worker thread instead.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+
+def sse_event(data, event=None):
+    """Format one server-sent event with a JSON payload"""
+    message = f"event: {event}\n" if event else ""
+    return f"{message}data: {json.dumps(data, default=str)}\n\n"
+
+
+_END = object()
+
+
+class EventStreamResponse(StreamingHttpResponse):
+    """StreamingHttpResponse that streams a synchronous iterator under ASGI without buffering it"""
+
+    async def __aiter__(self):
+        if self.is_async:
+            async for part in super().__aiter__():
+                yield part
+            return
+        # Thread-sensitive, so ORM calls in the generator share the request's thread;
+        # next() with a default because StopIteration cannot cross sync_to_async
+        iterator = iter(self.streaming_content)
+        next_part = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await next_part(iterator, _END)
+            if part is _END:
+                return
+            yield part
+
+
+def sse_response(events):
+    """Wrap an event generator in an unbuffered text/event-stream response"""
+    response = EventStreamResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets DRF streaming views accept ``Accept: text/event-stream`` requests.
+
+    Streamed responses bypass renderers; this only renders the early error
+    responses (validation, 404, 503) as a single ``error`` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event(data, event='error').encode(self.charset)
@@ -0,0 +1,77 @@
+"""
+Background job handlers for PolicyBridge AI
+"""
+import logging
+from rest_framework import status
+from policies.models import Policy
+from policies.ingestion import ingest_policy
+from .jobs import job_handler, PermanentJobError
+from . import clustering, corpus_tfidf
+from .services import get_comparison_service
+from .views import build_policy_details
+
+logger = logging.getLogger(__name__)
+
+
+def _get_policy(policy_id, user_id=None):
+    try:
+        queryset = Policy.objects.all()
+        if user_id is not None:
+            queryset = queryset.filter(user_id=user_id)
+        return queryset.get(id=policy_id)
+    except Policy.DoesNotExist:
+        raise PermanentJobError(f"Policy {policy_id} not found")
+
+
+@job_handler('ingest_policy')
+def ingest_policy_job(job):
+    """Extract and store document text for a policy"""
+    policy = _get_policy(job.payload['policy_id'])
+    extraction = ingest_policy(policy)
+    if extraction is None or extraction.extraction_status != 'completed':
+        raise PermanentJobError(extraction.error_message if extraction else 'Policy has no document')
+    return {'policy_id': policy.id, 'text_length': extraction.text_length, 'page_count': extraction.page_count}
+
+
+@job_handler('extract_policy_details')
+def extract_policy_details_job(job):
+    """Structured AI extraction for a policy"""
+    policy = _get_policy(job.payload['policy_id'], job.user_id)
+    data, response_status = build_policy_details(policy)
+    if response_status >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+        raise Exception(data.get('error', 'Policy extraction failed'))
+    if response_status >= status.HTTP_400_BAD_REQUEST:
+        raise PermanentJobError(data.get('error', 'Policy extraction failed'))
+    return data
+
+
+@job_handler('policy_comparison')
+def policy_comparison_job(job):
+    """AI comparison of two policies"""
+    policy1 = _get_policy(job.payload['policy1_id'], job.user_id)
+    policy2 = _get_policy(job.payload['policy2_id'], job.user_id)
+    result = get_comparison_service().process_policy_comparison(policy1.id, policy2.id)
+    if result.get('status') != 'success':
+        raise Exception(result.get('error', 'Policy comparison failed'))
+    result['policy_names'] = list(result.get('policy_names', []))
+    return result
+
+
+@job_handler('fit_tfidf')
+def fit_tfidf_job(job):
+    """Refit the corpus TF-IDF model after the policy corpus has drifted"""
+    model = corpus_tfidf.fit_corpus()
+    if model is None:
+        raise PermanentJobError('No ingested policy text to fit on')
+    # Clusters live in the TF-IDF vector space, so they are refit after it
+    clustering.schedule_update()
+    return {'document_count': model.document_count, 'features': model.vocabulary_size}
+
+
+@job_handler('update_clusters')
+def update_clusters_job(job):
+    """Fold newly extracted policies into the policy clustering model"""
+    model, updated = clustering.update_clusters()
+    if model is None:
+        raise PermanentJobError('Clustering needs a fitted TF-IDF model and at least two policies')
+    return {'policies_updated': updated, 'clusters': model.n_clusters, 'samples_seen': model.samples_seen}
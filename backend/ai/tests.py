@@ -0,0 +1,134 @@
+"""
+Tests for the AI app
+"""
+import asyncio
+from django.test import SimpleTestCase
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, HALF_OPEN
+from .services import POLICY_NAME_PLACEHOLDER, _replace_values
+from .semantic_cache import SemanticCache, negations
+from .streaming import sse_event, sse_response
+
+
+class CircuitBreakerProbeTests(SimpleTestCase):
+    """A half-open probe slot is freed however the probe call ends"""
+
+    def _half_open_breaker(self):
+        breaker = CircuitBreaker(name='test', min_calls=1, open_seconds=0.0, probe_successes=2)
+        breaker.record(0.0, error=Exception('backend down'))
+        self.assertEqual(breaker.state, HALF_OPEN)
+        return breaker
+
+    def test_cancelled_probe_releases_slot(self):
+        breaker = self._half_open_breaker()
+
+        async def probe():
+            with breaker.guard():
+                await asyncio.sleep(10)
+
+        async def cancel_probe():
+            task = asyncio.ensure_future(probe())
+            await asyncio.sleep(0)
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+
+        with breaker.guard():
+            pass
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertEqual(breaker.metrics()['counters']['failures'], 1)
+
+    def test_interrupted_probe_releases_slot(self):
+        breaker = self._half_open_breaker()
+
+        with self.assertRaises(KeyboardInterrupt):
+            with breaker.guard():
+                raise KeyboardInterrupt
+
+        with breaker.guard():
+            pass
+        self.assertEqual(breaker.state, HALF_OPEN)
+
+    def test_failed_probe_reopens(self):
+        breaker = self._half_open_breaker()
+        breaker.open_seconds = 60.0
+
+        with self.assertRaises(ValueError):
+            with breaker.guard():
+                raise ValueError('still down')
+
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+
+class SemanticCacheMatchTests(SimpleTestCase):
+    """Cached and incoming questions are compared in one vector space"""
+
+    def _cache(self, *questions):
+        cache = SemanticCache('test', threshold=0.9)
+        cache._add(list(enumerate(questions, start=1)))
+        return cache
+
+    def test_identical_question_matches(self):
+        entry_id, similarity = self._cache('is dental covered', 'what is a deductible')._best_match('is dental covered')
+        self.assertEqual(entry_id, 1)
+        self.assertAlmostEqual(similarity, 1.0)
+
+    def test_added_negation_never_matches(self):
+        _, similarity = self._cache('is dental covered')._best_match('is dental not covered')
+        self.assertEqual(similarity, 0.0)
+        self.assertEqual(negations('isn t dental covered'), ('isn',))
+        self.assertEqual(negations('can t i claim'), ('can',))
+        self.assertEqual(negations('can i claim'), ())
+
+    def test_unknown_words_lower_similarity(self):
+        _, similarity = self._cache('is dental covered')._best_match('is dental covered for orthodontics abroad')
+        self.assertLess(similarity, 0.9)
+
+    def test_removed_entries_leave_the_index(self):
+        cache = self._cache('is dental covered', 'what is a deductible')
+        cache._remove([(1, 'is dental covered')])
+        self.assertEqual(cache._entry_ids, [2])
+        self.assertNotIn('dental', cache._words)
+        self.assertEqual(cache._matrix.shape[0], 1)
+
+
+class EventStreamResponseTests(SimpleTestCase):
+    """Under ASGI the event generator is consumed one event at a time"""
+
+    def test_async_iteration_does_not_drain_the_generator(self):
+        produced = []
+
+        def events():
+            for text in ('first', 'second'):
+                produced.append(text)
+                yield sse_event({'text': text}, event='token')
+
+        response = sse_response(events())
+
+        async def first_part():
+            parts = response.__aiter__()
+            part = await parts.__anext__()
+            await parts.aclose()
+            return part
+
+        part = asyncio.run(first_part())
+        self.assertIn(b'"first"', part)
+        self.assertEqual(produced, ['first'])
+
+
+class SharedExtractionNameTests(SimpleTestCase):
+    """Only whole values equal to the policy name become the placeholder"""
+
+    def test_name_inside_text_is_kept(self):
+        data = {
+            'policyMeta': {'name': 'Health '},
+            'summary': {'points': ['Health insurance covers dental', 'Health']},
+        }
+        self.assertEqual(_replace_values(data, 'Health', POLICY_NAME_PLACEHOLDER), {
+            'policyMeta': {'name': POLICY_NAME_PLACEHOLDER},
+            'summary': {'points': ['Health insurance covers dental', POLICY_NAME_PLACEHOLDER]},
+        })
@@ -0,0 +1,200 @@
+"""
+Token accounting and budgeted prompt assembly for PolicyBridge AI
+
+Token counts come from the ``usage_metadata`` Gemini returns with each
+response. When it is missing (older models, streamed responses, the fake
+transport) they are estimated from the text length with a characters-per-token
+ratio that is calibrated against every real count seen by the process.
+
+PromptBuilder sizes prompts by tokens rather than hard-coded character
+slices: fixed instructions are always kept and the document excerpts share
+whatever is left of the endpoint's PROMPT_TOKEN_BUDGETS entry.
+"""
+import logging
+import threading
+from django.conf import settings
+from policies.extraction import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROMPT_BUDGET = 2000
+
+
+def contents_text(contents):
+    """Plain text of a prompt: a string or a list of chat messages / parts"""
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        for key in ('content', 'text', 'parts'):
+            if key in contents:
+                return contents_text(contents[key])
+        return ''
+    if isinstance(contents, (list, tuple)):
+        return '\n'.join(contents_text(item) for item in contents)
+    return str(contents or '')
+
+
+class TokenUsage:
+    """Input and output token counts for one model call"""
+
+    def __init__(self, input_tokens=0, output_tokens=0, estimated=False):
+        self.input_tokens = int(input_tokens or 0)
+        self.output_tokens = int(output_tokens or 0)
+        self.estimated = estimated
+
+    @property
+    def total_tokens(self):
+        return self.input_tokens + self.output_tokens
+
+    def as_dict(self):
+        return {
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'tokens_used': self.total_tokens,
+            'tokens_estimated': self.estimated,
+        }
+
+    def __repr__(self):
+        return f"<TokenUsage in={self.input_tokens} out={self.output_tokens}{' estimated' if self.estimated else ''}>"
+
+
+class TokenEstimator:
+    """
+    Length-based token estimator.
+
+    Starts from CHARS_PER_TOKEN and moves an exponential average of the
+    observed characters-per-token ratio towards each real prompt count, so
+    estimates track the model's tokenizer on our own documents.
+    """
+
+    def __init__(self, chars_per_token=CHARS_PER_TOKEN, smoothing=0.1, min_ratio=2.0, max_ratio=8.0):
+        self.chars_per_token = float(chars_per_token)
+        self.smoothing = smoothing
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def estimate(self, contents):
+        text = contents_text(contents)
+        if not text:
+            return 0
+        return int(len(text) / self.chars_per_token) + 1
+
+    def chars_for(self, tokens):
+        """Number of characters expected to fit in ``tokens`` tokens"""
+        return max(0, int(tokens * self.chars_per_token))
+
+    def observe(self, chars, tokens):
+        """Calibrate against a real (characters, tokens) pair"""
+        if chars < 200 or tokens <= 0:
+            return
+        ratio = min(self.max_ratio, max(self.min_ratio, chars / tokens))
+        with self._lock:
+            self.chars_per_token += self.smoothing * (ratio - self.chars_per_token)
+            self.samples += 1
+
+
+_estimator = TokenEstimator()
+
+
+def get_estimator():
+    return _estimator
+
+
+def estimate_tokens(contents):
+    """Estimated token count of a prompt or response text"""
+    return _estimator.estimate(contents)
+
+
+def usage_from_response(response, contents, text):
+    """
+    TokenUsage for a model call, read from the response's usage_metadata
+    when present (calibrating the estimator) and estimated otherwise.
+    """
+    metadata = getattr(response, 'usage_metadata', None) if response is not None else None
+    input_tokens = getattr(metadata, 'prompt_token_count', 0) if metadata else 0
+    output_tokens = getattr(metadata, 'candidates_token_count', 0) if metadata else 0
+
+    if input_tokens:
+        _estimator.observe(len(contents_text(contents)), input_tokens)
+        if not output_tokens:
+            output_tokens = estimate_tokens(text or '')
+        return TokenUsage(input_tokens, output_tokens)
+
+    return TokenUsage(estimate_tokens(contents), estimate_tokens(text or ''), estimated=True)
+
+
+def prompt_budget(endpoint):
+    """Prompt token budget for ``endpoint`` from PROMPT_TOKEN_BUDGETS"""
+    budgets = getattr(settings, 'PROMPT_TOKEN_BUDGETS', {})
+    return budgets.get(endpoint, DEFAULT_PROMPT_BUDGET)
+
+
+def prompt_char_budget(endpoint):
+    """
+    Characters of document text that can fit in ``endpoint``'s budget; lets
+    callers that read raw files stop parsing early
+    """
+    return _estimator.chars_for(prompt_budget(endpoint))
+
+
+class PromptBuilder:
+    """
+    Assemble a prompt from fixed text and document excerpts within a token budget.
+
+        prompt = (PromptBuilder('policy_comparison')
+                  .text(instructions)
+                  .document(policy1_text)
+                  .text(footer)
+                  .build())
+
+    Fixed text is always included. The remaining budget is split evenly
+    between the documents; a document shorter than its share gives the
+    unused tokens to the others. Excerpts are cut back to a word boundary.
+    """
+
+    def __init__(self, endpoint, budget=None):
+        self.endpoint = endpoint
+        self.budget = budget if budget is not None else prompt_budget(endpoint)
+        self._parts = []
+        self.truncated = False
+
+    def text(self, value):
+        self._parts.append((False, value or ''))
+        return self
+
+    def document(self, value):
+        self._parts.append((True, value or ''))
+        return self
+
+    def document_budget(self):
+        """Tokens left for documents once the fixed text is accounted for"""
+        fixed = sum(estimate_tokens(value) for is_document, value in self._parts if not is_document)
+        return max(0, self.budget - fixed)
+
+    def _fit(self, documents, tokens):
+        # Hand out the budget smallest document first so short documents
+        # release their unused share to the longer ones
+        chars = _estimator.chars_for(tokens)
+        order = sorted(range(len(documents)), key=lambda i: len(documents[i]))
+        fitted = [None] * len(documents)
+        for position, index in enumerate(order):
+            share = chars // (len(documents) - position)
+            value = documents[index]
+            if len(value) > share:
+                cut = value[:share]
+                space = cut.rfind(' ')
+                value = cut[:space] if space > share // 2 else cut
+                self.truncated = True
+            fitted[index] = value
+            chars -= len(value)
+        return fitted
+
+    def build(self):
+        documents = [value for is_document, value in self._parts if is_document]
+        fitted = iter(self._fit(documents, self.document_budget()))
+        prompt = ''.join(next(fitted) if is_document else value for is_document, value in self._parts)
+        if self.truncated:
+            logger.debug(f"Prompt for {self.endpoint} trimmed to ~{self.budget} tokens")
+        return prompt
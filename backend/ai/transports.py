@@ -0,0 +1,345 @@
+"""
+Pluggable LLM transports for PolicyBridge AI
+
+``ai.clients`` sends every model call through the transport selected by the
+LLM_TRANSPORT setting:
+
+- ``gemini``: the real Google Gemini API (default)
+- ``fake``: the local stand-in server started with ``manage.py fake_gemini_server``,
+  which simulates latency, errors and streaming without network or quota
+- ``record``: the real API, saving every response as a cassette in LLM_CASSETTE_DIR
+- ``replay``: serves recorded cassettes deterministically, optionally with
+  the recorded latency (LLM_REPLAY_LATENCY), and fails on unrecorded prompts
+
+All transports return objects shaped like Gemini responses (``.text``,
+``.usage_metadata``, iterable chunks when streaming), so the rate limiter,
+circuit breaker, cache and token accounting behave the same on every backend.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from . import llm_cache
+
+logger = logging.getLogger(__name__)
+
+
+class TransportError(Exception):
+    """Error response from a non-Gemini transport; ``status`` is the HTTP status"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class CassetteMissError(TransportError):
+    """The replay transport has no cassette for a prompt"""
+
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count=0, candidates_token_count=0):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return None
+        return cls(data.get('prompt_token_count', 0), data.get('candidates_token_count', 0))
+
+    @staticmethod
+    def to_dict(metadata):
+        if metadata is None:
+            return None
+        return {
+            'prompt_token_count': getattr(metadata, 'prompt_token_count', 0) or 0,
+            'candidates_token_count': getattr(metadata, 'candidates_token_count', 0) or 0,
+        }
+
+
+class TransportResponse:
+    """A complete response, or one streamed chunk"""
+
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class StreamedResponse:
+    """
+    Iterable of TransportResponse chunks. ``usage_metadata`` is filled in by
+    the chunk source once the stream is exhausted.
+    """
+
+    def __init__(self, chunks):
+        self.usage_metadata = None
+        self._chunks = chunks
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if isinstance(chunk, UsageMetadata):
+                self.usage_metadata = chunk
+            else:
+                yield chunk
+
+
+def _chunk_text(chunk):
+    try:
+        return chunk.text
+    except ValueError:
+        # Chunks carrying only finish metadata have no text parts
+        return ''
+
+
+def _model_name(model):
+    return getattr(model, 'model_name', '') or ''
+
+
+class GeminiTransport:
+    """The real Gemini API through the google-generativeai model object"""
+
+    name = 'gemini'
+
+    def generate(self, model, contents, kwargs):
+        return model.generate_content(contents, **kwargs)
+
+    async def agenerate(self, model, contents, kwargs):
+        return await model.generate_content_async(contents, **kwargs)
+
+
+class FakeServerTransport:
+    """
+    Client for the local fake Gemini server (see ai.fake_server).
+
+    Requests are plain JSON over HTTP; streamed responses arrive as one JSON
+    object per line. A 429 surfaces as a rate-limit error and 5xx responses
+    as backend failures, so callers exercise the same retry and fallback
+    paths as against the real API.
+    """
+
+    name = 'fake'
+
+    def __init__(self, url, timeout=60):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _open(self, model, contents, kwargs):
+        body = json.dumps({
+            'model': _model_name(model),
+            'prompt': llm_cache.normalize_prompt(contents),
+            'stream': bool(kwargs.get('stream')),
+        }).encode('utf-8')
+        request = urllib.request.Request(
+            f"{self.url}/generate",
+            data=body,
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read() or b'{}').get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise TransportError(f"{e.code} {message}", status=e.code)
+        except urllib.error.URLError as e:
+            raise TransportError(f"Fake Gemini server unreachable at {self.url}: {e.reason}")
+
+    def _stream(self, response):
+        with response:
+            for line in response:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                if 'error' in data:
+                    raise TransportError(f"{data.get('status', 500)} {data['error']}", status=data.get('status', 500))
+                if 'usage' in data:
+                    yield UsageMetadata.from_dict(data['usage'])
+                else:
+                    yield TransportResponse(data.get('text', ''))
+
+    def generate(self, model, contents, kwargs):
+        response = self._open(model, contents, kwargs)
+        if kwargs.get('stream'):
+            return StreamedResponse(self._stream(response))
+        with response:
+            data = json.loads(response.read())
+        return TransportResponse(data.get('text', ''), UsageMetadata.from_dict(data.get('usage')))
+
+    async def agenerate(self, model, contents, kwargs):
+        return await sync_to_async(self.generate, thread_sensitive=False)(model, contents, kwargs)
+
+
+class CassetteStore:
+    """One JSON cassette per prompt key in a directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def key(self, model, contents, kwargs):
+        return llm_cache.make_cache_key(_model_name(model), contents, kwargs.get('generation_config'))
+
+    def path(self, key):
+        return self.directory / f"{key}.json"
+
+    def load(self, key):
+        try:
+            with open(self.path(key), encoding='utf-8') as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, cassette):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so concurrent recorders never leave a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(cassette, handle, indent=2)
+        os.replace(tmp_path, self.path(key))
+
+
+class RecordingTransport:
+    """Wraps another transport and saves each successful response as a cassette"""
+
+    name = 'record'
+
+    def __init__(self, inner, store):
+        self.inner = inner
+        self.store = store
+
+    def _cassette(self, model, contents, chunks, usage_metadata, latency, stream):
+        return {
+            'model': _model_name(model),
+            'prompt': llm_cache.normalize_prompt(contents),
+            'text': ''.join(chunks),
+            'chunks': chunks if stream else [],
+            'usage': UsageMetadata.to_dict(usage_metadata),
+            'latency': round(latency, 4),
+            'recorded_at': time.time(),
+        }
+
+    def _record_stream(self, response, model, contents, key, started):
+        chunks = []
+        for chunk in response:
+            text = _chunk_text(chunk)
+            if text:
+                chunks.append(text)
+            yield TransportResponse(text)
+        usage_metadata = getattr(response, 'usage_metadata', None)
+        self.store.save(key, self._cassette(model, contents, chunks, usage_metadata, time.monotonic() - started, True))
+        yield UsageMetadata.from_dict(UsageMetadata.to_dict(usage_metadata))
+
+    def generate(self, model, contents, kwargs):
+        key = self.store.key(model, contents, kwargs)
+        started = time.monotonic()
+        response = self.inner.generate(model, contents, kwargs)
+        if kwargs.get('stream'):
+            return StreamedResponse(self._record_stream(response, model, contents, key, started))
+        cassette = self._cassette(model, contents, [response.text], response.usage_metadata,
+                                  time.monotonic() - started, False)
+        self.store.save(key, cassette)
+        return response
+
+    async def agenerate(self, model, contents, kwargs):
+        key = self.store.key(model, contents, kwargs)
+        started = time.monotonic()
+        response = await self.inner.agenerate(model, contents, kwargs)
+        cassette = self._cassette(model, contents, [response.text], response.usage_metadata,
+                                  time.monotonic() - started, False)
+        await sync_to_async(self.store.save, thread_sensitive=False)(key, cassette)
+        return response
+
+
+class ReplayTransport:
+    """
+    Serves recorded cassettes. With ``replay_latency`` each response is held
+    back for its recorded latency (streamed chunks spread evenly over it), so
+    concurrency behaviour can be benchmarked without the network.
+    """
+
+    name = 'replay'
+
+    def __init__(self, store, replay_latency=False):
+        self.store = store
+        self.replay_latency = replay_latency
+
+    def _load(self, model, contents, kwargs):
+        key = self.store.key(model, contents, kwargs)
+        cassette = self.store.load(key)
+        if cassette is None:
+            raise CassetteMissError(f"No cassette {key[:12]} for {_model_name(model)} prompt", status=404)
+        return cassette
+
+    def _latency(self, cassette):
+        return cassette.get('latency', 0) if self.replay_latency else 0
+
+    def _stream(self, cassette):
+        chunks = cassette.get('chunks') or [cassette.get('text', '')]
+        delay = self._latency(cassette) / len(chunks)
+        for chunk in chunks:
+            if delay:
+                time.sleep(delay)
+            yield TransportResponse(chunk)
+        yield UsageMetadata.from_dict(cassette.get('usage'))
+
+    def generate(self, model, contents, kwargs):
+        cassette = self._load(model, contents, kwargs)
+        if kwargs.get('stream'):
+            return StreamedResponse(self._stream(cassette))
+        latency = self._latency(cassette)
+        if latency:
+            time.sleep(latency)
+        return TransportResponse(cassette.get('text', ''), UsageMetadata.from_dict(cassette.get('usage')))
+
+    async def agenerate(self, model, contents, kwargs):
+        cassette = await sync_to_async(self._load, thread_sensitive=False)(model, contents, kwargs)
+        latency = self._latency(cassette)
+        if latency:
+            await asyncio.sleep(latency)
+        return TransportResponse(cassette.get('text', ''), UsageMetadata.from_dict(cassette.get('usage')))
+
+
+def build_transport(name=None):
+    """Construct the transport named by ``name`` (default: LLM_TRANSPORT)"""
+    name = name or getattr(settings, 'LLM_TRANSPORT', 'gemini')
+    cassette_dir = getattr(settings, 'LLM_CASSETTE_DIR', settings.BASE_DIR / 'llm_cassettes')
+    if name == 'gemini':
+        return GeminiTransport()
+    if name == 'fake':
+        return FakeServerTransport(getattr(settings, 'LLM_FAKE_SERVER_URL', 'http://127.0.0.1:8765'))
+    if name == 'record':
+        return RecordingTransport(GeminiTransport(), CassetteStore(cassette_dir))
+    if name == 'replay':
+        return ReplayTransport(CassetteStore(cassette_dir), getattr(settings, 'LLM_REPLAY_LATENCY', False))
+    raise ValueError(f"Unknown LLM_TRANSPORT '{name}' (expected gemini, fake, record or replay)")
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """Return the process-wide transport configured by LLM_TRANSPORT"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = build_transport()
+            if _transport.name != 'gemini':
+                logger.info(f"LLM calls use the {_transport.name} transport")
+        return _transport
+
+
+def reset_transport():
+    global _transport
+    with _transport_lock:
+        _transport = None
@@ -2,7 +2,7 @@
 URL patterns for AI app
 """
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'ai'
 
@@ -12,12 +12,17 @@ urlpatterns = [
     
     # Policy comparison
     path('compare/', views.policy_comparison_view, name='policy_comparison'),
+    path('portfolio/similarity/', views.portfolio_similarity_view, name='portfolio_similarity'),
+    path('portfolio/clusters/', views.portfolio_clusters_view, name='portfolio_clusters'),
+    path('policies/<int:policy_id>/similar/', views.similar_policies_view, name='similar_policies'),
+    path('policies/<int:policy_id>/near-duplicates/', views.near_duplicates_view, name='near_duplicates'),
     
     # Policy extraction retrieval
     path('policy-extraction/<int:policy_id>/', views.get_policy_extraction, name='get_policy_extraction'),
     
     # Test connection
     path('test-connection/', views.test_gemini_connection, name='test_gemini_connection'),
+    path('metrics/circuit-breaker/', views.gemini_circuit_metrics, name='gemini_circuit_metrics'),
     
     # Policy query for chat
     path('query-policy/', views.query_policy, name='query_policy'),
@@ -30,4 +35,20 @@ urlpatterns = [
     path('conversations/', views.get_conversations, name='get_conversations'),
     path('conversations/<int:conversation_id>/messages/', views.get_conversation_messages, name='get_conversation_messages'),
     path('conversations/<int:conversation_id>/', views.delete_conversation, name='delete_conversation'),
+    
+    # Background jobs
+    path('extract-policy-details/<int:policy_id>/enqueue/', views.enqueue_policy_extraction, name='enqueue_policy_extraction'),
+    path('compare/enqueue/', views.enqueue_policy_comparison, name='enqueue_policy_comparison'),
+    path('jobs/', views.get_jobs, name='get_jobs'),
+    path('jobs/<int:job_id>/', views.get_job, name='get_job'),
+    
+    # Async endpoints (serve through policybridge_backend.asgi)
+    path('async/query-policy/', async_views.async_query_policy, name='async_query_policy'),
+    path('async/general-chat/', async_views.async_general_chat, name='async_general_chat'),
+    path('async/compare/', async_views.async_policy_comparison, name='async_policy_comparison'),
+    
+    # Streaming (server-sent events) endpoints
+    path('query-policy/stream/', views.stream_query_policy, name='stream_query_policy'),
+    path('general-chat/stream/', views.stream_general_chat, name='stream_general_chat'),
+    path('compare/streamlined/stream/', views.stream_policy_comparison_streamlined, name='stream_policy_comparison_streamlined'),
 ]
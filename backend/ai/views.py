@@ -2,27 +2,52 @@
 AI views for PolicyBridge AI
 """
 import logging
+from django.conf import settings
+from django.db.models import F, Q
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import ValidationError
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from datetime import datetime
 
 # Import models
 from policies.models import Policy, PolicyExtraction
-from .models import AIUsageLog, PolicyComparison, Conversation, Message
+from policies.ingestion import get_policy_text, get_policy_extraction as get_policy_extraction_record
+from policies.retrieval import select_passages
+from policies import near_duplicates
+from .models import AIUsageLog, PolicyComparison, Conversation, Message, Job
 from .serializers import (
     PolicyComparisonRequestSerializer,
     ConversationSerializer,
     MessageSerializer,
-    ConversationListSerializer
+    ConversationListSerializer,
+    JobSerializer
 )
-from .services import PolicyComparisonService, GeminiService
+from .services import (
+    GeminiService, get_gemini_service, get_comparison_service,
+    EXTRACTION_SOURCE_AI, EXTRACTION_SOURCE_PARSED, EXTRACTION_SOURCE_FALLBACK,
+)
+from .tokens import PromptBuilder, get_estimator, prompt_char_budget
+from .jobs import enqueue
+from .semantic_cache import get_semantic_cache
+from .streaming import sse_event, sse_response, EventStreamRenderer
+from .circuit_breaker import get_circuit_breaker
+from .portfolio import portfolio_similarity
+from .clustering import portfolio_clusters, similar_policies
+from . import keyword_scanner
+from . import single_flight
 
 logger = logging.getLogger(__name__)
 
+GENERAL_CHAT_FALLBACK = (
+    "I'm sorry, I'm having trouble accessing the AI service right now. "
+    "For insurance questions, I recommend consulting with a licensed insurance agent "
+    "or reviewing official insurance documentation for accurate information."
+)
+
 
 def extract_insight(text, keywords):
     """Extract relevant insights from natural language text based on keywords"""
@@ -108,6 +133,153 @@ def store_message(conversation, message_type, content, citations=None, ml_insigh
         return None
 
 
+POLICY_CHAT_INSTRUCTIONS = """You are PolicyBridge AI, an assistant that explains insurance in simple terms.
+Always follow these rules when answering a question.
+
+Rules for Answering:
+- Clarity First: Use simple, everyday language
+- Concise: Keep answers short (2–4 sentences)
+- Direct & Helpful: Get to the point, avoid filler
+- Use Examples: Add quick, practical examples if helpful
+- Context Aware: If the question is about eligibility, claim, or coverage, include key conditions
+- No Jargon: Avoid legal/technical terms unless needed, then explain in plain words
+- Confidence: Always give a clear response. If unsure, explain what usually applies in most policies
+
+Policy Context:
+"""
+
+POLICY_CONTEXT_HEADER = "Policy Document Content:\n"
+
+
+def _policy_chat_question(question):
+    return f"""
+
+Question: {question}
+
+Answer:"""
+
+
+def build_policy_chat_context(policy, question=None):
+    """
+    Policy chat context: the stored passages most relevant to ``question``
+    (BM25 over the policy's passage index), or basic policy info
+    """
+    try:
+        if question:
+            builder = PromptBuilder('policy_query').text(POLICY_CHAT_INSTRUCTIONS).text(_policy_chat_question(question))
+            max_chars = get_estimator().chars_for(builder.document_budget()) - len(POLICY_CONTEXT_HEADER) - 2
+            document_text = select_passages(policy, question, max_chars)
+        else:
+            document_text = None
+        if document_text is None:
+            # Not ingested yet (or no question): the start of the document
+            document_text = get_policy_text(policy, max_chars=prompt_char_budget('policy_query'))
+        if document_text and len(document_text.strip()) > 50:
+            return f"{POLICY_CONTEXT_HEADER}{document_text}\n\n"
+    except Exception as e:
+        logger.warning(f"Could not get policy context: {e}")
+    return f"Policy: {policy.name} - {policy.description or 'No description available'}\n\n"
+
+
+def build_policy_chat_prompt(context, question):
+    """Prompt for a question about a specific policy, with the context fitted to the policy_query token budget"""
+    return (PromptBuilder('policy_query')
+            .text(POLICY_CHAT_INSTRUCTIONS)
+            .document(context)
+            .text(_policy_chat_question(question))
+            .build())
+
+
+def build_general_chat_prompt(question):
+    """Prompt for a general insurance question"""
+    return f"""You are PolicyBridge AI, an assistant that explains insurance in simple terms.
+Always follow these rules when answering a question.
+
+Rules for Answering:
+- Clarity First: Use simple, everyday language
+- Concise: Keep answers short (2–4 sentences)
+- Direct & Helpful: Get to the point, avoid filler
+- Use Examples: Add quick, practical examples if helpful
+- No Jargon: Avoid legal/technical terms unless needed, then explain in plain words
+- Confidence: Always give a clear response. If unsure, explain what usually applies in most cases
+
+Question: {question}
+
+Answer:"""
+
+
+def count_policy_question(policy):
+    """Count an answered chat question on a policy with one UPDATE (no save, so no re-indexing)"""
+    Policy.objects.filter(pk=policy.pk).update(conversation_count=F('conversation_count') + 1)
+
+
+def policy_chat_fallback(policy, question):
+    """Helpful answer for a policy question when the AI service is unavailable"""
+    fallback_response = (
+        f"I'm sorry, I'm having trouble accessing the AI service right now. "
+        f"However, I can see this is about your {policy.name} policy. "
+    )
+
+    question_lower = question.lower()
+    if "waiting period" in question_lower:
+        fallback_response += "For waiting periods, please check your policy document."
+    elif "claim" in question_lower:
+        fallback_response += "For claims information, please refer to your policy document."
+    elif "coverage" in question_lower:
+        fallback_response += "For coverage details, please review your policy document."
+    else:
+        fallback_response += "Please review your policy document for specific information."
+    return fallback_response
+
+
+def get_comparison_text(policy):
+    """Text used for a streamlined comparison: stored extraction, description or basic info"""
+    try:
+        # First try to get extracted text from PolicyExtraction
+        stored_text = get_policy_text(policy)
+        if stored_text:
+            logger.info(f"Policy {policy.id} using extracted text, length: {len(stored_text)}")
+            return stored_text
+        # Fallback to description or basic info
+        if policy.description and len(policy.description.strip()) > 50:
+            logger.info(f"Policy {policy.id} using description, length: {len(policy.description)}")
+            return policy.description
+        # Generate basic policy info
+        return f"""
+                Policy Name: {policy.name}
+                Provider: {policy.provider or 'Unknown'}
+                Type: {policy.policy_type or 'General'}
+                Coverage Amount: {policy.coverage_amount or 'Not specified'}
+                Premium Amount: {policy.premium_amount or 'Not specified'}
+                Start Date: {policy.start_date or 'Not specified'}
+                End Date: {policy.end_date or 'Not specified'}
+                """
+    except Exception as e:
+        logger.error(f"Error getting policy {policy.id} text: {e}")
+        return f"Policy Name: {policy.name}, Provider: {policy.provider or 'Unknown'}, Type: {policy.policy_type or 'General'}"
+
+
+def save_streamlined_comparison(user, policy1, policy2, comparison_text):
+    """Persist a streamlined comparison, replacing an earlier one for the same pair"""
+    try:
+        policy_comparison, _ = PolicyComparison.objects.update_or_create(
+            user=user,
+            policy1=policy1,
+            policy2=policy2,
+            defaults={
+                'comparison_criteria': {},
+                'comparison_result': str(comparison_text),
+                'comparison_score': 75,  # Default score for streamlined comparison
+                'detailed_analysis': {},
+            }
+        )
+        logger.info(f"Streamlined comparison saved with ID: {policy_comparison.id}")
+        return policy_comparison
+    except Exception as e:
+        logger.error(f"Failed to save streamlined comparison to database: {e}")
+        return None
+
+
 def perform_smart_comparison(policy1, policy2, policy1_text, policy2_text):
     """Perform intelligent policy comparison using AI and ML insights"""
     try:
@@ -220,11 +392,8 @@ def perform_smart_comparison(policy1, policy2, policy1_text, policy2_text):
 def perform_gemini_analysis(policy1_text, policy2_text):
     """Perform AI analysis using Gemini API"""
     try:
-        # Import Gemini service
-        from .services import GeminiService
-        
-        # Initialize Gemini service
-        ai_service = GeminiService()
+        # Shared Gemini service
+        ai_service = get_gemini_service()
         
         if ai_service.use_mock:
             # Fallback to mock if Gemini is not configured
@@ -551,8 +720,8 @@ def policy_comparison_view(request):
         
         # Initialize comparison service
         try:
-            comparison_service = PolicyComparisonService()
-            logger.info("PolicyComparisonService initialized successfully")
+            comparison_service = get_comparison_service()
+            logger.info("PolicyComparisonService ready")
         except Exception as e:
             logger.error(f"Failed to initialize PolicyComparisonService: {str(e)}")
             return Response({
@@ -624,63 +793,10 @@ def policy_comparison_streamlined_view(request):
         logger.info(f"Comparing policies: {policy1.id} vs {policy2.id}")
         
         # Extract text from policies (simplified approach)
-        policy1_text = ""
-        policy2_text = ""
-        
         logger.info(f"Policy 1: {policy1.name}, has document: {bool(policy1.document)}")
         logger.info(f"Policy 2: {policy2.name}, has document: {bool(policy2.document)}")
-        
-        # Get text for policy 1
-        try:
-            # First try to get extracted text from PolicyExtraction
-            if hasattr(policy1, 'extraction') and policy1.extraction and policy1.extraction.extracted_text:
-                policy1_text = policy1.extraction.extracted_text
-                logger.info(f"Policy 1 using extracted text, length: {len(policy1_text)}")
-            # Fallback to description or basic info
-            elif policy1.description and len(policy1.description.strip()) > 50:
-                policy1_text = policy1.description
-                logger.info(f"Policy 1 using description, length: {len(policy1_text)}")
-            else:
-                # Generate basic policy info
-                policy1_text = f"""
-                Policy Name: {policy1.name}
-                Provider: {policy1.provider or 'Unknown'}
-                Type: {policy1.policy_type or 'General'}
-                Coverage Amount: {policy1.coverage_amount or 'Not specified'}
-                Premium Amount: {policy1.premium_amount or 'Not specified'}
-                Start Date: {policy1.start_date or 'Not specified'}
-                End Date: {policy1.end_date or 'Not specified'}
-                """
-                logger.info(f"Policy 1 using generated info, length: {len(policy1_text)}")
-        except Exception as e:
-            logger.error(f"Error getting policy 1 text: {e}")
-            policy1_text = f"Policy Name: {policy1.name}, Provider: {policy1.provider or 'Unknown'}, Type: {policy1.policy_type or 'General'}"
-        
-        # Get text for policy 2
-        try:
-            # First try to get extracted text from PolicyExtraction
-            if hasattr(policy2, 'extraction') and policy2.extraction and policy2.extraction.extracted_text:
-                policy2_text = policy2.extraction.extracted_text
-                logger.info(f"Policy 2 using extracted text, length: {len(policy2_text)}")
-            # Fallback to description or basic info
-            elif policy2.description and len(policy2.description.strip()) > 50:
-                policy2_text = policy2.description
-                logger.info(f"Policy 2 using description, length: {len(policy2_text)}")
-            else:
-                # Generate basic policy info
-                policy2_text = f"""
-                Policy Name: {policy2.name}
-                Provider: {policy2.provider or 'Unknown'}
-                Type: {policy2.policy_type or 'General'}
-                Coverage Amount: {policy2.coverage_amount or 'Not specified'}
-                Premium Amount: {policy2.premium_amount or 'Not specified'}
-                Start Date: {policy2.start_date or 'Not specified'}
-                End Date: {policy2.end_date or 'Not specified'}
-                """
-                logger.info(f"Policy 2 using generated info, length: {len(policy2_text)}")
-        except Exception as e:
-            logger.error(f"Error getting policy 2 text: {e}")
-            policy2_text = f"Policy Name: {policy2.name}, Provider: {policy2.provider or 'Unknown'}, Type: {policy2.policy_type or 'General'}"
+        policy1_text = get_comparison_text(policy1)
+        policy2_text = get_comparison_text(policy2)
         
         # Log the final text content for debugging
         logger.info(f"Final policy1_text length: {len(policy1_text)}")
@@ -696,8 +812,7 @@ def policy_comparison_streamlined_view(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Use streamlined AI comparison
-        from .services import GeminiService
-        ai_service = GeminiService()
+        ai_service = get_gemini_service()
         
         logger.info("Calling streamlined AI comparison service")
         comparison_result = ai_service.compare_policies_streamlined(
@@ -729,21 +844,7 @@ def policy_comparison_streamlined_view(request):
         logger.info(f"Final comparison text length: {len(comparison_text)}")
         
         # Try to save comparison result (but don't fail if it doesn't work)
-        policy_comparison = None
-        try:
-            policy_comparison = PolicyComparison.objects.create(
-                user=request.user,
-                policy1=policy1,
-                policy2=policy2,
-                comparison_criteria={},
-                comparison_result=str(comparison_text),
-                comparison_score=75,  # Default score for streamlined comparison
-                detailed_analysis={}
-            )
-            logger.info(f"Streamlined comparison saved with ID: {policy_comparison.id}")
-        except Exception as e:
-            logger.error(f"Failed to save streamlined comparison to database: {e}")
-            # Continue without saving to database
+        policy_comparison = save_streamlined_comparison(request.user, policy1, policy2, comparison_text)
         
         return Response({
             'message': 'Streamlined AI policy comparison completed successfully',
@@ -775,172 +876,221 @@ def policy_comparison_streamlined_view(request):
 
 
 
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def extract_policy_details(request, policy_id):
-    """Extract policy details from uploaded document using AI"""
+# document_analysis.extraction_method for results that are not model output
+EXTRACTION_METHODS = {
+    EXTRACTION_SOURCE_PARSED: 'Document Parsing',
+    EXTRACTION_SOURCE_FALLBACK: 'Policy Metadata',
+}
+
+
+def build_policy_details(policy):
+    """
+    Run structured AI extraction for a policy.
+
+    Returns a (response_data, http_status) pair so the same logic serves the
+    synchronous endpoint and the background job worker. Concurrent requests
+    for the same policy document (double clicks, client retries, a job
+    running alongside the endpoint) share one extraction.
+    """
+    response_data, http_status = single_flight.run(
+        'extract_policy_details',
+        [policy.id, policy.document.name if policy.document else None],
+        lambda: list(_build_policy_details(policy))
+    )
+    return response_data, http_status
+
+
+def _update_from_near_duplicate(policy, text_content):
+    """
+    ``(details, source_policy)`` from the stored AI extraction of the
+    policy's closest near-duplicate, updated with the sections that differ,
+    or None when there is no usable near-duplicate
+    """
+    max_change = getattr(settings, 'NEAR_DUPLICATE_MAX_CHANGE', 0.3)
+    gemini_service = get_gemini_service()
+    for source, similarity in near_duplicates.find_near_duplicates(policy):
+        source_blob = source.document_blob
+        if not source_blob or not GeminiService.is_shared_ai_extraction(source_blob.structured_extraction):
+            continue
+        changes = near_duplicates.differing_sections(get_policy_text(source), text_content)
+        if not changes['added'] and not changes['removed']:
+            details = gemini_service.personalize_extraction(source_blob.structured_extraction, policy)
+            if details:
+                logger.info(f"Policy {policy.id} has the same text as policy {source.id}; reusing its extraction")
+                return details, source
+            continue
+        if near_duplicates.changed_fraction(changes, text_content) > max_change:
+            continue
+        details = gemini_service.update_policy_details(policy, source_blob.structured_extraction, changes)
+        if details:
+            logger.info(f"Updated extraction of near-duplicate policy {source.id} ({similarity:.2f}) for policy {policy.id}")
+            return details, source
+        return None
+    return None
+
+
+def _build_policy_details(policy):
+    # Check if policy has a document file
+    if not policy.document:
+        return {'error': 'No document file found for this policy'}, status.HTTP_400_BAD_REQUEST
+    
+    # STEP 1: Read the text extracted from the uploaded file at ingestion
+    extraction = get_policy_extraction_record(policy)
+    text_content = extraction.extracted_text if extraction else ""
+    document_info = {
+        'total_pages': extraction.page_count if extraction else 0,
+        'file_type': (policy.file_type or 'Unknown').upper()
+    }
+    
+    if extraction and extraction.extraction_status == 'failed':
+        logger.error(f"Stored extraction failed for policy {policy.id}: {extraction.error_message}")
+        return {
+            'error': f'Failed to read document file: {extraction.error_message}',
+            'file_type': document_info['file_type']
+        }, status.HTTP_400_BAD_REQUEST
+    
+    # Validate that we actually extracted meaningful content
+    if len(text_content) < 50:
+        logger.warning(f"Extracted text too short: {len(text_content)} characters")
+        return {
+            'error': 'Document appears to be empty or unreadable. Please ensure the file contains text content.',
+            'extracted_length': len(text_content),
+            'file_type': document_info['file_type']
+        }, status.HTTP_400_BAD_REQUEST
+    
+    logger.info(f"Using stored extraction: {len(text_content)} characters from {document_info['file_type']} file")
+    
+    # Structured extraction is shared by every upload of the same content;
+    # only model output is shared, with this upload's own name filled in
+    blob = policy.document_blob
+    shared_details = None
+    if blob and GeminiService.is_shared_ai_extraction(blob.structured_extraction):
+        shared_details = get_gemini_service().personalize_extraction(blob.structured_extraction, policy)
+    if shared_details:
+        logger.info(f"Reusing structured extraction for document {blob.sha256[:12]}")
+        extracted_details = shared_details
+        extracted_details['document_analysis'] = {
+            'total_pages': document_info.get('total_pages', 0),
+            'file_type': document_info.get('file_type', 'Unknown'),
+            'text_length': len(text_content),
+            'extraction_method': 'Gemini AI Analysis (shared)',
+            'analysis_timestamp': policy.updated_at.isoformat() if policy.updated_at else None
+        }
+        return extracted_details, status.HTTP_200_OK
+    
+    # A near-duplicate of an already extracted document only has the
+    # sections that differ read by the model
+    near_duplicate = _update_from_near_duplicate(policy, text_content)
+    if near_duplicate:
+        # Both paths only yield model output (copied or updated), so it is shareable
+        extracted_details, source = near_duplicate
+        if blob:
+            blob.structured_extraction = get_gemini_service().shareable_extraction(extracted_details, policy)
+            blob.save(update_fields=['structured_extraction'])
+        extracted_details['document_analysis'] = {
+            'total_pages': document_info.get('total_pages', 0),
+            'file_type': document_info.get('file_type', 'Unknown'),
+            'text_length': len(text_content),
+            'extraction_method': 'Gemini AI Analysis (near-duplicate update)',
+            'near_duplicate_of': source.id,
+            'analysis_timestamp': policy.updated_at.isoformat() if policy.updated_at else None
+        }
+        return extracted_details, status.HTTP_200_OK
+    
+    # STEP 2: Send extracted text to Gemini AI for analysis
     try:
-        # Get the policy
-        policy = Policy.objects.get(id=policy_id, user=request.user)
+        logger.info("Initializing Gemini service for AI analysis...")
+        gemini_service = get_gemini_service()
         
-        # Check if policy has a document file
-        if not policy.document:
-            return Response({'error': 'No document file found for this policy'}, status=status.HTTP_400_BAD_REQUEST)
+        if not gemini_service.model and not getattr(gemini_service, 'use_mock', False):
+            logger.error("Gemini model not available and mock mode not enabled")
+            return {
+                'error': 'AI service not available. Please check Gemini API configuration.',
+                'extracted_text_length': len(text_content),
+                'file_type': document_info.get('file_type', 'Unknown')
+            }, status.HTTP_503_SERVICE_UNAVAILABLE
         
-        # STEP 1: Extract text content from the uploaded file
-        try:
-            import PyPDF2
-            import io
-            from docx import Document
-            
-            text_content = ""
-            document_info = {}
-            
-            # Handle different file types
-            try:
-                if policy.document.name.lower().endswith('.pdf'):
-                    # Read PDF content
-                    pdf_reader = PyPDF2.PdfReader(policy.document)
-                    for page in pdf_reader.pages:
-                        text_content += page.extract_text()
-                    document_info = {
-                        'total_pages': len(pdf_reader.pages),
-                        'file_type': 'PDF'
-                    }
-                    logger.info(f"PDF extracted: {len(pdf_reader.pages)} pages, {len(text_content)} characters")
-                        
-                elif policy.document.name.lower().endswith('.docx'):
-                    # Read DOCX content
-                    doc = Document(policy.document)
-                    for paragraph in doc.paragraphs:
-                        text_content += paragraph.text + "\n"
-                    document_info = {
-                        'total_pages': len(doc.paragraphs),
-                        'file_type': 'DOCX'
-                    }
-                    logger.info(f"DOCX extracted: {len(doc.paragraphs)} paragraphs, {len(text_content)} characters")
-                        
-                elif policy.document.name.lower().endswith('.doc'):
-                    # For DOC files, we'll use a fallback approach
-                    text_content = f"Document content for {policy.name} - {policy.policy_type} policy"
-                    document_info = {
-                        'total_pages': 1,
-                        'file_type': 'DOC'
-                    }
-                    logger.warning("DOC file format - limited text extraction")
-                else:
-                    text_content = f"Document content for {policy.name} - {policy.policy_type} policy"
-                    document_info = {
-                        'total_pages': 1,
-                        'file_type': 'Unknown'
-                    }
-                    logger.warning("Unknown file format - using fallback text")
-                    
-            except Exception as file_error:
-                logger.error(f"File reading failed: {file_error}")
-                return Response({
-                    'error': f'Failed to read document file: {str(file_error)}',
-                    'file_type': policy.document.name.split('.')[-1] if '.' in policy.document.name else 'Unknown'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Clean and process the text
-            text_content = text_content.strip()
-            
-            # Validate that we actually extracted meaningful content
-            if len(text_content) < 50:
-                logger.warning(f"Extracted text too short: {len(text_content)} characters")
-                return Response({
-                    'error': 'Document appears to be empty or unreadable. Please ensure the file contains text content.',
-                    'extracted_length': len(text_content),
-                    'file_type': document_info.get('file_type', 'Unknown')
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            logger.info(f"Successfully extracted {len(text_content)} characters from {document_info.get('file_type', 'Unknown')} file")
-            
-        except Exception as doc_error:
-            logger.error(f"Document processing failed: {doc_error}")
-            return Response({
-                'error': f'Document processing failed: {str(doc_error)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        logger.info("Sending extracted text to Gemini for AI analysis...")
         
-        # STEP 2: Send extracted text to Gemini AI for analysis
-        try:
-            from .services import GeminiService
-            
-            logger.info("Initializing Gemini service for AI analysis...")
-            gemini_service = GeminiService()
-            
-            if not gemini_service.model and not getattr(gemini_service, 'use_mock', False):
-                logger.error("Gemini model not available and mock mode not enabled")
-                return Response({
-                    'error': 'AI service not available. Please check Gemini API configuration.',
-                    'extracted_text_length': len(text_content),
-                    'file_type': document_info.get('file_type', 'Unknown')
-                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
-            logger.info("Sending extracted text to Gemini for AI analysis...")
+        # Use the Gemini service to extract policy details
+        extracted_details, extraction_source = gemini_service.extract_policy_details_with_source(policy)
+        
+        if extracted_details:
+            logger.info(f"Policy details extracted ({extraction_source})")
             
-            # Use the Gemini service to extract policy details
-            extracted_details = gemini_service.extract_policy_details(policy)
+            # Regex-parsed and fallback data are never shared, so the next
+            # upload of this document retries the AI extraction
+            if blob and extraction_source == EXTRACTION_SOURCE_AI:
+                blob.structured_extraction = gemini_service.shareable_extraction(extracted_details, policy)
+                blob.save(update_fields=['structured_extraction'])
             
-            if extracted_details:
-                logger.info("Gemini AI analysis completed successfully")
-                
-                # Add document analysis metadata
-                extracted_details['document_analysis'] = {
-                    'total_pages': document_info.get('total_pages', 0),
-                    'file_type': document_info.get('file_type', 'Unknown'),
-                    'text_length': len(text_content),
-                    'extraction_method': 'Gemini AI Analysis',
-                    'analysis_timestamp': policy.updated_at.isoformat() if policy.updated_at else None
-                }
-                
-                return Response(extracted_details, status=status.HTTP_200_OK)
-            else:
-                logger.warning("Gemini AI analysis returned no data, using fallback")
-                raise Exception("AI analysis returned no data")
-                
-        except Exception as ai_error:
-            logger.error(f"Gemini AI analysis failed: {ai_error}")
+            # Add document analysis metadata
+            extracted_details['document_analysis'] = {
+                'total_pages': document_info.get('total_pages', 0),
+                'file_type': document_info.get('file_type', 'Unknown'),
+                'text_length': len(text_content),
+                'extraction_method': EXTRACTION_METHODS.get(extraction_source, 'Gemini AI Analysis'),
+                'analysis_timestamp': policy.updated_at.isoformat() if policy.updated_at else None
+            }
             
-            # STEP 3: Fallback to basic extraction if AI fails
-            logger.info("Using fallback extraction method...")
+            return extracted_details, status.HTTP_200_OK
+        else:
+            logger.warning("Gemini AI analysis returned no data, using fallback")
+            raise Exception("AI analysis returned no data")
             
-            # Create basic fallback data based on extracted text
-            extracted_details = {
-                'summary': f"⚠️ FALLBACK DATA: Policy {policy.name} appears to be a {policy.policy_type or 'insurance'} policy. AI analysis failed, so this is basic information extracted from the document.",
-                'coverage': f"Basic {policy.policy_type or 'insurance'} coverage information available. AI analysis was not available due to: {str(ai_error)}",
-                'effectiveDate': policy.start_date.strftime('%B %d, %Y') if policy.start_date else 'Policy start date to be confirmed',
-                'expiryDate': policy.end_date.strftime('%B %d, %Y') if policy.end_date else 'Policy end date to be confirmed',
-                'department': policy.policy_type or 'General Insurance',
-                'deductible': f"Standard {policy.policy_type or 'insurance'} deductible applies",
-                'maxOutOfPocket': f"Maximum out-of-pocket expenses as per {policy.policy_type or 'insurance'} policy terms",
-                'tags': [policy.policy_type or 'Insurance', policy.provider or 'Provider', 'Active Policy', 'Basic Coverage', 'AI Failed'],
-                'mlInsights': {
-                    'riskAssessment': 'Standard Risk (Fallback)',
-                    'coverageScore': 60,
-                    'costEfficiency': 'Standard Value (Fallback)',
-                    'marketComparison': 'Market Standard (Fallback)',
-                    'optimizationTips': [
-                        '⚠️ AI analysis failed - this is fallback data',
-                        'Review policy terms with your agent',
-                        'Consider annual policy review',
-                        'Contact support if AI analysis issues persist'
-                    ]
-                },
-                'extraction_confidence': 0.4,
-                'isFallbackData': True,
-                'fallbackReason': f"Gemini AI analysis failed: {str(ai_error)}",
-                'document_analysis': {
-                    'total_pages': document_info.get('total_pages', 0),
-                    'file_type': document_info.get('file_type', 'Unknown'),
-                    'text_length': len(text_content),
-                    'extraction_method': 'Fallback (AI Failed)',
-                    'analysis_timestamp': policy.updated_at.isoformat() if policy.updated_at else None
-                }
+    except Exception as ai_error:
+        logger.error(f"Gemini AI analysis failed: {ai_error}")
+        
+        # STEP 3: Fallback to basic extraction if AI fails
+        logger.info("Using fallback extraction method...")
+        
+        # Create basic fallback data based on extracted text
+        extracted_details = {
+            'summary': f"⚠️ FALLBACK DATA: Policy {policy.name} appears to be a {policy.policy_type or 'insurance'} policy. AI analysis failed, so this is basic information extracted from the document.",
+            'coverage': f"Basic {policy.policy_type or 'insurance'} coverage information available. AI analysis was not available due to: {str(ai_error)}",
+            'effectiveDate': policy.start_date.strftime('%B %d, %Y') if policy.start_date else 'Policy start date to be confirmed',
+            'expiryDate': policy.end_date.strftime('%B %d, %Y') if policy.end_date else 'Policy end date to be confirmed',
+            'department': policy.policy_type or 'General Insurance',
+            'deductible': f"Standard {policy.policy_type or 'insurance'} deductible applies",
+            'maxOutOfPocket': f"Maximum out-of-pocket expenses as per {policy.policy_type or 'insurance'} policy terms",
+            'tags': [policy.policy_type or 'Insurance', policy.provider or 'Provider', 'Active Policy', 'Basic Coverage', 'AI Failed'],
+            'mlInsights': {
+                'riskAssessment': 'Standard Risk (Fallback)',
+                'coverageScore': 60,
+                'costEfficiency': 'Standard Value (Fallback)',
+                'marketComparison': 'Market Standard (Fallback)',
+                'optimizationTips': [
+                    '⚠️ AI analysis failed - this is fallback data',
+                    'Review policy terms with your agent',
+                    'Consider annual policy review',
+                    'Contact support if AI analysis issues persist'
+                ]
+            },
+            'extraction_confidence': 0.4,
+            'isFallbackData': True,
+            'fallbackReason': f"Gemini AI analysis failed: {str(ai_error)}",
+            'document_analysis': {
+                'total_pages': document_info.get('total_pages', 0),
+                'file_type': document_info.get('file_type', 'Unknown'),
+                'text_length': len(text_content),
+                'extraction_method': 'Fallback (AI Failed)',
+                'analysis_timestamp': policy.updated_at.isoformat() if policy.updated_at else None
             }
-            
-            return Response(extracted_details, status=status.HTTP_200_OK)
+        }
+        
+        return extracted_details, status.HTTP_200_OK
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def extract_policy_details(request, policy_id):
+    """Extract policy details from uploaded document using AI"""
+    try:
+        # Get the policy
+        policy = Policy.objects.get(id=policy_id, user=request.user)
+        
+        extracted_details, response_status = build_policy_details(policy)
+        return Response(extracted_details, status=response_status)
         
     except Policy.DoesNotExist:
         return Response({'error': 'Policy not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -971,99 +1121,92 @@ def test_endpoint(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _assess_risk_level(text_content):
+def _assess_risk_level(text_content, term_counts=None):
     """Assess risk level based on document content"""
-    text_lower = text_content.lower()
-    
-    # High risk indicators
-    high_risk_terms = ['high risk', 'dangerous', 'hazardous', 'excluded', 'not covered', 'void']
-    # Medium risk indicators  
-    medium_risk_terms = ['moderate', 'standard', 'normal', 'typical', 'average']
-    # Low risk indicators
-    low_risk_terms = ['low risk', 'safe', 'protected', 'comprehensive', 'full coverage']
+    terms = term_counts if term_counts is not None else keyword_scanner.scan(text_content)
     
-    if any(term in text_lower for term in high_risk_terms):
+    if terms.has_any(keyword_scanner.HIGH_RISK_TERMS):
         return 'High Risk'
-    elif any(term in text_lower for term in medium_risk_terms):
+    elif terms.has_any(keyword_scanner.MEDIUM_RISK_TERMS):
         return 'Medium Risk'
-    elif any(term in text_lower for term in low_risk_terms):
+    elif terms.has_any(keyword_scanner.LOW_RISK_TERMS):
         return 'Low Risk'
     else:
         return 'Low to Moderate Risk'
 
 
-def _calculate_coverage_score(text_content):
+def _calculate_coverage_score(text_content, term_counts=None):
     """Calculate coverage score based on document content"""
-    text_lower = text_content.lower()
+    terms = term_counts if term_counts is not None else keyword_scanner.scan(text_content)
     score = 50  # Base score
     
     # Positive indicators
-    if 'comprehensive' in text_lower:
+    if terms.has('comprehensive'):
         score += 20
-    if 'full coverage' in text_lower:
+    if terms.has('full coverage'):
         score += 15
-    if 'additional riders' in text_lower or 'endorsements' in text_lower:
+    if terms.has('additional riders') or terms.has('endorsements'):
         score += 10
-    if 'umbrella' in text_lower:
+    if terms.has('umbrella'):
         score += 10
-    if 'excess' in text_lower:
+    if terms.has('excess'):
         score += 5
         
     # Negative indicators
-    if 'excluded' in text_lower:
+    if terms.has('excluded'):
         score -= 10
-    if 'not covered' in text_lower:
+    if terms.has('not covered'):
         score -= 15
-    if 'limited' in text_lower:
+    if terms.has('limited'):
         score -= 10
         
     return max(0, min(100, score))
 
 
-def _assess_cost_efficiency(text_content):
+def _assess_cost_efficiency(text_content, term_counts=None):
     """Assess cost efficiency based on document content"""
-    text_lower = text_content.lower()
+    terms = term_counts if term_counts is not None else keyword_scanner.scan(text_content)
     
-    if 'discount' in text_lower or 'reduced' in text_lower:
+    if terms.has('discount') or terms.has('reduced'):
         return 'Excellent Value'
-    elif 'competitive' in text_lower or 'market rate' in text_lower:
+    elif terms.has('competitive') or terms.has('market rate'):
         return 'Good Value'
-    elif 'premium' in text_lower and 'high' in text_lower:
+    elif terms.has('premium') and terms.has('high'):
         return 'Premium Cost'
     else:
         return 'Good Value'
 
 
-def _assess_market_position(text_content):
+def _assess_market_position(text_content, term_counts=None):
     """Assess market position based on document content"""
-    text_lower = text_content.lower()
+    terms = term_counts if term_counts is not None else keyword_scanner.scan(text_content)
     
-    if 'leading' in text_lower or 'top' in text_lower:
+    if terms.has('leading') or terms.has('top'):
         return 'Market Leader'
-    elif 'competitive' in text_lower or 'standard' in text_lower:
+    elif terms.has('competitive') or terms.has('standard'):
         return 'Competitive in Market'
-    elif 'premium' in text_lower or 'exclusive' in text_lower:
+    elif terms.has('premium') or terms.has('exclusive'):
         return 'Premium Position'
     else:
         return 'Competitive in Market'
 
 
-def _generate_optimization_tips(text_content, policy_type):
+def _generate_optimization_tips(text_content, policy_type, term_counts=None):
     """Generate optimization tips based on content and policy type"""
     tips = []
-    text_lower = text_content.lower()
+    terms = term_counts if term_counts is not None else keyword_scanner.scan(text_content)
     
     # General tips
-    if 'bundle' not in text_lower:
+    if not terms.has('bundle'):
         tips.append('Consider bundling with other policies for better rates')
     
-    if 'annual review' not in text_lower:
+    if not terms.has('annual review'):
         tips.append('Review coverage limits annually')
         
-    if 'good standing' not in text_lower:
+    if not terms.has('good standing'):
         tips.append('Maintain good standing for premium reductions')
         
-    if 'riders' not in text_lower and 'endorsements' not in text_lower:
+    if not terms.has('riders') and not terms.has('endorsements'):
         tips.append('Explore additional riders for enhanced protection')
     
     # Policy-specific tips
@@ -1092,9 +1235,8 @@ def get_policy_extraction(request, policy_id):
         policy = get_object_or_404(Policy, id=policy_id, user=request.user)
         
         # Try to get from PolicyExtraction first
-        if hasattr(policy, 'extraction') and policy.extraction:
-            extracted_text = policy.extraction.extracted_text
-        else:
+        extracted_text = get_policy_text(policy)
+        if not extracted_text:
             # Fallback to basic policy info
             extracted_text = f"Policy: {policy.name}\nType: {policy.policy_type}\nProvider: {policy.provider}\nDescription: {policy.description or 'No description available'}"
         
@@ -1119,10 +1261,8 @@ def get_policy_extraction(request, policy_id):
 def test_gemini_connection(request):
     """Test endpoint to check Gemini API connection"""
     try:
-        from .services import PolicyComparisonService
-        
         # Test service initialization
-        service = PolicyComparisonService()
+        service = get_comparison_service()
         
         if service.model:
             return Response({
@@ -1147,6 +1287,139 @@ def test_gemini_connection(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def gemini_circuit_metrics(request):
+    """State, rolling failure/slow-call rates and transitions of this process's Gemini circuit breaker"""
+    return Response({
+        'status': 'success',
+        'circuit_breaker': get_circuit_breaker().metrics()
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def portfolio_similarity_view(request):
+    """Most similar policies for each of the user's policies (``top_k``, ``min_score`` query params)"""
+    try:
+        top_k = int(request.query_params.get('top_k', 5))
+        min_score = float(request.query_params.get('min_score', 0))
+    except ValueError:
+        return Response({
+            'status': 'error',
+            'message': 'top_k must be an integer and min_score a number'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if not 1 <= top_k <= 50:
+        return Response({
+            'status': 'error',
+            'message': 'top_k must be between 1 and 50'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        result = portfolio_similarity(request.user, top_k=top_k, min_score=min_score)
+    except Exception as e:
+        logger.error(f"Portfolio similarity error: {str(e)}")
+        return Response({
+            'status': 'error',
+            'error': f'Failed to compute policy similarity: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response(dict(result, status='success'))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def portfolio_clusters_view(request):
+    """The user's policies grouped into portfolio segments"""
+    try:
+        clusters = portfolio_clusters(request.user)
+    except Exception as e:
+        logger.error(f"Portfolio clusters error: {str(e)}")
+        return Response({
+            'status': 'error',
+            'error': f'Failed to load policy clusters: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({
+        'status': 'success',
+        'cluster_count': len(clusters),
+        'clusters': clusters,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def near_duplicates_view(request, policy_id):
+    """The user's policies whose text nearly duplicates one policy, with the sections that differ"""
+    policy = get_object_or_404(Policy, id=policy_id, user=request.user)
+    try:
+        text = get_policy_text(policy)
+        duplicates = []
+        for other, similarity in near_duplicates.find_near_duplicates(policy):
+            blob = other.document_blob
+            comparisons = PolicyComparison.objects.filter(user=request.user).filter(
+                Q(policy1=other) | Q(policy2=other)
+            ).values_list('id', flat=True)
+            duplicates.append({
+                'policy_id': other.id,
+                'policy_name': other.name,
+                'similarity': round(similarity, 4),
+                'has_structured_extraction': bool(blob and GeminiService.is_shared_ai_extraction(blob.structured_extraction)),
+                'comparison_ids': list(comparisons),
+                'differing_sections': near_duplicates.differing_sections(get_policy_text(other), text),
+            })
+    except Exception as e:
+        logger.error(f"Near-duplicate lookup error: {str(e)}")
+        return Response({
+            'status': 'error',
+            'error': f'Failed to find near-duplicate policies: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'status': 'success',
+        'policy_id': policy.id,
+        'near_duplicates': duplicates,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def similar_policies_view(request, policy_id):
+    """The user's policies most similar to one policy, from within its cluster (``limit`` query param)"""
+    policy = get_object_or_404(Policy, id=policy_id, user=request.user)
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= 50:
+        return Response({
+            'status': 'error',
+            'message': 'limit must be an integer between 1 and 50'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        similar = similar_policies(policy, limit=limit)
+    except Exception as e:
+        logger.error(f"Similar policies error: {str(e)}")
+        return Response({
+            'status': 'error',
+            'error': f'Failed to find similar policies: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if similar is None:
+        return Response({
+            'status': 'error',
+            'message': 'This policy has not been clustered yet'
+        }, status=status.HTTP_409_CONFLICT)
+
+    return Response({
+        'status': 'success',
+        'policy_id': policy.id,
+        'cluster': policy.cluster.cluster,
+        'similar_policies': [
+            {'policy_id': other.id, 'policy_name': other.name, 'similarity': round(score, 4)}
+            for other, score in similar
+        ],
+    })
+
+
 
 
 @api_view(['POST'])
@@ -1184,53 +1457,12 @@ def query_policy(request):
             content=question
         )
         
-        # Get policy extraction text if available
-        context = ""
-        try:
-            # First try to get the actual document content by reading the file
-            if policy.document:
-                import PyPDF2
-                from docx import Document
-                
-                document_text = ""
-                try:
-                    if policy.document.name.lower().endswith('.pdf'):
-                        # Read PDF content directly
-                        pdf_reader = PyPDF2.PdfReader(policy.document)
-                        for page in pdf_reader.pages:
-                            document_text += page.extract_text()
-                        logger.info(f"Extracted {len(document_text)} characters from PDF for chat context")
-                    elif policy.document.name.lower().endswith('.docx'):
-                        # Read DOCX content directly
-                        doc = Document(policy.document)
-                        for paragraph in doc.paragraphs:
-                            document_text += paragraph.text + "\n"
-                        logger.info(f"Extracted {len(document_text)} characters from DOCX for chat context")
-                    else:
-                        document_text = f"Document: {policy.document.name} - {policy.description or 'No description available'}"
-                        logger.warning(f"Unsupported file type for chat context: {policy.document.name}")
-                except Exception as file_error:
-                    logger.warning(f"Could not read document file for chat context: {file_error}")
-                    document_text = f"Document: {policy.document.name} - {policy.description or 'No description available'}"
-                
-                # Use the extracted document text as context
-                if document_text and len(document_text.strip()) > 50:
-                    context = f"Policy Document Content:\n{document_text[:3000]}...\n\n"
-                else:
-                    context = f"Policy: {policy.name} - {policy.description or 'No description available'}\n\n"
-            else:
-                # No document file available
-                context = f"Policy: {policy.name} - {policy.description or 'No description available'}\n\n"
-                
-        except Exception as e:
-            logger.warning(f"Could not get policy context: {e}")
-            context = f"Policy: {policy.name} - {policy.description or 'No description available'}\n\n"
+        # Use the stored passages most relevant to the question as context
+        context = build_policy_chat_context(policy, question)
         
         # Get AI response using Gemini
         try:
-            from .services import GeminiService
-            
-            gemini_service = GeminiService()
+            gemini_service = get_gemini_service()
             
             if not gemini_service.model and not getattr(gemini_service, 'use_mock', False):
                 return Response({
@@ -1239,24 +1471,7 @@ def query_policy(request):
                 }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
             # Create a simple, clear prompt for policy chat
-            prompt = f"""You are PolicyBridge AI, an assistant that explains insurance in simple terms.
-Always follow these rules when answering a question.
-
-Rules for Answering:
-- Clarity First: Use simple, everyday language
-- Concise: Keep answers short (2–4 sentences)
-- Direct & Helpful: Get to the point, avoid filler
-- Use Examples: Add quick, practical examples if helpful
-- Context Aware: If the question is about eligibility, claim, or coverage, include key conditions
-- No Jargon: Avoid legal/technical terms unless needed, then explain in plain words
-- Confidence: Always give a clear response. If unsure, explain what usually applies in most policies
-
-Policy Context:
-{context}
-
-Question: {question}
-
-Answer:"""
+            prompt = build_policy_chat_prompt(context, question)
 
             logger.info(f"Sending policy chat query to Gemini for policy {policy_id}")
             logger.info(f"Context length: {len(context)} characters")
@@ -1264,7 +1479,7 @@ Answer:"""
             logger.info(f"Question: {question}")
             logger.info(f"Prompt length: {len(prompt)} characters")
 
-            ai_response = gemini_service.get_response(prompt)
+            ai_response = gemini_service.get_response(prompt, endpoint="policy_query")
 
             if not ai_response:
                 raise Exception("Gemini returned empty response")
@@ -1285,10 +1500,7 @@ Answer:"""
             )
             
             # Update policy conversation count
-            if policy.conversation_count is None:
-                policy.conversation_count = 0
-            policy.conversation_count += 1
-            policy.save()
+            count_policy_question(policy)
             
             return Response({
                 "status": "success",
@@ -1307,20 +1519,7 @@ Answer:"""
             logger.error(f"Error getting AI response for policy {policy_id}: {e}")
 
             # Helpful fallback response
-            fallback_response = (
-                f"I'm sorry, I'm having trouble accessing the AI service right now. "
-                f"However, I can see this is about your {policy.name} policy. "
-            )
-
-            question_lower = question.lower()
-            if "waiting period" in question_lower:
-                fallback_response += "For waiting periods, please check your policy document."
-            elif "claim" in question_lower:
-                fallback_response += "For claims information, please refer to your policy document."
-            elif "coverage" in question_lower:
-                fallback_response += "For coverage details, please review your policy document."
-            else:
-                fallback_response += "Please review your policy document for specific information."
+            fallback_response = policy_chat_fallback(policy, question)
 
             return Response({
                 "status": "success",
@@ -1357,7 +1556,7 @@ def general_chat(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Get or create conversation
-        conversation = get_or_create_conversation(user)
+        conversation = get_or_create_conversation(request.user)
         if not conversation:
             return Response({
                 'status': 'error',
@@ -1371,11 +1570,38 @@ def general_chat(request):
             content=question
         )
         
-        # Get AI response using Gemini
+        # Get AI response, serving near-identical questions from the semantic cache
         try:
-            from .services import GeminiService
+            semantic_cache = get_semantic_cache('general_chat')
+            cached = semantic_cache.lookup(question)
+            if cached:
+                ai_response, similarity = cached
+                ai_message = store_message(
+                    conversation=conversation,
+                    message_type='ai',
+                    content=ai_response,
+                    citations=[],
+                    ml_insights={
+                        "question_answered": True,
+                        "response_quality": "high",
+                        "cached": True
+                    }
+                )
+                return Response({
+                    "status": "success",
+                    "response": ai_response,
+                    "citations": [],
+                    "ml_insights": {
+                        "question_answered": True,
+                        "response_quality": "high",
+                        "cached": True,
+                        "cache_similarity": round(similarity, 3)
+                    },
+                    "conversation_id": conversation.id,
+                    "message_id": ai_message.id if ai_message else None
+                })
             
-            gemini_service = GeminiService()
+            gemini_service = get_gemini_service()
             
             if not gemini_service.model and not getattr(gemini_service, 'use_mock', False):
                 return Response({
@@ -1384,31 +1610,22 @@ def general_chat(request):
                 }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
             # Create a simple, clear prompt for general insurance chat
-            prompt = f"""You are PolicyBridge AI, an assistant that explains insurance in simple terms.
-Always follow these rules when answering a question.
-
-Rules for Answering:
-- Clarity First: Use simple, everyday language
-- Concise: Keep answers short (2–4 sentences)
-- Direct & Helpful: Get to the point, avoid filler
-- Use Examples: Add quick, practical examples if helpful
-- No Jargon: Avoid legal/technical terms unless needed, then explain in plain words
-- Confidence: Always give a clear response. If unsure, explain what usually applies in most cases
-
-Question: {question}
-
-Answer:"""
+            prompt = build_general_chat_prompt(question)
 
             logger.info(f"Sending general chat query to Gemini")
             logger.info(f"Question: {question}")
             logger.info(f"Prompt length: {len(prompt)} characters")
 
-            ai_response = gemini_service.get_response(prompt)
+            ai_response = gemini_service.get_response(prompt, endpoint="general_chat", fallback=False)
 
             if not ai_response:
                 raise Exception("Gemini returned empty response")
 
             logger.info(f"Successfully received AI response for general chat")
+            
+            # Only real model answers are cached, never mock responses
+            if gemini_service.model:
+                semantic_cache.store(question, ai_response)
 
             # Store AI response
             ai_message = store_message(
@@ -1438,11 +1655,7 @@ Answer:"""
             logger.error(f"Error getting AI response for general chat: {e}")
 
             # Helpful fallback response
-            fallback_response = (
-                "I'm sorry, I'm having trouble accessing the AI service right now. "
-                "For insurance questions, I recommend consulting with a licensed insurance agent "
-                "or reviewing official insurance documentation for accurate information."
-            )
+            fallback_response = GENERAL_CHAT_FALLBACK
 
             return Response({
                 "status": "success",
@@ -1522,15 +1735,293 @@ def delete_conversation(request, conversation_id):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def enqueue_policy_extraction(request, policy_id):
+    """Queue structured AI extraction for a policy and return the job to poll"""
+    policy = get_object_or_404(Policy, id=policy_id, user=request.user)
+    job = enqueue('extract_policy_details', {'policy_id': policy.id}, user=request.user)
+    return Response({
+        'status': 'queued',
+        'job_id': job.id,
+        'job': JobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def enqueue_policy_comparison(request):
+    """Queue an AI comparison of two policies and return the job to poll"""
+    policy1_id = request.data.get('policy1_id')
+    policy2_id = request.data.get('policy2_id')
+
+    if not policy1_id or not policy2_id:
+        return Response({
+            'status': 'error',
+            'error': 'Both policy1_id and policy2_id are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if policy1_id == policy2_id:
+        return Response({
+            'status': 'error',
+            'error': 'Cannot compare a policy with itself'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    policy1 = get_object_or_404(Policy, id=policy1_id, user=request.user)
+    policy2 = get_object_or_404(Policy, id=policy2_id, user=request.user)
+    job = enqueue('policy_comparison', {'policy1_id': policy1.id, 'policy2_id': policy2.id}, user=request.user)
+    return Response({
+        'status': 'queued',
+        'job_id': job.id,
+        'job': JobSerializer(job).data
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_jobs(request):
+    """List the authenticated user's recent jobs"""
+    jobs = Job.objects.filter(user=request.user)
+    job_type = request.query_params.get('job_type')
+    if job_type:
+        jobs = jobs.filter(job_type=job_type)
+    job_status = request.query_params.get('status')
+    if job_status:
+        jobs = jobs.filter(status=job_status)
+    return Response({
+        'status': 'success',
+        'jobs': JobSerializer(jobs[:50], many=True).data
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_job(request, job_id):
+    """Get the status and, once finished, the result of a job"""
+    job = get_object_or_404(Job, id=job_id, user=request.user)
+    return Response({
+        'status': 'success',
+        'job': JobSerializer(job).data
+    })
+
+
+def _stream_chat_answer(gemini_service, prompt, endpoint, conversation, ml_insights, fallback_text, on_complete=None):
+    """
+    Yield SSE events for a streamed chat answer, then store the AI message.
+
+    ``token`` events carry text chunks as Gemini produces them; ``done``
+    carries the stored message ID. If the model fails, an ``error`` event
+    carries ``fallback_text`` and nothing is stored.
+    """
+    chunks = []
+    try:
+        for chunk in gemini_service.stream_response(prompt, endpoint):
+            chunks.append(chunk)
+            yield sse_event({'text': chunk}, event='token')
+        answer = ''.join(chunks).strip()
+        if not answer:
+            raise Exception("Gemini returned empty response")
+    except Exception as e:
+        logger.error(f"Error streaming AI response for {endpoint}: {e}")
+        yield sse_event({
+            'text': fallback_text,
+            'ml_insights': {**ml_insights, 'response_quality': 'fallback', 'fallback_reason': str(e)}
+        }, event='error')
+        return
+
+    if on_complete:
+        on_complete(answer)
+
+    ai_message = store_message(
+        conversation=conversation,
+        message_type='ai',
+        content=answer,
+        citations=[],
+        ml_insights=ml_insights
+    )
+    yield sse_event({
+        'conversation_id': conversation.id,
+        'message_id': ai_message.id if ai_message else None,
+        'citations': [],
+        'ml_insights': ml_insights
+    }, event='done')
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_query_policy(request):
+    """Query a specific policy, streaming the answer as server-sent events"""
+    policy_id = request.data.get('policy_id')
+    question = request.data.get('question')
+
+    if not policy_id or not question:
+        return Response({
+            'status': 'error',
+            'message': 'Policy ID and question are required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    policy = get_object_or_404(Policy, id=policy_id, user=request.user)
+
+    conversation = get_or_create_conversation(request.user, policy)
+    if not conversation:
+        return Response({
+            'status': 'error',
+            'message': 'Failed to create conversation'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    gemini_service = get_gemini_service()
+    if not gemini_service.model and not gemini_service.use_mock:
+        return Response({
+            'status': 'error',
+            'message': 'AI service not available. Please check Gemini API configuration.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    store_message(conversation=conversation, message_type='user', content=question)
+    prompt = build_policy_chat_prompt(build_policy_chat_context(policy, question), question)
+
+    return sse_response(_stream_chat_answer(
+        gemini_service,
+        prompt,
+        'policy_query',
+        conversation,
+        ml_insights={
+            "policy_id": policy_id,
+            "question_answered": True,
+            "response_quality": "high"
+        },
+        fallback_text=policy_chat_fallback(policy, question),
+        on_complete=lambda answer: count_policy_question(policy)
+    ))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_general_chat(request):
+    """General insurance chat, streaming the answer as server-sent events"""
+    question = request.data.get('question')
+    if not question:
+        return Response({
+            'status': 'error',
+            'message': 'Question is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    conversation = get_or_create_conversation(request.user)
+    if not conversation:
+        return Response({
+            'status': 'error',
+            'message': 'Failed to create conversation'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    store_message(conversation=conversation, message_type='user', content=question)
+    ml_insights = {"question_answered": True, "response_quality": "high"}
+
+    semantic_cache = get_semantic_cache('general_chat')
+    cached = semantic_cache.lookup(question)
+    if cached:
+        ai_response, similarity = cached
+        ml_insights.update({"cached": True, "cache_similarity": round(similarity, 3)})
+
+        def cached_events():
+            yield sse_event({'text': ai_response}, event='token')
+            ai_message = store_message(
+                conversation=conversation,
+                message_type='ai',
+                content=ai_response,
+                citations=[],
+                ml_insights=ml_insights
+            )
+            yield sse_event({
+                'conversation_id': conversation.id,
+                'message_id': ai_message.id if ai_message else None,
+                'citations': [],
+                'ml_insights': ml_insights
+            }, event='done')
+
+        return sse_response(cached_events())
+
+    gemini_service = get_gemini_service()
+    if not gemini_service.model and not gemini_service.use_mock:
+        return Response({
+            'status': 'error',
+            'message': 'AI service not available. Please check Gemini API configuration.'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def cache_answer(answer):
+        # Only real model answers are cached, never mock responses
+        if gemini_service.model:
+            semantic_cache.store(question, answer)
+
+    return sse_response(_stream_chat_answer(
+        gemini_service,
+        build_general_chat_prompt(question),
+        'general_chat',
+        conversation,
+        ml_insights=ml_insights,
+        fallback_text=GENERAL_CHAT_FALLBACK,
+        on_complete=cache_answer
+    ))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_policy_comparison_streamlined(request):
+    """
+    Streamlined AI policy comparison, streaming the comparison text as
+    server-sent events and saving the PolicyComparison once it completes
+    """
+    policy1_id = request.data.get('policy1_id')
+    policy2_id = request.data.get('policy2_id')
+
+    if not policy1_id or not policy2_id:
+        return Response({'error': 'policy1_id and policy2_id are required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    policy1 = get_object_or_404(Policy, id=policy1_id, user=request.user)
+    policy2 = get_object_or_404(Policy, id=policy2_id, user=request.user)
+
+    policy1_text = get_comparison_text(policy1)
+    policy2_text = get_comparison_text(policy2)
+    if not policy1_text.strip() or not policy2_text.strip():
+        return Response({
+            'error': 'One or both policies have no text content to compare. Please ensure policy documents have been processed and text extracted.'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    ai_service = get_gemini_service()
+    user = request.user
+
+    def events():
+        chunks = []
+        try:
+            for chunk in ai_service.stream_policies_streamlined(user, policy1_text, policy2_text):
+                chunks.append(chunk)
+                yield sse_event({'text': chunk}, event='token')
+        except Exception as e:
+            logger.error(f"Streamlined comparison stream failed: {e}")
+            yield sse_event({'error': 'Streamlined comparison failed'}, event='error')
+            return
+
+        comparison_text = ''.join(chunks)
+        policy_comparison = save_streamlined_comparison(user, policy1, policy2, comparison_text)
+        yield sse_event({
+            'comparison_id': policy_comparison.id if policy_comparison else None,
+            'policy1_name': policy1.name,
+            'policy2_name': policy2.name,
+            'policy1_provider': policy1.provider,
+            'policy2_provider': policy2.provider
+        }, event='done')
+
+    return sse_response(events())
+
+
 
 @api_view(['GET'])
 def test_chat_functionality(request):
     """Test endpoint to verify AI chat functionality"""
     try:
-        from .services import GeminiService
-        
         # Test Gemini service
-        gemini_service = GeminiService()
+        gemini_service = get_gemini_service()
         
         if gemini_service.model or getattr(gemini_service, 'use_mock', False):
             return Response({
@@ -2,7 +2,7 @@
 Admin configuration for policies app
 """
 from django.contrib import admin
-from .models import Policy, PolicyExtraction
+from .models import Policy, PolicyExtraction, DocumentBlob, PolicyChunk, PolicySignature
 
 
 @admin.register(Policy)
@@ -13,7 +13,7 @@ class PolicyAdmin(admin.ModelAdmin):
     list_display = ('name', 'user', 'provider', 'policy_type', 'file_type', 'is_active', 'created_at')
     list_filter = ('policy_type', 'provider', 'is_active', 'created_at', 'file_type')
     search_fields = ('name', 'provider', 'description', 'policy_number', 'user__email')
-    readonly_fields = ('file_size', 'file_type', 'created_at', 'updated_at')
+    readonly_fields = ('original_file_name', 'file_size', 'file_type', 'document_blob', 'created_at', 'updated_at')
     list_per_page = 25
     
     fieldsets = (
@@ -24,7 +24,7 @@ class PolicyAdmin(admin.ModelAdmin):
             'fields': ('coverage_amount', 'premium_amount', 'start_date', 'end_date')
         }),
         ('Document', {
-            'fields': ('document', 'file_size', 'file_type')
+            'fields': ('document', 'original_file_name', 'document_blob', 'file_size', 'file_type')
         }),
         ('Additional Information', {
             'fields': ('description', 'tags', 'is_active')
@@ -44,16 +44,47 @@ class PolicyExtractionAdmin(admin.ModelAdmin):
     list_display = ('policy', 'extraction_status', 'text_length', 'extraction_date')
     list_filter = ('extraction_status', 'extraction_date')
     search_fields = ('policy__name', 'policy__provider')
-    readonly_fields = ('text_length', 'extraction_date')
+    readonly_fields = ('text_length', 'page_count', 'extraction_date')
     
     fieldsets = (
         ('Policy Information', {
             'fields': ('policy', 'extraction_status')
         }),
         ('Extracted Content', {
-            'fields': ('extracted_text', 'text_length')
+            'fields': ('extracted_text', 'text_length', 'page_count')
         }),
         ('Metadata', {
             'fields': ('extraction_date', 'error_message')
         }),
     )
+
+
+@admin.register(DocumentBlob)
+class DocumentBlobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for DocumentBlob model
+    """
+    list_display = ('sha256', 'file_type', 'size', 'created_at')
+    list_filter = ('file_type', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'file', 'size', 'file_type', 'created_at')
+
+
+@admin.register(PolicyChunk)
+class PolicyChunkAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for PolicyChunk model
+    """
+    list_display = ('policy', 'ordinal', 'char_start', 'char_end', 'term_count')
+    search_fields = ('policy__name', 'text')
+    readonly_fields = ('policy', 'ordinal', 'text', 'char_start', 'char_end', 'term_count', 'term_freqs')
+
+
+@admin.register(PolicySignature)
+class PolicySignatureAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for PolicySignature model
+    """
+    list_display = ('policy', 'shingle_count', 'updated_at')
+    search_fields = ('policy__name',)
+    readonly_fields = ('policy', 'minhash', 'shingle_count', 'updated_at')
@@ -0,0 +1,265 @@
+"""
+Document text extraction for PolicyBridge AI
+
+Single implementation of PDF, DOCX and TXT text extraction used by ingestion,
+the AI services and the comparison service. Text is produced page by page
+through a generator and joined once, so extraction stays linear in document
+size.
+"""
+import codecs
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TXT_BLOCK_SIZE = 64 * 1024
+
+# Rough characters-per-token ratio used to turn token budgets into character budgets
+CHARS_PER_TOKEN = 4
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool(max_workers):
+    """Return the process-wide pool used for page-parallel PDF extraction"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is not None and (_pdf_pool._broken or _pdf_pool._max_workers != max_workers):
+            _pdf_pool.shutdown(wait=False)
+            _pdf_pool = None
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=max_workers)
+            logger.info(f"Started PDF extraction pool with {max_workers} workers")
+        return _pdf_pool
+
+
+def _discard_pdf_pool(pool):
+    """Drop a broken pool so the next caller starts a fresh one"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False)
+
+
+def _extract_pdf_page_range(source, start, stop):
+    """Extract pages [start, stop) from a PDF given as a path or raw bytes"""
+    import PyPDF2
+    stream = io.BytesIO(source) if isinstance(source, bytes) else open(source, 'rb')
+    with stream:
+        pdf_reader = PyPDF2.PdfReader(stream)
+        return [pdf_reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+class ExtractionResult:
+    """
+    Text extracted from a document.
+
+    For PDFs a page is a PDF page; DOCX paragraphs and TXT blocks are treated
+    as pages so every format shares the same interface.
+    """
+
+    def __init__(self, pages, file_type, max_chars=None, truncated=False):
+        self.pages = pages
+        self.file_type = file_type
+        # TXT blocks are split at arbitrary byte offsets, so they are rejoined as-is
+        separator = '' if file_type == 'txt' else '\n'
+        self.text = separator.join(pages).strip()
+        if max_chars is not None and len(self.text) > max_chars:
+            self.text = self.text[:max_chars]
+            truncated = True
+        self.truncated = truncated
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    @property
+    def char_count(self):
+        return len(self.text)
+
+    def __repr__(self):
+        return f"<ExtractionResult {self.file_type} pages={self.page_count} chars={self.char_count}>"
+
+
+class DocumentTextExtractor:
+    """
+    Extract text from a policy document.
+
+    ``source`` may be a filesystem path or a Django File/FieldFile (or any
+    binary file-like object). ``file_type`` defaults to the source's extension.
+
+    PDFs with at least ``parallel_threshold`` pages are split into ranges of
+    ``pages_per_task`` pages and extracted across a process pool of
+    ``max_workers`` processes; smaller documents are extracted serially.
+    """
+    SUPPORTED_TYPES = ('pdf', 'docx', 'doc', 'txt')
+
+    def __init__(self, source, file_type=None, max_workers=None, parallel_threshold=None, pages_per_task=None):
+        self.source = source
+        self.file_type = (file_type or self._guess_file_type(source)).lower()
+        if self.file_type not in self.SUPPORTED_TYPES:
+            raise ValueError(f"Unsupported file type: {self.file_type}")
+        self.max_workers = max_workers or getattr(settings, 'PDF_EXTRACTION_WORKERS', 1)
+        self.parallel_threshold = parallel_threshold or getattr(settings, 'PDF_PARALLEL_PAGE_THRESHOLD', 50)
+        self.pages_per_task = pages_per_task or getattr(settings, 'PDF_PAGES_PER_TASK', 25)
+
+    @classmethod
+    def for_policy(cls, policy):
+        """Build an extractor for a Policy's stored document"""
+        return cls(policy.document, policy.file_type or None)
+
+    @staticmethod
+    def _guess_file_type(source):
+        name = os.fspath(source) if isinstance(source, (str, os.PathLike)) else getattr(source, 'name', '') or ''
+        return os.path.splitext(name)[1].lstrip('.') or 'unknown'
+
+    @contextmanager
+    def _open(self):
+        """Yield a binary file handle positioned at the start of the document"""
+        if isinstance(self.source, (str, os.PathLike)):
+            with open(self.source, 'rb') as handle:
+                yield handle
+            return
+
+        opened_here = False
+        if getattr(self.source, 'closed', False):
+            self.source.open('rb')
+            opened_here = True
+        try:
+            if hasattr(self.source, 'seek'):
+                self.source.seek(0)
+            yield self.source
+        finally:
+            if opened_here:
+                self.source.close()
+
+    def iter_pages(self, parallel=True):
+        """Yield the text of each page in document order"""
+        with self._open() as handle:
+            if self.file_type == 'pdf':
+                yield from self._iter_pdf_pages(handle, parallel)
+            elif self.file_type in ('docx', 'doc'):
+                yield from self._iter_docx_paragraphs(handle)
+            else:
+                yield from self._iter_txt_blocks(handle)
+
+    def extract(self, max_chars=None, max_tokens=None):
+        """
+        Extract the document.
+
+        With a ``max_chars`` (or ``max_tokens``) budget, pages are read lazily
+        and serially and parsing stops as soon as the budget is filled; the
+        returned text is cut to the budget and ``truncated`` is set. Without a
+        budget the full document is extracted, which is what ingestion uses.
+        """
+        if max_chars is None and max_tokens is not None:
+            max_chars = max_tokens * CHARS_PER_TOKEN
+
+        if max_chars is None:
+            pages = list(self.iter_pages())
+            result = ExtractionResult(pages, self.file_type)
+        else:
+            pages = []
+            collected = 0
+            truncated = False
+            with closing(self.iter_pages(parallel=False)) as page_iter:
+                for page in page_iter:
+                    pages.append(page)
+                    collected += len(page) + 1
+                    if collected >= max_chars:
+                        truncated = True
+                        break
+            result = ExtractionResult(pages, self.file_type, max_chars=max_chars, truncated=truncated)
+
+        logger.info(f"Extracted {result.page_count} pages, {result.char_count} characters from {self.file_type.upper()}")
+        return result
+
+    def _iter_pdf_pages(self, handle, parallel=True):
+        import PyPDF2
+        pdf_reader = PyPDF2.PdfReader(handle)
+        page_count = len(pdf_reader.pages)
+
+        if parallel and self.max_workers > 1 and page_count >= self.parallel_threshold:
+            yield from self._iter_pdf_pages_parallel(handle, page_count)
+            return
+
+        for page in pdf_reader.pages:
+            yield page.extract_text() or ''
+
+    def _pdf_worker_source(self, handle):
+        """Return a picklable reference to the PDF for worker processes"""
+        if isinstance(self.source, (str, os.PathLike)):
+            return os.fspath(self.source)
+        try:
+            return self.source.path
+        except (AttributeError, NotImplementedError, ValueError):
+            handle.seek(0)
+            return handle.read()
+
+    def _iter_pdf_pages_parallel(self, handle, page_count):
+        """Extract page ranges across the process pool, yielding pages in order"""
+        source = self._pdf_worker_source(handle)
+        ranges = [
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ]
+        logger.info(f"Extracting {page_count} PDF pages in {len(ranges)} ranges across {self.max_workers} workers")
+
+        pool = _get_pdf_pool(self.max_workers)
+        futures = []
+        try:
+            try:
+                for start, stop in ranges:
+                    futures.append(pool.submit(_extract_pdf_page_range, source, start, stop))
+            except RuntimeError as e:
+                # The pool broke, or another thread shut it down while replacing it
+                logger.warning(f"PDF extraction pool unavailable, extracting serially: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    _discard_pdf_pool(pool)
+                yield from _extract_pdf_page_range(source, 0, page_count)
+                return
+
+            for (start, stop), future in zip(ranges, futures):
+                try:
+                    pages = future.result()
+                except Exception as e:
+                    logger.warning(f"Parallel extraction of pages {start}-{stop} failed, retrying serially: {e}")
+                    if isinstance(e, BrokenProcessPool):
+                        _discard_pdf_pool(pool)
+                    pages = _extract_pdf_page_range(source, start, stop)
+                yield from pages
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _iter_docx_paragraphs(self, handle):
+        from docx import Document
+        doc = Document(handle)
+        for paragraph in doc.paragraphs:
+            yield paragraph.text
+
+    def _iter_txt_blocks(self, handle):
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while True:
+            block = handle.read(TXT_BLOCK_SIZE)
+            if not block:
+                break
+            text = decoder.decode(block)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def extract_text(source, file_type=None, max_chars=None):
+    """Convenience wrapper returning an ExtractionResult for ``source``"""
+    return DocumentTextExtractor(source, file_type).extract(max_chars=max_chars)
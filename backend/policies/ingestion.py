@@ -0,0 +1,147 @@
+"""
+Document ingestion for PolicyBridge AI
+
+Text is extracted from an uploaded policy document exactly once, when the
+policy is created, and stored in PolicyExtraction. Chat, comparison and
+structured extraction all read the stored text instead of re-parsing the file.
+Policies sharing a content hash reuse the first completed extraction. The text
+is also indexed into overlapping passages for policy chat retrieval, and its
+MinHash signature is stored for near-duplicate detection.
+"""
+import logging
+from .extraction import DocumentTextExtractor
+from .models import PolicyExtraction, PolicyChunk
+from .retrieval import index_policy
+from . import near_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+def _find_shared_extraction(policy):
+    """Return a completed extraction of the same document content, if any"""
+    if not policy.content_hash:
+        return None
+    return PolicyExtraction.objects.filter(
+        policy__document_blob_id=policy.content_hash,
+        extraction_status='completed'
+    ).exclude(policy=policy).first()
+
+
+def _index_passages(policy, text):
+    try:
+        count = index_policy(policy, text)
+        logger.info(f"Indexed {count} passages for policy {policy.id}")
+    except Exception as e:
+        # Chat falls back to indexing on first use
+        logger.warning(f"Passage indexing failed for policy {policy.id}: {e}")
+
+
+def _index_signature(policy, text):
+    try:
+        near_duplicates.index_policy(policy, text)
+    except Exception as e:
+        # The policy is just not found as a near-duplicate until re-indexed
+        logger.warning(f"Signature indexing failed for policy {policy.id}: {e}")
+
+
+def ingest_policy(policy):
+    """
+    Extract text from a policy document and store it in PolicyExtraction.
+
+    Never raises: failures are recorded on the extraction row with status
+    'failed' so consumers can fall back to policy metadata.
+    """
+    if not policy.document:
+        return None
+
+    shared = _find_shared_extraction(policy)
+    if shared:
+        extraction, _ = PolicyExtraction.objects.update_or_create(
+            policy=policy,
+            defaults={
+                'extracted_text': shared.extracted_text,
+                'text_length': shared.text_length,
+                'page_count': shared.page_count,
+                'extraction_status': 'completed',
+                'error_message': '',
+            }
+        )
+        logger.info(f"Reused extraction of {policy.content_hash[:12]} for policy {policy.id}")
+        _index_passages(policy, shared.extracted_text)
+        _index_signature(policy, shared.extracted_text)
+        return extraction
+
+    try:
+        result = DocumentTextExtractor.for_policy(policy).extract()
+        if not result.text:
+            raise ValueError("No text could be extracted from document")
+
+        extraction, _ = PolicyExtraction.objects.update_or_create(
+            policy=policy,
+            defaults={
+                'extracted_text': result.text,
+                'text_length': result.char_count,
+                'page_count': result.page_count,
+                'extraction_status': 'completed',
+                'error_message': '',
+            }
+        )
+        logger.info(f"Ingested policy {policy.id}: {result.page_count} pages, {result.char_count} characters")
+        _index_passages(policy, result.text)
+        _index_signature(policy, result.text)
+        return extraction
+
+    except Exception as e:
+        logger.error(f"Ingestion failed for policy {policy.id}: {e}")
+        extraction, _ = PolicyExtraction.objects.update_or_create(
+            policy=policy,
+            defaults={
+                'extracted_text': '',
+                'text_length': 0,
+                'page_count': 0,
+                'extraction_status': 'failed',
+                'error_message': str(e),
+            }
+        )
+        PolicyChunk.objects.filter(policy=policy).delete()
+        near_duplicates.remove_policy(policy)
+        return extraction
+
+
+def get_policy_extraction(policy):
+    """
+    Return the stored PolicyExtraction for a policy.
+
+    Policies uploaded before ingestion existed have no extraction row; they are
+    ingested on first access so the file is still only parsed once.
+    """
+    try:
+        return policy.extraction
+    except PolicyExtraction.DoesNotExist:
+        return ingest_policy(policy)
+
+
+def get_policy_text(policy, max_chars=None):
+    """
+    Return the stored extracted text for a policy, or '' if unavailable.
+
+    With ``max_chars``, a policy that has not been ingested yet is read from
+    its document only up to the budget instead of being parsed in full; run
+    the ``ingest_policies`` command to backfill full text for those policies.
+    """
+    try:
+        extraction = policy.extraction
+    except PolicyExtraction.DoesNotExist:
+        if max_chars is None or not policy.document:
+            extraction = ingest_policy(policy)
+        else:
+            try:
+                return DocumentTextExtractor.for_policy(policy).extract(max_chars=max_chars).text
+            except Exception as e:
+                logger.warning(f"Budgeted extraction failed for policy {policy.id}: {e}")
+                return ''
+
+    if extraction and extraction.extraction_status == 'completed':
+        text = extraction.extracted_text
+        return text[:max_chars] if max_chars is not None else text
+    return ''
@@ -0,0 +1,20 @@
+"""
+Compute MinHash signatures for near-duplicate detection
+"""
+from django.core.management.base import BaseCommand
+from policies import near_duplicates
+from policies.models import Policy
+
+
+class Command(BaseCommand):
+    help = 'Store MinHash signatures and LSH buckets for ingested policies (all, or only those without one)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Only policies without a stored signature')
+
+    def handle(self, *args, **options):
+        policies = Policy.objects.all()
+        if options['missing']:
+            policies = policies.filter(signature__isnull=True)
+        count = near_duplicates.rebuild_index(policies)
+        self.stdout.write(self.style.SUCCESS(f"Indexed signatures for {count} policies"))
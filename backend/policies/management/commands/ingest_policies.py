@@ -0,0 +1,32 @@
+"""
+Backfill stored text extraction for policies
+"""
+from django.core.management.base import BaseCommand
+from policies.models import Policy
+from policies.ingestion import ingest_policy
+
+
+class Command(BaseCommand):
+    help = 'Extract and store full document text and its chat passage index for policies that have not been ingested'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-ingest every policy, not only missing or failed ones')
+        parser.add_argument('--policy-id', type=int, action='append', dest='policy_ids', help='Only ingest the given policy ID (repeatable)')
+
+    def handle(self, *args, **options):
+        policies = Policy.objects.all()
+        if options['policy_ids']:
+            policies = policies.filter(id__in=options['policy_ids'])
+        elif not options['all']:
+            policies = policies.exclude(extraction__extraction_status='completed')
+
+        completed = failed = 0
+        for policy in policies.iterator():
+            extraction = ingest_policy(policy)
+            if extraction and extraction.extraction_status == 'completed':
+                completed += 1
+            else:
+                failed += 1
+                self.stderr.write(f"Policy {policy.id} ({policy.name}): extraction failed")
+
+        self.stdout.write(self.style.SUCCESS(f"Ingested {completed} policies, {failed} failed"))
@@ -0,0 +1,15 @@
+"""
+Rebuild the full-text policy search index
+"""
+from django.core.management.base import BaseCommand, CommandError
+from policies import search
+
+
+class Command(BaseCommand):
+    help = 'Re-index every policy in the FTS5 search table (after bulk imports or raw SQL changes)'
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError(f"Search table {search.FTS_TABLE} not found; run migrate on a SQLite database")
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} policies"))
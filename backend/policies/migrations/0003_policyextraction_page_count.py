@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policyextraction',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Page Count'),
+        ),
+    ]
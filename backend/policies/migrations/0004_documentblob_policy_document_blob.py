@@ -0,0 +1,39 @@
+import django.db.models.deletion
+import policies.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0003_policyextraction_page_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256 Digest')),
+                ('file', models.FileField(upload_to=policies.models.blob_file_path, verbose_name='Stored File')),
+                ('size', models.PositiveIntegerField(verbose_name='File Size (bytes)')),
+                ('file_type', models.CharField(max_length=10, verbose_name='File Type')),
+                ('structured_extraction', models.JSONField(blank=True, default=dict, verbose_name='Structured Extraction')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Document Blob',
+                'verbose_name_plural': 'Document Blobs',
+                'db_table': 'document_blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='document_blob',
+            field=models.ForeignKey(blank=True, db_column='content_hash', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='policies', to='policies.documentblob', to_field='sha256', verbose_name='Content Hash'),
+        ),
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['user', 'document_blob'], name='policies_user_id_feb088_idx'),
+        ),
+    ]
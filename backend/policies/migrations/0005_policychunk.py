@@ -0,0 +1,32 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0004_documentblob_policy_document_blob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ordinal', models.PositiveIntegerField(verbose_name='Position')),
+                ('text', models.TextField(verbose_name='Passage Text')),
+                ('char_start', models.PositiveIntegerField(verbose_name='Start Offset')),
+                ('char_end', models.PositiveIntegerField(verbose_name='End Offset')),
+                ('term_count', models.PositiveIntegerField(verbose_name='Indexed Terms')),
+                ('term_freqs', models.JSONField(default=dict, verbose_name='Term Frequencies')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='policies.policy')),
+            ],
+            options={
+                'verbose_name': 'Policy Chunk',
+                'verbose_name_plural': 'Policy Chunks',
+                'db_table': 'policy_chunks',
+                'ordering': ['policy', 'ordinal'],
+                'unique_together': {('policy', 'ordinal')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0005_policychunk'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS policy_search_fts USING fts5(
+                    name, provider, policy_number, description, body,
+                    tokenize = 'porter unicode61'
+                )
+                """,
+                """
+                INSERT INTO policy_search_fts (rowid, name, provider, policy_number, description, body)
+                SELECT p.id, p.name, p.provider, p.policy_number, p.description,
+                       COALESCE(e.extracted_text, '')
+                FROM policies p
+                LEFT JOIN policy_extractions e
+                    ON e.policy_id = p.id AND e.extraction_status = 'completed'
+                """,
+            ],
+            reverse_sql="DROP TABLE IF EXISTS policy_search_fts",
+        ),
+    ]
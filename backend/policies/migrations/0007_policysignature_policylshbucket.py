@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0006_policy_search_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicySignature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('minhash', models.JSONField(verbose_name='MinHash Signature')),
+                ('shingle_count', models.PositiveIntegerField(verbose_name='Shingles')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('policy', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='signature', to='policies.policy')),
+            ],
+            options={
+                'verbose_name': 'Policy Signature',
+                'verbose_name_plural': 'Policy Signatures',
+                'db_table': 'policy_signatures',
+            },
+        ),
+        migrations.CreateModel(
+            name='PolicyLshBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='Band')),
+                ('bucket', models.CharField(db_index=True, max_length=16, verbose_name='Bucket Hash')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='policies.policy')),
+            ],
+            options={
+                'verbose_name': 'Policy LSH Bucket',
+                'verbose_name_plural': 'Policy LSH Buckets',
+                'db_table': 'policy_lsh_buckets',
+                'unique_together': {('policy', 'band')},
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0007_policysignature_policylshbucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='conversation_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Chat Questions'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0008_policy_conversation_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='original_file_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Original File Name'),
+        ),
+    ]
@@ -19,6 +19,34 @@ def policy_file_path(instance, filename):
     return filename
 
 
+def blob_file_path(instance, filename):
+    """
+    Generate content-addressed file path for stored documents
+    """
+    ext = filename.split('.')[-1].lower()
+    return f"documents/{instance.sha256[:2]}/{instance.sha256}.{ext}"
+
+
+class DocumentBlob(models.Model):
+    """
+    A unique uploaded document, stored once under its SHA-256 content hash
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256 Digest')
+    file = models.FileField(upload_to=blob_file_path, verbose_name='Stored File')
+    size = models.PositiveIntegerField(verbose_name='File Size (bytes)')
+    file_type = models.CharField(max_length=10, verbose_name='File Type')
+    structured_extraction = models.JSONField(default=dict, blank=True, verbose_name='Structured Extraction')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
+    
+    class Meta:
+        verbose_name = 'Document Blob'
+        verbose_name_plural = 'Document Blobs'
+        db_table = 'document_blobs'
+    
+    def __str__(self):
+        return f"{self.sha256[:12]}.{self.file_type}"
+
+
 class Policy(models.Model):
     """
     Policy document model
@@ -60,13 +88,25 @@ class Policy(models.Model):
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'docx', 'txt'])],
         verbose_name='Policy Document'
     )
+    original_file_name = models.CharField(max_length=255, blank=True, verbose_name='Original File Name')
     file_size = models.PositiveIntegerField(verbose_name='File Size (bytes)')
     file_type = models.CharField(max_length=10, verbose_name='File Type')
+    document_blob = models.ForeignKey(
+        DocumentBlob,
+        to_field='sha256',
+        db_column='content_hash',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='policies',
+        verbose_name='Content Hash'
+    )
     
     # Metadata
     description = models.TextField(blank=True, verbose_name='Description')
     tags = models.JSONField(default=list, blank=True, verbose_name='Tags')
     is_active = models.BooleanField(default=True, verbose_name='Active')
+    conversation_count = models.PositiveIntegerField(default=0, verbose_name='Chat Questions')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created At')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
     
@@ -79,6 +119,7 @@ class Policy(models.Model):
             models.Index(fields=['user', 'policy_type']),
             models.Index(fields=['provider']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['user', 'document_blob']),
         ]
     
     def __str__(self):
@@ -97,9 +138,14 @@ class Policy(models.Model):
                 self.file_type = self.document.name.split('.')[-1].lower() if '.' in self.document.name else 'pdf'
         super().save(*args, **kwargs)
     
+    @property
+    def content_hash(self):
+        """SHA-256 digest of the document contents, if known"""
+        return self.document_blob_id
+    
     def get_file_name(self):
-        """Get the original filename"""
-        return os.path.basename(self.document.name)
+        """Get the original filename (the stored name is the content hash)"""
+        return self.original_file_name or os.path.basename(self.document.name)
     
     def get_file_extension(self):
         """Get the file extension"""
@@ -122,6 +168,7 @@ class PolicyExtraction(models.Model):
     policy = models.OneToOneField(Policy, on_delete=models.CASCADE, related_name='extraction')
     extracted_text = models.TextField(verbose_name='Extracted Text')
     text_length = models.PositiveIntegerField(verbose_name='Text Length')
+    page_count = models.PositiveIntegerField(default=0, verbose_name='Page Count')
     extraction_date = models.DateTimeField(auto_now_add=True, verbose_name='Extraction Date')
     extraction_status = models.CharField(
         max_length=20,
@@ -148,3 +195,62 @@ class PolicyExtraction(models.Model):
         if self.extracted_text:
             self.text_length = len(self.extracted_text)
         super().save(*args, **kwargs)
+
+
+class PolicyChunk(models.Model):
+    """
+    An overlapping passage of a policy's extracted text, indexed for BM25 retrieval
+    """
+    policy = models.ForeignKey(Policy, on_delete=models.CASCADE, related_name='chunks')
+    ordinal = models.PositiveIntegerField(verbose_name='Position')
+    text = models.TextField(verbose_name='Passage Text')
+    char_start = models.PositiveIntegerField(verbose_name='Start Offset')
+    char_end = models.PositiveIntegerField(verbose_name='End Offset')
+    term_count = models.PositiveIntegerField(verbose_name='Indexed Terms')
+    term_freqs = models.JSONField(default=dict, verbose_name='Term Frequencies')
+    
+    class Meta:
+        verbose_name = 'Policy Chunk'
+        verbose_name_plural = 'Policy Chunks'
+        db_table = 'policy_chunks'
+        ordering = ['policy', 'ordinal']
+        unique_together = ['policy', 'ordinal']
+    
+    def __str__(self):
+        return f"Chunk {self.ordinal} of {self.policy.name}"
+
+
+class PolicySignature(models.Model):
+    """
+    MinHash signature of a policy's extracted text, for near-duplicate detection
+    """
+    policy = models.OneToOneField(Policy, on_delete=models.CASCADE, related_name='signature')
+    minhash = models.JSONField(verbose_name='MinHash Signature')
+    shingle_count = models.PositiveIntegerField(verbose_name='Shingles')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated At')
+    
+    class Meta:
+        verbose_name = 'Policy Signature'
+        verbose_name_plural = 'Policy Signatures'
+        db_table = 'policy_signatures'
+    
+    def __str__(self):
+        return f"Signature of {self.policy.name}"
+
+
+class PolicyLshBucket(models.Model):
+    """
+    One LSH band of a policy's MinHash signature, hashed to a bucket
+    """
+    policy = models.ForeignKey(Policy, on_delete=models.CASCADE, related_name='lsh_buckets')
+    band = models.PositiveSmallIntegerField(verbose_name='Band')
+    bucket = models.CharField(max_length=16, db_index=True, verbose_name='Bucket Hash')
+    
+    class Meta:
+        verbose_name = 'Policy LSH Bucket'
+        verbose_name_plural = 'Policy LSH Buckets'
+        db_table = 'policy_lsh_buckets'
+        unique_together = ['policy', 'band']
+    
+    def __str__(self):
+        return f"Band {self.band} of {self.policy.name}"
@@ -0,0 +1,178 @@
+"""
+Near-duplicate policy detection for PolicyBridge AI
+
+Content hashes only catch byte-identical uploads; a re-scanned booklet or one
+with a different schedule page has a new hash but nearly the same text. Each
+policy's extracted text is therefore summarised by a MinHash signature over
+its word shingles (PolicySignature), whose agreement with another signature
+estimates the Jaccard similarity of the two shingle sets.
+
+For lookups the signature is cut into LSH_BANDS bands and each band is hashed
+to a bucket (PolicyLshBucket, indexed on the bucket). Policies sharing any
+bucket are candidates and only candidates are compared, so finding the
+near-duplicates of a policy reads a few indexed rows instead of every
+signature. With 16 bands of 8 rows a pair at the default 0.8 threshold
+becomes a candidate with probability ~0.95, and a pair at 0.9 almost surely.
+"""
+import difflib
+import hashlib
+import logging
+import re
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from .models import PolicySignature, PolicyLshBucket
+
+logger = logging.getLogger(__name__)
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // LSH_BANDS
+SHINGLE_WORDS = 5
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+# Universal hash functions h(x) = (a * x + b) mod p, from a fixed seed so
+# signatures computed by different processes are comparable
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_random = np.random.RandomState(1)
+_A = _random.randint(1, (1 << 61) - 1, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _random.randint(0, (1 << 61) - 1, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+# Shingles hashed per block, bounding the (block x permutations) matrix
+_BLOCK = 2048
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    """Distinct ``size``-word sequences of the lowercased text"""
+    words = WORD_RE.findall((text or '').lower())
+    if len(words) <= size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=4).digest(), 'little')
+
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set as NUM_PERMUTATIONS ints, or None if it is empty"""
+    if not shingle_set:
+        return None
+    hashes = np.fromiter((_hash(shingle) for shingle in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    signature = np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), _BLOCK):
+        block = hashes[start:start + _BLOCK]
+        permuted = np.bitwise_and((np.outer(block, _A) + _B) % _PRIME, _MAX_HASH)
+        signature = np.minimum(signature, permuted.min(axis=0))
+    return [int(value) for value in signature]
+
+
+def band_buckets(signature):
+    """The bucket hash of each band of ``signature``; the band number is part of the hash"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        key = f"{band}:" + ','.join(str(value) for value in rows)
+        buckets.append(hashlib.blake2b(key.encode('ascii'), digest_size=8).hexdigest())
+    return buckets
+
+
+def estimate_similarity(signature1, signature2):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    if not signature1 or len(signature1) != len(signature2):
+        return 0.0
+    return sum(1 for a, b in zip(signature1, signature2) if a == b) / len(signature1)
+
+
+def index_policy(policy, text):
+    """Store the signature and LSH buckets of a policy's text; returns the signature row or None"""
+    shingle_set = shingles(text)
+    signature = minhash(shingle_set)
+    with transaction.atomic():
+        PolicyLshBucket.objects.filter(policy=policy).delete()
+        if signature is None:
+            PolicySignature.objects.filter(policy=policy).delete()
+            return None
+        record, _ = PolicySignature.objects.update_or_create(
+            policy=policy,
+            defaults={'minhash': signature, 'shingle_count': len(shingle_set)}
+        )
+        PolicyLshBucket.objects.bulk_create([
+            PolicyLshBucket(policy=policy, band=band, bucket=bucket)
+            for band, bucket in enumerate(band_buckets(signature))
+        ])
+    return record
+
+
+def remove_policy(policy):
+    PolicyLshBucket.objects.filter(policy=policy).delete()
+    PolicySignature.objects.filter(policy=policy).delete()
+
+
+def find_near_duplicates(policy, threshold=None):
+    """
+    Other policies of the same user whose text is a near-duplicate of
+    ``policy``'s, as ``[(policy, similarity), ...]`` most similar first.
+
+    Only the owner's policies are considered: near-duplicates typically
+    differ in the schedule page, which holds personal details.
+    """
+    threshold = threshold if threshold is not None else getattr(settings, 'NEAR_DUPLICATE_THRESHOLD', 0.8)
+    try:
+        signature = policy.signature.minhash
+    except PolicySignature.DoesNotExist:
+        return []
+
+    candidate_ids = (PolicyLshBucket.objects
+                     .filter(bucket__in=band_buckets(signature), policy__user_id=policy.user_id)
+                     .exclude(policy_id=policy.id)
+                     .values('policy_id').distinct())
+    matches = []
+    for candidate in PolicySignature.objects.filter(policy_id__in=candidate_ids).select_related('policy'):
+        similarity = estimate_similarity(signature, candidate.minhash)
+        if similarity >= threshold:
+            matches.append((candidate.policy, similarity))
+    matches.sort(key=lambda match: (-match[1], match[0].id))
+    return matches
+
+
+def _sections(text):
+    """Paragraphs of ``text`` with whitespace normalized (lines when there are no blank lines)"""
+    parts = PARAGRAPH_RE.split(text or '')
+    if len(parts) < 2:
+        parts = (text or '').splitlines()
+    return [section for section in (' '.join(part.split()) for part in parts) if section]
+
+
+def differing_sections(old_text, new_text):
+    """
+    Sections of ``new_text`` that are not in ``old_text`` (``added``) and the
+    other way round (``removed``), in document order
+    """
+    old_sections, new_sections = _sections(old_text), _sections(new_text)
+    matcher = difflib.SequenceMatcher(None, old_sections, new_sections, autojunk=False)
+    added, removed = [], []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != 'equal':
+            removed.extend(old_sections[old_start:old_end])
+            added.extend(new_sections[new_start:new_end])
+    return {'added': added, 'removed': removed}
+
+
+def changed_fraction(changes, text):
+    """Share of ``text`` taken up by changed sections"""
+    changed = sum(len(section) for section in changes['added'] + changes['removed'])
+    return changed / max(1, len(text or ''))
+
+
+def rebuild_index(queryset):
+    """Re-index the signatures of the policies in ``queryset``; returns the number indexed"""
+    count = 0
+    policies = queryset.filter(extraction__extraction_status='completed').select_related('extraction')
+    for policy in policies.iterator():
+        if index_policy(policy, policy.extraction.extracted_text):
+            count += 1
+    return count
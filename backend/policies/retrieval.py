@@ -0,0 +1,162 @@
+"""
+Passage retrieval over policy documents for PolicyBridge AI
+
+At ingestion the extracted text is split into overlapping passages
+(PolicyChunk rows) stored with their term frequencies. A question about a
+policy is answered from the passages that score best for it under BM25,
+packed into the prompt's character budget, instead of from the start of the
+document: a question about exclusions on page 3 gets page 3.
+"""
+import logging
+import math
+import re
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from .models import PolicyChunk, PolicyExtraction
+
+logger = logging.getLogger(__name__)
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TERM_RE = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+WORD_RE = re.compile(r'\S+')
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by can do does for from has have how i if in is it its
+me my of on or our so that the their there this to was we what when which who why
+will with you your
+""".split())
+
+PASSAGE_SEPARATOR = '\n...\n'
+
+
+def tokenize(text):
+    """Lowercased index terms of ``text``, without stop words"""
+    return [term for term in TERM_RE.findall((text or '').lower()) if term not in STOP_WORDS]
+
+
+def split_passages(text, words=None, overlap=None):
+    """
+    Return ``(char_start, char_end)`` spans of ``words`` words each, every span
+    repeating the last ``overlap`` words of the previous one
+    """
+    words = words or settings.POLICY_CHUNK_WORDS
+    overlap = overlap if overlap is not None else settings.POLICY_CHUNK_OVERLAP_WORDS
+    spans = [match.span() for match in WORD_RE.finditer(text or '')]
+    step = max(1, words - overlap)
+    passages = []
+    for start in range(0, len(spans), step):
+        window = spans[start:start + words]
+        passages.append((window[0][0], window[-1][1]))
+        if start + words >= len(spans):
+            break
+    return passages
+
+
+def index_policy(policy, text):
+    """Replace the policy's passage index with passages of ``text``; returns the passage count"""
+    chunks = []
+    for ordinal, (start, end) in enumerate(split_passages(text)):
+        passage = text[start:end]
+        terms = tokenize(passage)
+        chunks.append(PolicyChunk(
+            policy=policy,
+            ordinal=ordinal,
+            text=passage,
+            char_start=start,
+            char_end=end,
+            term_count=len(terms),
+            term_freqs=dict(Counter(terms)),
+        ))
+    with transaction.atomic():
+        PolicyChunk.objects.filter(policy=policy).delete()
+        PolicyChunk.objects.bulk_create(chunks, batch_size=500)
+    return len(chunks)
+
+
+def get_policy_chunks(policy):
+    """
+    Return the policy's passages in document order.
+
+    Policies ingested before passages were indexed are indexed from their
+    stored text on first use. Policies without stored text have none.
+    """
+    chunks = list(PolicyChunk.objects.filter(policy=policy).order_by('ordinal'))
+    if chunks:
+        return chunks
+    try:
+        extraction = policy.extraction
+    except PolicyExtraction.DoesNotExist:
+        return []
+    if extraction.extraction_status != 'completed' or not extraction.extracted_text:
+        return []
+    index_policy(policy, extraction.extracted_text)
+    return list(PolicyChunk.objects.filter(policy=policy).order_by('ordinal'))
+
+
+def bm25_scores(chunks, query_terms):
+    """BM25 score of each chunk for ``query_terms``, with IDF taken over the policy's own passages"""
+    count = len(chunks)
+    if not count:
+        return []
+    average_length = sum(chunk.term_count for chunk in chunks) / count or 1
+    scores = [0.0] * count
+    for term in set(query_terms):
+        frequency = sum(1 for chunk in chunks if term in chunk.term_freqs)
+        if not frequency:
+            continue
+        idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+        for i, chunk in enumerate(chunks):
+            tf = chunk.term_freqs.get(term)
+            if tf:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk.term_count / average_length)
+                scores[i] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores
+
+
+def _join_passages(chunks):
+    # Neighbouring passages share their overlap; emit it only once
+    parts = []
+    previous_end = None
+    for chunk in sorted(chunks, key=lambda chunk: chunk.ordinal):
+        if previous_end is not None and chunk.char_start < previous_end:
+            parts[-1] += chunk.text[previous_end - chunk.char_start:]
+        else:
+            parts.append(chunk.text)
+        previous_end = max(previous_end or 0, chunk.char_end)
+    return PASSAGE_SEPARATOR.join(parts)
+
+
+def select_passages(policy, question, max_chars, top_k=None):
+    """
+    Return the policy text most relevant to ``question`` within ``max_chars``.
+
+    Up to ``top_k`` passages are taken best BM25 score first while they fit,
+    then joined in document order. A question sharing no terms with the
+    document gets the opening passages. Returns None when the policy has no
+    indexed text.
+    """
+    chunks = get_policy_chunks(policy)
+    if not chunks:
+        return None
+
+    top_k = top_k or settings.POLICY_CHAT_TOP_K
+    scores = bm25_scores(chunks, tokenize(question))
+    ranked = sorted((i for i in range(len(chunks)) if scores[i] > 0), key=lambda i: (-scores[i], i))
+    if not ranked:
+        ranked = range(len(chunks))
+
+    selected = []
+    used = 0
+    for i in ranked:
+        if len(selected) >= top_k:
+            break
+        size = len(chunks[i].text) + len(PASSAGE_SEPARATOR)
+        if selected and used + size > max_chars:
+            continue
+        selected.append(chunks[i])
+        used += size
+    return _join_passages(selected)
@@ -0,0 +1,152 @@
+"""
+Full-text policy search for PolicyBridge AI
+
+Policy metadata and extracted document text are indexed in the SQLite FTS5
+table ``policy_search_fts`` (rowid = policy id), kept in sync by the
+receivers in ``policies.signals``. Searches are answered from the index,
+ranked by bm25 with highlighted snippets, so their cost depends on the
+number of matches rather than the number of policies.
+"""
+import html
+import logging
+import re
+from django.db import connection, DatabaseError
+from .models import Policy, PolicyExtraction
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'policy_search_fts'
+
+# bm25 column weights: name, provider, policy_number, description, body
+COLUMN_WEIGHTS = (10.0, 5.0, 5.0, 2.0, 1.0)
+
+# Policy fields indexed alongside the extracted document text (the body)
+INDEXED_FIELDS = ('name', 'provider', 'policy_number', 'description')
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+SNIPPET_TOKENS = 16
+
+# Control characters FTS5 puts around matches; the snippet is HTML-escaped
+# before they are swapped for SNIPPET_START / SNIPPET_END
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+_available = False
+
+
+def is_available():
+    """Whether the database has the FTS5 index (SQLite with migrations applied)"""
+    global _available
+    if not _available:
+        _available = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _available
+
+
+def indexed_values(policy):
+    """The indexed field values of a policy, without loading deferred fields"""
+    return tuple(policy.__dict__.get(field) for field in INDEXED_FIELDS)
+
+
+def _document_text(policy):
+    try:
+        extraction = policy.extraction
+    except PolicyExtraction.DoesNotExist:
+        return ''
+    return extraction.extracted_text if extraction.extraction_status == 'completed' else ''
+
+
+def index_policy(policy):
+    """Insert or replace a policy's row in the search index"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [policy.id])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, provider, policy_number, description, body) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)",
+            [policy.id, policy.name, policy.provider, policy.policy_number or '',
+             policy.description or '', _document_text(policy)]
+        )
+
+
+def remove_policy(policy_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [policy_id])
+
+
+def match_expression(query):
+    """
+    FTS5 MATCH expression for free text: every word must match, the last one
+    as a prefix so results appear while the user is still typing. Words are
+    quoted, so FTS5 operators and punctuation in the input are taken literally.
+    """
+    terms = TERM_RE.findall(query or '')
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search(query, queryset, limit):
+    """
+    Rank the policies in ``queryset`` matching ``query``.
+
+    Returns up to ``limit`` ``(policy_id, rank, snippet)`` tuples, best match
+    first (lower bm25 rank is better). Snippets are HTML in which only the
+    match highlighting is markup; document text is escaped. The other search
+    filters are applied by ``queryset``, inside the same SQL statement.
+    Raises DatabaseError when the index is unavailable.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    candidates_sql, candidates_params = queryset.order_by().values('id').query.sql_with_params()
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    sql = (
+        f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+        f"snippet({FTS_TABLE}, -1, %s, %s, '…', {SNIPPET_TOKENS}) "
+        f"FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid IN ({candidates_sql}) "
+        f"ORDER BY rank LIMIT %s"
+    )
+    params = [_MATCH_START, _MATCH_END, expression, *candidates_params, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [(policy_id, rank, highlight(snippet)) for policy_id, rank, snippet in cursor.fetchall()]
+
+
+def highlight(snippet):
+    """HTML for an FTS5 snippet: text escaped, matches wrapped in SNIPPET_START / SNIPPET_END"""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(_MATCH_START, SNIPPET_START).replace(_MATCH_END, SNIPPET_END)
+
+
+def rebuild_index():
+    """Re-index every policy; returns the number indexed"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    count = 0
+    for policy in Policy.objects.select_related('extraction').iterator():
+        index_policy(policy)
+        count += 1
+    return count
+
+
+def safe_index_policy(policy):
+    """index_policy() for signal receivers: failures are logged, never raised"""
+    try:
+        if is_available():
+            index_policy(policy)
+    except DatabaseError as e:
+        logger.warning(f"Search indexing failed for policy {policy.id}: {e}")
+
+
+def safe_remove_policy(policy_id):
+    try:
+        if is_available():
+            remove_policy(policy_id)
+    except DatabaseError as e:
+        logger.warning(f"Search index removal failed for policy {policy_id}: {e}")
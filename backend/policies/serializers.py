@@ -1,8 +1,10 @@
 """
 Policy serializers for PolicyBridge AI
 """
+import os
 from rest_framework import serializers
 from .models import Policy, PolicyExtraction
+from .storage import get_upload_digest, store_document
 
 
 class PolicyExtractionSerializer(serializers.ModelSerializer):
@@ -11,8 +13,8 @@ class PolicyExtractionSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = PolicyExtraction
-        fields = ['extracted_text', 'text_length', 'extraction_date', 'extraction_status', 'error_message']
-        read_only_fields = ['text_length', 'extraction_date']
+        fields = ['extracted_text', 'text_length', 'page_count', 'extraction_date', 'extraction_status', 'error_message']
+        read_only_fields = ['text_length', 'page_count', 'extraction_date']
 
 
 class PolicySerializer(serializers.ModelSerializer):
@@ -63,14 +65,25 @@ class PolicyCreateSerializer(serializers.ModelSerializer):
         user = request.user if request else None
         document = data.get('document')
         if user and document:
-            # Check for duplicate file name for this user
-            existing = Policy.objects.filter(user=user, document__icontains=document.name)
+            # Check for duplicate content for this user (indexed digest lookup)
+            digest = get_upload_digest(request, document)
+            existing = Policy.objects.filter(user=user, document_blob_id=digest)
             if existing.exists():
                 raise serializers.ValidationError({
-                    'document': 'You have already uploaded a file with this name.'
+                    'document': 'You have already uploaded this document.'
                 })
         return data
     
+    def create(self, validated_data):
+        """Store the document once under its content hash and link the policy to it"""
+        document = validated_data.pop('document')
+        digest = get_upload_digest(self.context.get('request'), document)
+        blob = store_document(document, digest)
+        validated_data['document'] = blob.file.name
+        validated_data['document_blob'] = blob
+        validated_data['original_file_name'] = os.path.basename(document.name)[:255]
+        return super().create(validated_data)
+    
     def validate_document(self, value):
         """Validate document file"""
         if value.size > 10 * 1024 * 1024:  # 10MB limit
@@ -114,6 +127,19 @@ class PolicyListSerializer(serializers.ModelSerializer):
         return obj.get_formatted_file_size()
 
 
+class PolicySearchResultSerializer(PolicyListSerializer):
+    """
+    Serializer for policy search results, with the highlighted match snippet
+    """
+    search_snippet = serializers.SerializerMethodField()
+    
+    class Meta(PolicyListSerializer.Meta):
+        fields = PolicyListSerializer.Meta.fields + ['search_snippet']
+    
+    def get_search_snippet(self, obj):
+        return self.context.get('search_snippets', {}).get(obj.id, '')
+
+
 class PolicySearchSerializer(serializers.Serializer):
     """
     Serializer for policy search
@@ -0,0 +1,37 @@
+"""
+Signal receivers keeping the policy search index in sync
+"""
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Policy, PolicyExtraction
+from .search import INDEXED_FIELDS, indexed_values, safe_index_policy, safe_remove_policy
+
+
+@receiver(post_init, sender=Policy)
+def remember_indexed_values(sender, instance, **kwargs):
+    instance._indexed_values = indexed_values(instance)
+
+
+@receiver(post_save, sender=Policy)
+def index_saved_policy(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Re-index a policy only when an indexed field changed; document text is indexed with its extraction"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS):
+        return
+    values = indexed_values(instance)
+    if not created and values == instance._indexed_values:
+        return
+    safe_index_policy(instance)
+    instance._indexed_values = values
+
+
+@receiver(post_save, sender=PolicyExtraction)
+def index_extracted_policy(sender, instance, raw=False, **kwargs):
+    if not raw:
+        safe_index_policy(instance.policy)
+
+
+@receiver(post_delete, sender=Policy)
+def unindex_deleted_policy(sender, instance, **kwargs):
+    safe_remove_policy(instance.id)
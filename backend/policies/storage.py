@@ -0,0 +1,90 @@
+"""
+Content-addressed document storage for PolicyBridge AI
+
+Uploads are hashed with SHA-256 while they stream in and stored once under
+their digest, so the same booklet uploaded by many users shares one file,
+one text extraction and one structured extraction.
+"""
+import hashlib
+import logging
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import IntegrityError, transaction
+from .models import DocumentBlob
+
+logger = logging.getLogger(__name__)
+
+
+class SHA256UploadHandler(FileUploadHandler):
+    """
+    Upload handler that hashes each file as its chunks arrive.
+
+    It must come before the handlers that store the file; it passes every
+    chunk through unchanged and records the digest on the request under
+    ``request.upload_digests[field_name]``.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_digests'):
+                self.request.upload_digests = {}
+            self.request.upload_digests[self.field_name] = self.hasher.hexdigest()
+        return None
+
+
+def compute_digest(uploaded_file):
+    """Hash an uploaded file by streaming its chunks"""
+    hasher = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+
+def get_upload_digest(request, uploaded_file, field_name='document'):
+    """
+    Return the SHA-256 digest of an uploaded file, using the digest computed
+    by SHA256UploadHandler during the upload when available.
+    """
+    cached = getattr(uploaded_file, 'sha256', None)
+    if cached:
+        return cached
+
+    django_request = getattr(request, '_request', request)
+    digest = getattr(django_request, 'upload_digests', {}).get(field_name)
+    if not digest:
+        digest = compute_digest(uploaded_file)
+    uploaded_file.sha256 = digest
+    return digest
+
+
+def store_document(uploaded_file, digest):
+    """
+    Return the DocumentBlob for ``digest``, saving the file only if this
+    content has never been uploaded before.
+    """
+    blob = DocumentBlob.objects.filter(sha256=digest).first()
+    if blob:
+        logger.info(f"Reusing stored document {digest[:12]} for {uploaded_file.name}")
+        return blob
+
+    file_type = uploaded_file.name.split('.')[-1].lower() if '.' in uploaded_file.name else 'pdf'
+    blob = DocumentBlob(sha256=digest, size=uploaded_file.size, file_type=file_type)
+    try:
+        with transaction.atomic():
+            blob.file.save(uploaded_file.name, uploaded_file, save=False)
+            blob.save()
+    except IntegrityError:
+        # Another request stored the same content concurrently
+        blob.file.delete(save=False)
+        return DocumentBlob.objects.get(sha256=digest)
+
+    logger.info(f"Stored new document {digest[:12]} ({blob.size} bytes)")
+    return blob
@@ -8,14 +8,19 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Sum
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import Case, IntegerField, Q, Sum, When
 from .models import Policy, PolicyExtraction
+from .ingestion import ingest_policy
+from . import search
 from .serializers import (
     PolicySerializer,
     PolicyCreateSerializer,
     PolicyUpdateSerializer,
     PolicyListSerializer,
-    PolicySearchSerializer
+    PolicySearchSerializer,
+    PolicySearchResultSerializer
 )
 
 logger = logging.getLogger(__name__)
@@ -45,9 +50,10 @@ class PolicyListView(generics.ListCreateAPIView):
         return PolicyListSerializer
     
     def perform_create(self, serializer):
-        """Set the user when creating a policy"""
+        """Set the user when creating a policy and extract its text once"""
         serializer.save(user=self.request.user)
         logger.info(f"Policy created: {serializer.instance.name} by user {self.request.user.email}")
+        ingest_policy(serializer.instance)
 
 
 class PolicyDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -83,13 +89,18 @@ class PolicyDetailView(generics.RetrieveUpdateDestroyAPIView):
 class PolicySearchView(generics.ListAPIView):
     """
     Advanced search for policies
+
+    Free-text ``query`` is matched against policy metadata and document text
+    through the FTS5 index, ranked by bm25 with highlighted snippets; without
+    the index it falls back to icontains over the metadata.
     """
-    serializer_class = PolicyListSerializer
+    serializer_class = PolicySearchResultSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
         """Return filtered policies based on search parameters"""
         queryset = Policy.objects.filter(user=self.request.user)
+        self.search_snippets = {}
         
         # Get search parameters
         query = self.request.query_params.get('query', '')
@@ -102,14 +113,6 @@ class PolicySearchView(generics.ListAPIView):
         tags = self.request.query_params.getlist('tags', [])
         
         # Apply filters
-        if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) |
-                Q(provider__icontains=query) |
-                Q(description__icontains=query) |
-                Q(policy_number__icontains=query)
-            )
-        
         if policy_type:
             queryset = queryset.filter(policy_type=policy_type)
         
@@ -131,7 +134,39 @@ class PolicySearchView(generics.ListAPIView):
         if tags:
             queryset = queryset.filter(tags__contains=tags)
         
+        if query:
+            return self._search(queryset, query)
+        
         return queryset.distinct()
+    
+    def _search(self, queryset, query):
+        """Narrow the filtered queryset to policies matching ``query``, best match first"""
+        if search.is_available():
+            try:
+                results = search.search(query, queryset, settings.POLICY_SEARCH_MAX_RESULTS)
+            except DatabaseError as e:
+                logger.warning(f"Full-text search failed, falling back to icontains: {e}")
+            else:
+                if not results:
+                    return queryset.none()
+                self.search_snippets = {policy_id: snippet for policy_id, _, snippet in results}
+                rank = Case(
+                    *[When(id=policy_id, then=position) for position, (policy_id, _, _) in enumerate(results)],
+                    output_field=IntegerField()
+                )
+                return queryset.filter(id__in=list(self.search_snippets)).order_by(rank)
+        
+        return queryset.filter(
+            Q(name__icontains=query) |
+            Q(provider__icontains=query) |
+            Q(description__icontains=query) |
+            Q(policy_number__icontains=query)
+        ).distinct()
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_snippets'] = getattr(self, 'search_snippets', {})
+        return context
 
 
 @api_view(['GET'])
@@ -1,5 +1,10 @@
 """
 ASGI config for policybridge_backend project.
+
+Serve with an ASGI server so the async AI endpoints (/api/ai/async/...) await
+Gemini on the event loop instead of holding a thread per request:
+
+    uvicorn policybridge_backend.asgi:application --workers 4
 """
 
 import os